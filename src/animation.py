@@ -0,0 +1,200 @@
+# Animation timeline for the games on the NeoTrellis host programs
+
+# Copyright (C) 2023 Paul 'Footleg' Fretwell
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Games schedule their animations on the host animator (host.animator) instead of checking the
+time on every call of their animate method. An animation runs a step function at a fixed
+interval, optionally for a set duration, then calls its done function. Blinks, colour tweens,
+keyframes and one off timed callbacks are all built on this.
+
+The host calls update once per tick. Only the animations which are due are run, and the host
+clock is asked to wake at the earliest next frame, so the host can sleep until something has
+to change.
+
+Frames keep a fixed cadence from the start of the animation. If a tick runs late, missed
+frames are skipped rather than run in a burst, so the frame numbers passed to the step function
+follow the time and replays of recorded input see the same frames.
+"""
+
+
+class Animation:
+    def __init__(self, start, interval, step, end, onDone):
+        self.interval = interval
+        self.step = step
+        # Time the animation ends and onDone is called (None to run until cancelled)
+        self.end = end
+        self.onDone = onDone
+        self.start = start
+        self.frame = 0
+        self.due = start
+        self.active = True
+
+
+class Animator:
+    def __init__(self, clock):
+        self.clock = clock
+        self.animations = []
+
+    def every(self, interval, step, duration=None, frames=None, onDone=None, start=None):
+        """
+        Calls step(frame) every interval ns, from start (default now), with the frame number
+        counting up from 0. The animation ends after duration ns, or after the number of frames
+        given (plus one interval, so the last frame is shown for as long as the others). Returns
+        the animation, which can be cancelled.
+        """
+        if start is None:
+            start = self.clock.now
+        end = None
+        if duration is not None:
+            end = start + duration
+        elif frames is not None:
+            end = start + frames * interval
+        anim = Animation(start, interval, step, end, onDone)
+        self.animations.append(anim)
+        self.clock.wakeAt(start)
+        return anim
+
+    def after(self, delay, callback):
+        """
+        Calls callback() once after delay ns
+        """
+        return self.every(delay, skipFrame, duration=delay, onDone=callback, start=self.clock.now)
+
+    def blink(self, host, x, y, colours, interval, duration=None, frames=None, onDone=None, store=True, start=None):
+        """
+        Cycles button x,y through the list of colours, changing every interval ns
+        """
+        def step(frame):
+            host.setColour(x, y, colours[frame % len(colours)], store)
+        return self.every(interval, step, duration, frames, onDone, start)
+
+    def tween(self, host, x, y, fromColour, toColour, duration, steps, onDone=None, store=True):
+        """
+        Fades button x,y from one colour to another in a number of equal steps over duration ns,
+        starting from fromColour now and reaching toColour at the end of the duration
+        """
+        def step(frame):
+            host.setColour(x, y, tuple(fromColour[c] + (toColour[c] - fromColour[c]) * frame // steps for c in range(3)), store)
+        def done():
+            # The last step, which lands at the end of the duration
+            host.setColour(x, y, toColour, store)
+            if onDone is not None:
+                onDone()
+        # Round the interval up, so every frame before the last step is within the duration
+        return self.every(-(-duration // steps), step, duration=duration, onDone=done)
+
+    def keyframes(self, host, x, y, keys, onDone=None, store=True):
+        """
+        Sets button x,y to each colour of a list of (time, colour) pairs, with times in ns from now
+        in increasing order. The animation ends at the last keyframe.
+        """
+        start = self.clock.now
+        def step(frame):
+            # Show the last keyframe which is due, a late tick skips any it missed. The times are
+            # from the start of the animation, which moves on if it is suspended.
+            origin = anim.start - keys[0][0]
+            i = 0
+            while i + 1 < len(keys) and origin + keys[i + 1][0] <= self.clock.now:
+                i += 1
+            host.setColour(x, y, keys[i][1], store)
+            if i + 1 < len(keys):
+                # Wake for the next keyframe
+                anim.interval = origin + keys[i + 1][0] - anim.due
+        def done():
+            host.setColour(x, y, keys[-1][1], store)
+            if onDone is not None:
+                onDone()
+        anim = self.every(1, step, duration=keys[-1][0] - keys[0][0], onDone=done, start=start + keys[0][0])
+        return anim
+
+    def cancel(self, anim):
+        """
+        Stops an animation without calling its done function
+        """
+        if anim is not None and anim.active:
+            anim.active = False
+            self.animations.remove(anim)
+
+    def cancelAll(self):
+        for anim in self.animations:
+            anim.active = False
+        self.animations = []
+
+    def detach(self):
+        """
+        Removes all the animations without ending them and returns them, so they can be attached
+        again later (e.g. while a game is suspended)
+        """
+        animations = self.animations
+        self.animations = []
+        return animations
+
+    def attach(self, animations, delay=0):
+        """
+        Adds animations returned by detach, with all their times moved on by delay ns (the time
+        they were detached for) so they carry on from where they were
+        """
+        for anim in animations:
+            anim.start += delay
+            anim.due += delay
+            if anim.end is not None:
+                anim.end += delay
+            self.animations.append(anim)
+        due = self.nextDue()
+        if due is not None:
+            self.clock.wakeAt(due)
+
+    def update(self, now):
+        """
+        Runs the frames of the animations which are due, and the done functions of those which
+        have ended, then asks the clock to wake for the next frame
+        """
+        # Animations started or cancelled by the callbacks take effect from the next update
+        for anim in list(self.animations):
+            while anim.active and anim.due <= now:
+                if anim.end is not None and anim.due >= anim.end:
+                    self.cancel(anim)
+                    if anim.onDone is not None:
+                        anim.onDone()
+                    break
+                anim.step(anim.frame)
+                # Move on to the next frame, skipping any which are already late
+                anim.frame += 1
+                anim.due += anim.interval
+                while anim.due <= now and (anim.end is None or anim.due < anim.end):
+                    anim.frame += 1
+                    anim.due += anim.interval
+                if anim.end is not None and anim.due > anim.end:
+                    anim.due = anim.end
+        due = self.nextDue()
+        if due is not None:
+            self.clock.wakeAt(due)
+
+    def nextDue(self):
+        due = None
+        for anim in self.animations:
+            if due is None or anim.due < due:
+                due = anim.due
+        return due
+
+    def __len__(self):
+        return len(self.animations)
+
+
+def skipFrame(frame):
+    # Step function for animations which only run a function when they end
+    pass
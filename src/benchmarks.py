@@ -0,0 +1,363 @@
+# Benchmark suite for the NeoTrellis host and game hot paths
+
+# Copyright (C) 2023 Paul 'Footleg' Fretwell
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Measures the speed of the host LED and event methods and of the game classes, running on the
+headless simulator host with a simulated clock. Progress is printed to stderr and the results
+are written as JSON so runs can be compared, e.g.
+
+    python benchmarks.py -o before.json
+    (make changes)
+    python benchmarks.py -o after.json --compare before.json
+
+Comparing exits with status 1 if any benchmark is slower than the baseline by more than the
+tolerance, so it can be used to catch regressions before flashing the boards.
+"""
+
+import argparse
+import contextlib
+import json
+import platform
+import random
+import sys
+import time
+
+import log
+import sim_host
+from host_clock import SimClock
+from btn_demo import BtnDemo
+from rain_demo import RainDemo, DROPINTERVAL
+from trellisbattleships import Battleships, ANIMATEINTERVAL
+
+# Version of the results file layout
+RESULTS_FORMAT = 1
+
+
+class NullOutput:
+    """
+    Output stream which discards everything, so the prints and logging in the games don't swamp the results
+    """
+    def write(self, text):
+        return len(text)
+
+    def flush(self):
+        pass
+
+
+def makeHost(gameClass=Battleships):
+    return sim_host.Host(sim_host.MultiTrellis(), sim_host.RecordingAudio(), gameClass=gameClass, clock=SimClock())
+
+
+def benchSetColour():
+    host = makeHost(BtnDemo)
+    colour = (10, 20, 30)
+    def op():
+        host.setColour(5, 7, colour)
+    return op
+
+
+def benchGetColour():
+    host = makeHost(BtnDemo)
+    def op():
+        host.getColour(5, 7)
+    return op
+
+
+def benchGridReset():
+    host = makeHost(BtnDemo)
+    def op():
+        host.gridReset((50, 0, 50))
+    return op
+
+
+def benchBtnDispatch():
+    # Press and release of one button through the host button handler into BtnDemo
+    host = makeHost(BtnDemo)
+    def op():
+        host.btnHandler(3, 4, True, host.clock.now)
+        host.btnHandler(3, 4, False, host.clock.now)
+    return op
+
+
+def benchEventQueue():
+    # Press and release of one button recorded by the sync callback, then dispatched from the queue
+    host = makeHost(BtnDemo)
+    def op():
+        host.btnCallback(3, 4, True)
+        host.btnCallback(3, 4, False)
+        host.eventQueue.dispatch(host.btnHandler)
+    return op
+
+
+def benchRainAnimate(drops=100):
+    host = makeHost(RainDemo)
+    game = host.activeGame
+    rnd = random.Random(1)
+    def op():
+        # Keep the number of falling drops topped up, then run one animation step
+        while len(game.drops) < drops:
+            game.btnEvent(rnd.randrange(0, 12), rnd.randrange(0, 6), True)
+        host.clock.advance(DROPINTERVAL)
+        host.animate(host.clock.now)
+    return op
+
+
+def benchRainAnimateMany():
+    return benchRainAnimate(drops=500)
+
+
+def battleshipsAnimation(startStage):
+    random.seed(1)
+    host = makeHost(Battleships)
+    game = host.activeGame
+    if startStage is not None:
+        startStage(game)
+    def op():
+        # Keep the stage animation running with a frame due, then animate
+        if game.animation is not None:
+            game.animation.due = host.clock.now
+            game.animation.end = host.clock.now + ANIMATEINTERVAL
+        host.animate(host.clock.now)
+    return op
+
+
+def benchBattleshipsIdle():
+    return battleshipsAnimation(None)
+
+
+def startShot(game):
+    game.btnEvent(1, 1, True)
+    game.btnEvent(1, 1, False)
+
+
+def benchBattleshipsShotFlash():
+    return battleshipsAnimation(startShot)
+
+
+def startSinking(game):
+    game.activeBtn = (game.carrier[0][0], game.carrier[0][1])
+    game.activeShip = game.carrier
+    game.gamestage = 3
+    game.animation = game.host.animator.every(ANIMATEINTERVAL, game.sinkFrame)
+
+
+def benchBattleshipsSinking():
+    return battleshipsAnimation(startSinking)
+
+
+def benchBattleshipsGameOver():
+    return battleshipsAnimation(lambda game: game.endGame())
+
+
+def benchBattleshipsStartGame():
+    random.seed(1)
+    game = makeHost(Battleships).activeGame
+    def op():
+        game.startGame()
+    return op
+
+
+def benchBattleshipsPlaceShip():
+    random.seed(1)
+    game = makeHost(Battleships).activeGame
+    def op():
+        game.placeShip(game.carrier)
+    return op
+
+
+def battleshipsPlaceAtDensity(density):
+    # Place a cruiser on a board with the given fraction of the other positions blocked
+    random.seed(1)
+    game = makeHost(Battleships).activeGame
+    rnd = random.Random(2)
+    for i in range(len(game.shipAt)):
+        game.shipAt[i] = 0
+    for i in rnd.sample(range(len(game.shipAt)), int(len(game.shipAt) * density)):
+        # Cells held by a ship which is not in the fleet, so placing never clears them
+        game.shipAt[i] = 255
+    def op():
+        game.placeShip(game.cruiser)
+    return op
+
+
+def benchBattleshipsTakeShot():
+    # Resolve a shot at every position of the playing area (all ships end up sunk, so later runs
+    # take the same path)
+    random.seed(1)
+    game = makeHost(Battleships).activeGame
+    def op():
+        for y in range(1, 11):
+            for x in range(1, 11):
+                game.takeShot(x, y)
+    return op
+
+
+def benchLogOff():
+    # Debug message with debug logging off (the default)
+    def op():
+        log.debug("Button pressed %d,%d", 5, 7)
+    return op
+
+
+def benchLogRecorded():
+    # Debug message recorded in the ring buffer but not printed
+    log.setLevel(printAt=log.OFF, recordAt=log.DEBUG)
+    def op():
+        log.debug("Button pressed %d,%d", 5, 7)
+    return op
+
+
+def benchSwitchGame():
+    # Switch back and forth between two games, suspending one and resuming the other (after the
+    # first load of RainDemo)
+    host = makeHost(BtnDemo)
+    names = ["RainDemo", "BtnDemo"]
+    switches = [0]
+    def op():
+        host.switchGame(names[switches[0] % 2])
+        switches[0] += 1
+    return op
+
+
+BENCHMARKS = [
+    ("host.setColour", benchSetColour),
+    ("host.getColour", benchGetColour),
+    ("host.gridReset", benchGridReset),
+    ("host.btnHandler", benchBtnDispatch),
+    ("host.eventQueue", benchEventQueue),
+    ("host.switchGame", benchSwitchGame),
+    ("rain.animate.100drops", benchRainAnimate),
+    ("rain.animate.500drops", benchRainAnimateMany),
+    ("battleships.animate.idle", benchBattleshipsIdle),
+    ("battleships.animate.shot", benchBattleshipsShotFlash),
+    ("battleships.animate.sinking", benchBattleshipsSinking),
+    ("battleships.animate.gameover", benchBattleshipsGameOver),
+    ("battleships.startGame", benchBattleshipsStartGame),
+    ("battleships.placeShip", benchBattleshipsPlaceShip),
+    ("battleships.takeShot.100", benchBattleshipsTakeShot),
+    ("battleships.placeShip.density00", lambda: battleshipsPlaceAtDensity(0.0)),
+    ("battleships.placeShip.density25", lambda: battleshipsPlaceAtDensity(0.25)),
+    ("battleships.placeShip.density50", lambda: battleshipsPlaceAtDensity(0.5)),
+    ("battleships.placeShip.density75", lambda: battleshipsPlaceAtDensity(0.75)),
+    ("log.debug.off", benchLogOff),
+    ("log.debug.recorded", benchLogRecorded),
+]
+
+
+def measure(op, minTimeNs, repeats):
+    """
+    Runs op in batches sized to take at least minTimeNs, returning the best time per call in ns
+    over the repeats, and the number of calls per batch
+    """
+    # Warm up and find a batch size that runs long enough to time reliably
+    iterations = 1
+    while True:
+        start = time.perf_counter_ns()
+        for i in range(iterations):
+            op()
+        elapsed = time.perf_counter_ns() - start
+        if elapsed >= minTimeNs:
+            break
+        iterations *= 2
+
+    best = elapsed / iterations
+    for r in range(repeats - 1):
+        start = time.perf_counter_ns()
+        for i in range(iterations):
+            op()
+        best = min(best, (time.perf_counter_ns() - start) / iterations)
+    return best, iterations
+
+
+def runBenchmarks(names=None, minTimeNs=50000000, repeats=5):
+    results = {}
+    for name, setup in BENCHMARKS:
+        if names and not any(n in name for n in names):
+            continue
+        # Each benchmark starts from the default log levels
+        log.setLevel(printAt=log.INFO, recordAt=log.INFO)
+        with contextlib.redirect_stdout(NullOutput()):
+            op = setup()
+            perCallNs, iterations = measure(op, minTimeNs, repeats)
+        results[name] = {
+            "ns_per_op": round(perCallNs, 1),
+            "ops_per_s": round(1000000000 / perCallNs, 1) if perCallNs > 0 else None,
+            "iterations": iterations,
+            "repeats": repeats,
+        }
+        print(f"{name:32} {perCallNs / 1000:12.2f} us/op", file=sys.stderr)
+    return results
+
+
+def compareResults(results, baseline, tolerance):
+    """
+    Prints the change of each benchmark against the baseline results, returning the names of
+    the benchmarks which got slower by more than the tolerance (a fraction, 0.1 = 10%)
+    """
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        before = baseline[name]["ns_per_op"]
+        after = result["ns_per_op"]
+        change = (after - before) / before if before > 0 else 0.0
+        flag = ""
+        if change > tolerance:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        print(f"{name:32} {before / 1000:10.2f} -> {after / 1000:10.2f} us/op ({change * 100:+.1f}%){flag}", file=sys.stderr)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the NeoTrellis host and game hot paths")
+    parser.add_argument("-o", "--output", help="Write results as JSON to this file (default stdout)")
+    parser.add_argument("-k", "--filter", action="append", help="Only run benchmarks with names containing this text")
+    parser.add_argument("--repeats", type=int, default=5, help="Timed repeats per benchmark, best is reported")
+    parser.add_argument("--min-time", type=float, default=0.05, help="Minimum seconds per timed repeat")
+    parser.add_argument("--compare", help="Baseline JSON results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="Allowed slowdown against the baseline (0.1 = 10%%)")
+    args = parser.parse_args(argv)
+
+    results = runBenchmarks(args.filter, int(args.min_time * 1000000000), args.repeats)
+    report = {
+        "format": RESULTS_FORMAT,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_implementation() + " " + platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compareResults(results, baseline["results"], args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} benchmark(s) slower than baseline: {', '.join(regressions)}", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -15,6 +15,8 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import log
+
 OFF = (0, 0, 0)
 RED = (255, 0, 0)
 ORANGE = (255, 80, 0)
@@ -27,324 +29,85 @@ PURPLE = (100, 0, 255)
 WHITE = (255,255,255)
 DIMWHITE = (20,20,20)
 
+# Size of the button matrix
+DIM_X = 12
+DIM_Y = 12
+
+
+def dataPath(name):
+    """
+    Returns the path of a data file kept next to this module, so it is found whatever directory
+    the program is run from (CircuitPython has no os.path)
+    """
+    end = max(__file__.rfind("/"), __file__.rfind("\\")) + 1
+    return __file__[:end] + name
+
+
+# File listing the sound played by each button
+SOUND_MAP_FILE = dataPath("btn_demo_sounds.txt")
+
+
+def loadSoundMap(path=SOUND_MAP_FILE):
+    """
+    Reads a sound map file into lists of the sound key and volume for each button, indexed by
+    y * DIM_X + x (key None for buttons with no sound). Each line of the file lists the keys for
+    one row of buttons, separated by spaces, with - for no sound. A key may be followed by
+    :volume (0 to 1.0). Blank lines and lines starting # are skipped.
+    """
+    sounds = [None] * (DIM_X * DIM_Y)
+    volumes = [1.0] * (DIM_X * DIM_Y)
+    y = 0
+    with open(path, "r") as f:
+        for line in f:
+            keys = line.split()
+            if not keys or keys[0].startswith("#"):
+                continue
+            if y < DIM_Y:
+                for x in range(min(len(keys), DIM_X)):
+                    if keys[x] != "-":
+                        key, sep, volume = keys[x].partition(":")
+                        sounds[y * DIM_X + x] = key
+                        if sep:
+                            volumes[y * DIM_X + x] = float(volume)
+            y += 1
+    return sounds, volumes
+
+
 """
 Example class for the NeoTrellis matrix showing how button presses, 
 setting and getting button colours and playing sounds can be done.
 """
 class BtnDemo:
-    def __init__(self, host):
+    def __init__(self, host, soundMap=SOUND_MAP_FILE):
         # Host contains all the RGB LED access and audio play methods of the hardware
         self.host = host
-               
+        self.loadSounds(soundMap)
+
+    def loadSounds(self, path):
+        """
+        Loads the sound for each button from a sound map file, so sound packs can be swapped
+        without changing the code
+        """
+        try:
+            self.sounds, self.volumes = loadSoundMap(path)
+        except OSError:
+            log.warning("No sound map file: %s", path)
+            self.sounds = [None] * (DIM_X * DIM_Y)
+            self.volumes = [1.0] * (DIM_X * DIM_Y)
+
     def btnEvent(self, x, y, press):
         if press:
             # Light up button to indicate pressed
             self.host.setColour(x,y,WHITE,False)
             
             # Play sound for this button
-            if y == 0:
-                if x == 0:
-                    self.host.play('swing0')
-                elif x == 1:
-                    self.host.play('hit')
-                elif x == 2:
-                    self.host.play('hit0')
-                elif x == 3:
-                    self.host.play('hit1')
-                elif x == 4:
-                    self.host.play('hit2')
-                elif x == 5:
-                    self.host.play('glass_break')
-                elif x == 6:
-                    self.host.play('glass_break')
-                elif x == 7:
-                    self.host.play('glass_break')
-                elif x == 8:
-                    self.host.play('glass_break')
-                elif x == 9:
-                    self.host.play('glass_break')
-                elif x == 10:
-                    self.host.play('glass_break')
-                elif x == 11:
-                    self.host.play('glass_break')
-            elif y == 1:
-                if x == 0:
-                    self.host.play('glass_break')
-                elif x == 1:
-                    self.host.play('SeaMineExplosion_2')
-                elif x == 2:
-                    self.host.play('WaterSplash_2')
-                elif x == 3:
-                    self.host.play('QuickBombDrop_2')
-                elif x == 4:
-                    self.host.play('EpicExplosion_2')
-                elif x == 5:
-                    self.host.play('Alert')
-                elif x == 6:
-                    self.host.play('ArcadeAction01')
-                elif x == 7:
-                    self.host.play('ArcadeAction04')
-                elif x == 8:
-                    self.host.play('ArcadeAlarm01')
-                elif x == 9:
-                    self.host.play('ArcadeAlarm02')
-                elif x == 10:
-                    self.host.play('ArcadeBeep03')
-                elif x == 11:
-                    self.host.play('ArcadeChirp03')
-            elif y == 2:
-                if x == 0:
-                    self.host.play('ArcadeChirp07')
-                elif x == 1:
-                    self.host.play('ArcadeChirp08')
-                elif x == 2:
-                    self.host.play('ArcadeChirpDescend01')
-                elif x == 3:
-                    self.host.play('ArcadeChirpDescend02')
-                elif x == 4:
-                    self.host.play('ArcadeMovement08')
-                elif x == 5:
-                    self.host.play('ArcadePowerUp01')
-                elif x == 6:
-                    self.host.play('ArcadePowerUp02')
-                elif x == 7:
-                    self.host.play('ArcadePowerUp03')
-                elif x == 8:
-                    self.host.play('BombFall01')
-                elif x == 9:
-                    self.host.play('CarHorn01')
-                elif x == 10:
-                    self.host.play('CarHorn02')
-                elif x == 11:
-                    self.host.play('ChickenCrow')
-            elif y == 3:
-                if x == 0:
-                    self.host.play('ComicalDescent')
-                elif x == 1:
-                    self.host.play('ComicalMetalGong')
-                elif x == 2:
-                    self.host.play('ComicalPopwirl')
-                elif x == 3:
-                    self.host.play('GameOver01')
-                elif x == 4:
-                    self.host.play('alarm_tone')
-                elif x == 5:
-                    self.host.play('alert_quick_chime')
-                elif x == 6:
-                    self.host.play('alien_radio_frequency_call')
-                elif x == 7:
-                    self.host.play('alien_technology_hum')
-                elif x == 8:
-                    self.host.play('arcade_bonus_alert')
-                elif x == 9:
-                    self.host.play('axe_hits_to_plate')
-                elif x == 10:
-                    self.host.play('bad_joke_drums')
-                elif x == 11:
-                    self.host.play('bonus_earned_video_game')
-            elif y == 4:
-                if x == 0:
-                    self.host.play('cartoon_alert')
-                elif x == 1:
-                    self.host.play('cartoon_kitty_begging_meow')
-                elif x == 2:
-                    self.host.play('chickens_pigeons')
-                elif x == 3:
-                    self.host.play('confirmation_tone')
-                elif x == 4:
-                    self.host.play('cow_moo_in_the_barn')
-                elif x == 5:
-                    self.host.play('donkey_scream')
-                elif x == 6:
-                    self.host.play('double_beep_tone_alert')
-                elif x == 7:
-                    self.host.play('electronics_power_up')
-                elif x == 8:
-                    self.host.play('failure_arcade_alert_notification')
-                elif x == 9:
-                    self.host.play('fantasy_game_sweep_notification')
-                elif x == 10:
-                    self.host.play('flute_alert')
-                elif x == 11:
-                    self.host.play('flute_cell_phone_alert')
-            elif y == 5:
-                if x == 0:
-                    self.host.play('flute_mobile_phone_notification_alert')
-                elif x == 1:
-                    self.host.play('funny_magic_zoom')
-                elif x == 2:
-                    self.host.play('futuristic_cinematic_sweep')
-                elif x == 3:
-                    self.host.play('futuristic_sci_fi_computer_ambience')
-                elif x == 4:
-                    self.host.play('futuristic_transition_sweep')
-                elif x == 5:
-                    self.host.play('futuristic_zoom_move')
-                elif x == 6:
-                    self.host.play('game_notification_wave_alarm')
-                elif x == 7:
-                    self.host.play('game_success_alert')
-                elif x == 8:
-                    self.host.play('game_warning_quick_notification')
-                elif x == 9:
-                    self.host.play('goat_single_baa')
-                elif x == 10:
-                    self.host.play('happy_bell_alert')
-                elif x == 11:
-                    self.host.play('high_tech_bleep')
-            elif y == 6:
-                if x == 0:
-                    self.host.play('high_tech_bleep_confirmation')
-                elif x == 1:
-                    self.host.play('high_tech_notification_bleep')
-                elif x == 2:
-                    self.host.play('industry_alarm_tone')
-                elif x == 3:
-                    self.host.play('interface_option_select')
-                elif x == 4:
-                    self.host.play('magic_notification_ring')
-                elif x == 5:
-                    self.host.play('mechanical_alert')
-                elif x == 6:
-                    self.host.play('musical_alert_notification')
-                elif x == 7:
-                    self.host.play('musical_flute_alert')
-                elif x == 8:
-                    self.host.play('old_telephone_ring')
-                elif x == 9:
-                    self.host.play('police_short_whistle')
-                elif x == 10:
-                    self.host.play('retro_confirmation_tone')
-                elif x == 11:
-                    self.host.play('rooster_crowing_in_the_morning')
-            elif y == 7:
-                if x == 0:
-                    self.host.play('sci_fi_battle_laser_shots')
-                elif x == 1:
-                    self.host.play('sci_fi_computer_technology_a')
-                elif x == 2:
-                    self.host.play('futuristic_sci_fi_computer_ambience_b')
-                elif x == 3:
-                    self.host.play('sci_fi_error_alert')
-                elif x == 4:
-                    self.host.play('sci_fi_spaceship_traveling_in_cosmos')
-                elif x == 5:
-                    self.host.play('shaker_bell_alert')
-                elif x == 6:
-                    self.host.play('shatter_shot_explosion')
-                elif x == 7:
-                    self.host.play('shuffling_gear_mech_item')
-                elif x == 8:
-                    self.host.play('signal_alert')
-                elif x == 9:
-                    self.host.play('stallion_horse_neigh')
-                elif x == 10:
-                    self.host.play('technology_notification')
-                elif x == 11:
-                    self.host.play('unlock_new_item_game_notification')
-            elif y == 8:
-                if x == 0:
-                    self.host.play('QuickBombDrop_1')
-                elif x == 1:
-                    self.host.play('WaterSplash_1')
-                elif x == 2:
-                    self.host.play('SeaMineExplosion_1')
-                elif x == 3:
-                    self.host.play('EpicExplosion_1')
-                elif x == 4:
-                    self.host.play('uplifting_flute_notification')
-                elif x == 5:
-                    self.host.play('wolves_pack_howling')
-                elif x == 6:
-                    self.host.play('Alert')
-                elif x == 7:
-                    self.host.play('Alert')
-                elif x == 8:
-                    self.host.play('Alert')
-                elif x == 9:
-                    self.host.play('sci_fi_computer_technology_b')
-                elif x == 10:
-                    self.host.play('Alert')
-                elif x == 11:
-                    self.host.play('Alert')
-            elif y == 9:
-                if x == 0:
-                    self.host.play('QuickBombDrop_2')
-                elif x == 1:
-                    self.host.play('WaterSplash_2')
-                elif x == 2:
-                    self.host.play('SeaMineExplosion_2')
-                elif x == 3:
-                    self.host.play('EpicExplosion_2')
-                elif x == 4:
-                    self.host.play('sci_fi_computer_technology_a')
-                elif x == 5:
-                    self.host.play('sci_fi_computer_technology_b')
-                elif x == 6:
-                    self.host.play('sci_fi_computer_technology_c')
-                elif x == 7:
-                    self.host.play('sci_fi_computer_technology_e')
-                elif x == 8:
-                    self.host.play('sci_fi_computer_technology_e')
-                elif x == 9:
-                    self.host.play('sci_fi_computer_technology_d')
-                elif x == 10:
-                    self.host.play('sci_fi_computer_technology_e')
-                elif x == 11:
-                    self.host.play('sci_fi_computer_technology_e')
-            elif y == 10:
-                if x == 0:
-                    self.host.play('QuickBombDrop_3')
-                elif x == 1:
-                    self.host.play('WaterSplash_3')
-                elif x == 2:
-                    self.host.play('SeaMineExplosion_3')
-                elif x == 3:
-                    self.host.play('EpicExplosion_3')
-                elif x == 4:
-                    self.host.play('sci_fi_computer_technology_a')
-                elif x == 5:
-                    self.host.play('sci_fi_computer_technology_b')
-                elif x == 6:
-                    self.host.play('sci_fi_computer_technology_c')
-                elif x == 7:
-                    self.host.play('sci_fi_computer_technology_e')
-                elif x == 8:
-                    self.host.play('sci_fi_computer_technology_e')
-                elif x == 9:
-                    self.host.play('sci_fi_computer_technology_d')
-                elif x == 10:
-                    self.host.play('sci_fi_computer_technology_e')
-                elif x == 11:
-                    self.host.play('sci_fi_computer_technology_e')
-            elif y == 11:
-                if x == 0:
-                    self.host.play('QuickBombDrop_4')
-                elif x == 1:
-                    self.host.play('WaterSplash_4')
-                elif x == 2:
-                    self.host.play('SeaMineExplosion_4')
-                elif x == 3:
-                    self.host.play('EpicExplosion_4')
-                elif x == 4:
-                    self.host.play('sci_fi_computer_technology_a')
-                elif x == 5:
-                    self.host.play('sci_fi_computer_technology_b')
-                elif x == 6:
-                    self.host.play('sci_fi_computer_technology_c')
-                elif x == 7:
-                    self.host.play('sci_fi_computer_technology_e')
-                elif x == 8:
-                    self.host.play('sci_fi_computer_technology_e')
-                elif x == 9:
-                    self.host.play('sci_fi_computer_technology_d')
-                elif x == 10:
-                    self.host.play('sci_fi_computer_technology_e')
-                elif x == 11:
-                    self.host.play('sci_fi_computer_technology_e')
+            idx = y * DIM_X + x
+            if self.sounds[idx] is not None:
+                self.host.play(self.sounds[idx], volume=self.volumes[idx])
         else:
-            print(f"Colour at {x},{y}: {self.host.getColour(x, y)}")
-            if self.host.getColour(x, y) == RED:
+            colour = self.host.getColour(x, y)
+            log.debug("Colour at %d,%d: %s", x, y, colour)
+            if colour == RED:
                 self.host.setColour(x, y, ORANGE)
             elif self.host.getColour(x, y) == ORANGE:
                 self.host.setColour(x, y, YELLOW)
@@ -12,7 +12,12 @@ methods still WIP).
 
 The host program holds a reference to the active game class instance in the variable 'activeGame'.
 Long button press events (press and hold for 3 seconds) are handled by the host program and used
-to swap between different games.
+to swap between different games. The games are listed in games.py, and each game's module is
+only imported when the game is started.
+
+Games run their animations on the host animator (host.animator), or ask to be woken with
+host.clock.wakeAt. The game animate method is only called when a requested wake time is reached,
+so the host sleeps while nothing is changing.
 """
 
 import time
@@ -20,22 +25,48 @@ import board
 import busio
 import microcontroller
 import audiobusio
+import audiomixer
 from audiocore import WaveFile
 from adafruit_neotrellis.neotrellis import NeoTrellis
 from adafruit_neotrellis.multitrellis import MultiTrellis
 from digitalio import DigitalInOut, Direction, Pull
-
-from btn_demo import BtnDemo
-from rain_demo import RainDemo
-from TrellisBattleships import Battleships
+from host_clock import Clock
+from framebuffer import FrameBuffer
+from led_levels import LedLevels
+from events import EventQueue
+from scheduler import FrameScheduler, INPUT_INTERVAL, FLUSH_INTERVAL
+from animation import Animator
+from sound_cache import SoundCache
+from voice_pool import VoicePool, VOICE_COUNT
+from perf import FrameCounters
+import log
+
+import games
 
 RED = (255, 0, 0)
 ORANGE = (255, 100, 0)
 
+# Format of the mixer output. All the sound files must be in this format to play through the mixer.
+MIXER_SAMPLE_RATE = 22050
+MIXER_BITS = 16
+
+# Size of the buffer each open sound streams through from the flash, and the memory allowed for open sounds
+WAVE_BUFFER_SIZE = 1024
+SOUND_BUDGET = WAVE_BUFFER_SIZE * 12
+
+# Interval the frame counters are printed over the serial console at (ns), None to not print them
+PERF_REPORT_INTERVAL = 10000000000
+
 bootBtn = DigitalInOut(microcontroller.pin.GPIO23)
 bootBtn.direction = Direction.INPUT
+# State of the boot button at the last input poll (it reads False while pressed)
+bootBtnDown = False
 
 audio = audiobusio.I2SOut(board.GP1, board.GP2, board.GP3)
+# Sounds play on the voices of a mixer which plays continuously, so they can overlap
+mixer = audiomixer.Mixer(voice_count=VOICE_COUNT, sample_rate=MIXER_SAMPLE_RATE, channel_count=1,
+                         bits_per_sample=MIXER_BITS, samples_signed=True)
+audio.play(mixer)
 
 # Create the I2C object for the NeoTrellis
 i2c_bus = busio.I2C(scl=board.GP5, sda=board.GP4)
@@ -60,18 +91,28 @@ application code and also enables a digital twin to run the same application cla
 simulation of the hardware.
 """
 class Host:
-    def __init__(self,getColour,setColour,audio):
+    def __init__(self,getColour,setColour,voices,frameBuffer,levels,counters):
         self.getColour = getColour
         self.setColour = setColour
-        self.audio = audio
-
-        print("Loading sound files into memory")
-        self.sounds_dict = {}
-
-        # Load sound files into sounds dictionary
-        self.sounds_dict['glass_break'] = WaveFile(open("./sounds/GlassBreak.wav", "rb"))
-        # Load sound files with text keys to identify them here (just a few CC licensed sound files are included in source as examples)
-        # self.sounds_dict['sound_key'] = WaveFile(open("./sounds/soundfile.wav", "rb"))
+        # Counts of what each frame does (see perf.py)
+        self.counters = counters
+        # Pool of mixer voices the sounds play on (see voice_pool.py)
+        self.voices = voices
+        self.frameBuffer = frameBuffer
+        # Gamma and brightness tables applied as the LEDs are sent (see led_levels.py)
+        self.levels = levels
+        # Sounds the active game keeps loaded
+        self.pinnedSounds = []
+        # Clock the games read the time from, read once per tick by the main loop
+        self.clock = Clock()
+        # Timeline the games schedule their animations on (see animation.py)
+        self.animator = Animator(self.clock)
+        # Time the button event being passed to the game was captured
+        self.eventTime = 0
+
+        # Sound files are opened the first time they are played (see sound_cache.py). Each open
+        # sound streams from the flash, so only its buffer counts against the budget.
+        self.sounds = SoundCache(openWave, SOUND_BUDGET, cost=waveCost, release=closeWave, busy=voices.isPlaying)
 
     def getColour(self):
         return self.getColour
@@ -82,11 +123,53 @@ class Host:
     def restoreColour(self,x,y):
         self.setColour(x,y,self.getColour(x,y),False)
 
-    def play(self,key):
+    # Bulk drawing methods, each updates the framebuffer in one operation and the changes are
+    # sent to the boards in the next flush
+    def fill(self,colour,store=True):
+        self.frameBuffer.fill(colour,store)
+
+    def fillRect(self,x,y,w,h,colour,store=True):
+        self.frameBuffer.fillRect(x,y,w,h,colour,store)
+
+    def drawRow(self,x,y,length,colour,store=True):
+        self.frameBuffer.drawRow(x,y,length,colour,store)
+
+    def drawColumn(self,x,y,length,colour,store=True):
+        self.frameBuffer.drawColumn(x,y,length,colour,store)
+
+    def drawPolyline(self,points,colour,length=None,store=True):
+        return self.frameBuffer.drawPolyline(points,colour,length,store)
+
+    def blit(self,buffer,x=0,y=0,width=None,store=True):
+        self.frameBuffer.blit(buffer,x,y,width,store)
+
+    def play(self,key,priority=0,volume=1.0):
+        # Plays the sound on a free mixer voice, or in place of the oldest lower priority sound.
+        # The volume (0 to 1.0) sets the level of the voice, so one sound file serves every volume.
+        self.counters.plays += 1
         try:
-            self.audio.play(self.sounds_dict[key])
+            self.voices.play(self.sounds.get(key), priority, volume)
         except(KeyError):
-            print(f"No sound matching key: {key}")
+            log.warning("No sound matching key: %s", key)
+
+    def setRegionBrightness(self,x,y,w,h,scale):
+        # Scales the brightness of a rectangle of buttons (e.g. 0.5 for half as bright as the rest)
+        setRegionBrightness(x,y,w,h,scale)
+
+    def preloadSounds(self,keys):
+        # Keeps the sounds the active game plays often loaded, replacing the previous set
+        self.pinnedSounds = list(keys)
+        self.sounds.pin(keys)
+
+
+def openWave(path):
+    return WaveFile(open(path, "rb"), bytearray(WAVE_BUFFER_SIZE))
+
+def waveCost(path,wave):
+    return WAVE_BUFFER_SIZE
+
+def closeWave(wave):
+    wave.deinit()
 
 
 # Track long single button presses to use to over-ride game classes
@@ -94,108 +177,115 @@ lastBtnPressed = [-1,-1]
 lastPressTime = 0
 longPressInterval = 1000000000
 
-# Track time since last hardware sync, so we give at a least 17ms pause between sync requests
-lastSyncTime = 0
-
-# Set the brightness value (0 to 1.0)
-trellis.brightness = 0.1
-
-# some color definitions
-leds = [[0,0,0],[0,0,0],[0,0,0],[0,0,0],
-        [0,0,0],[0,0,0],[0,0,0],[0,0,0],
-        [0,0,0],[0,0,0],[0,0,0],[0,0,0],
-        [0,0,0],[0,0,0],[0,0,0],[0,0,0],
-        [0,0,0],[0,0,0],[0,0,0],[0,0,0],
-        [0,0,0],[0,0,0],[0,0,0],[0,0,0],
-        [0,0,0],[0,0,0],[0,0,0],[0,0,0],
-        [0,0,0],[0,0,0],[0,0,0],[0,0,0],
-        [0,0,0],[0,0,0],[0,0,0],[0,0,0],
-        [0,0,0],[0,0,0],[0,0,0],[0,0,0],
-        [0,0,0],[0,0,0],[0,0,0],[0,0,0],
-        [0,0,0],[0,0,0],[0,0,0],[0,0,0],
-        [0,0,0],[0,0,0],[0,0,0],[0,0,0],
-        [0,0,0],[0,0,0],[0,0,0],[0,0,0],
-        [0,0,0],[0,0,0],[0,0,0],[0,0,0],
-        [0,0,0],[0,0,0],[0,0,0],[0,0,0],
-        [0,0,0],[0,0,0],[0,0,0],[0,0,0],
-        [0,0,0],[0,0,0],[0,0,0],[0,0,0],
-        [0,0,0],[0,0,0],[0,0,0],[0,0,0],
-        [0,0,0],[0,0,0],[0,0,0],[0,0,0],
-        [0,0,0],[0,0,0],[0,0,0],[0,0,0],
-        [0,0,0],[0,0,0],[0,0,0],[0,0,0],
-        [0,0,0],[0,0,0],[0,0,0],[0,0,0],
-        [0,0,0],[0,0,0],[0,0,0],[0,0,0],
-        [0,0,0],[0,0,0],[0,0,0],[0,0,0],
-        [0,0,0],[0,0,0],[0,0,0],[0,0,0],
-        [0,0,0],[0,0,0],[0,0,0],[0,0,0],
-        [0,0,0],[0,0,0],[0,0,0],[0,0,0],
-        [0,0,0],[0,0,0],[0,0,0],[0,0,0],
-        [0,0,0],[0,0,0],[0,0,0],[0,0,0],
-        [0,0,0],[0,0,0],[0,0,0],[0,0,0],
-        [0,0,0],[0,0,0],[0,0,0],[0,0,0],
-        [0,0,0],[0,0,0],[0,0,0],[0,0,0],
-        [0,0,0],[0,0,0],[0,0,0],[0,0,0],
-        [0,0,0],[0,0,0],[0,0,0],[0,0,0],
-        [0,0,0],[0,0,0],[0,0,0],[0,0,0],
-        ]
+# Gamma and brightness tables (brightness 0 to 1.0), applied to the colours as they are sent to the boards.
+# The gamma curve darkens the mid tones, so start a step brighter than the 0.1 used before it.
+ledLevels = LedLevels(dimX, dimY, 0.2)
+
+# Shadow framebuffer holding the LED colours, changes are sent to the boards once per frame by flushLeds()
+frameBuffer = FrameBuffer(dimX, dimY)
+
+# Counts of what each frame does, ended by each flush
+counters = FrameCounters()
+
+# Seesaw registers for writing the pixel buffer of a NeoTrellis board directly. The buffer takes
+# at most 30 bytes of data per write, so runs of up to 10 pixels are sent in one transaction.
+NEOPIXEL_BASE = 0x0E
+NEOPIXEL_BUF = 0x04
+NEOPIXEL_SHOW = 0x05
+NEOPIXEL_RUN = 10
+
+# Scratch buffer for the pixel data of one board in the order the seesaw expects (GRB)
+boardBuf = bytearray(16 * 3)
 
 
 def setColour(x,y,colour,store=True):
     if 0 <= x <= 11 and 0 <= y <= 11:
-        if store:
-            leds[y * dimY + x] = colour
-        trellis.color(x, y, colour)
+        frameBuffer.set(x, y, colour, store)
         #print(f"At {x},{y}: {colour}")
     else:
-        print(f"Request to set colour outside trellis at: {x},{y}")
+        log.warning("Request to set colour outside trellis at: %d,%d", x, y)
 
 
 def getColour(x,y):
-    return leds[y * dimY + x]
+    counters.getColour += 1
+    return frameBuffer.get(x, y)
+
+
+def writeBoard(bx, by, first, last):
+    # Encode the changed rows of the board through the gamma and brightness table of each button
+    tables = ledLevels.tables
+    regionMap = ledLevels.regionMap
+    for r in range(first // 4, last // 4 + 1):
+        row = frameBuffer.boardRow(bx, by, r)
+        base = (by * 4 + r) * dimX + bx * 4
+        for k in range(4):
+            table = tables[regionMap[base + k]]
+            i = (r * 4 + k) * 3
+            j = k * 3
+            boardBuf[i] = table[row[j + 1]]
+            boardBuf[i + 1] = table[row[j]]
+            boardBuf[i + 2] = table[row[j + 2]]
+    # Send the range of changed pixels in as few buffer writes as possible, then show them
+    t = trelli[by][bx]
+    for start in range(first, last + 1, NEOPIXEL_RUN):
+        end = min(start + NEOPIXEL_RUN, last + 1)
+        t.write(NEOPIXEL_BASE, NEOPIXEL_BUF, bytes([0, start * 3]) + boardBuf[start * 3:end * 3])
+    t.write(NEOPIXEL_BASE, NEOPIXEL_SHOW)
+    counters.pixelsSent += last - first + 1
+
+
+def flushLeds():
+    """
+    Sends the LED colours changed since the last flush to the boards, with one show per board
+    """
+    frameBuffer.flush(writeBoard)
+
+
+def setBrightness(brightness):
+    """
+    Sets the brightness of all the boards (0 to 1.0). The brightness is applied as pixels are
+    sent to the boards, so the tables are swapped and all pixels are sent again on the next flush.
+    """
+    ledLevels.setBrightness(brightness)
+    frameBuffer.invalidate()
+
+
+def setRegionBrightness(x,y,w,h,scale):
+    """
+    Sets the brightness of a rectangle of buttons relative to the overall brightness
+    """
+    ledLevels.setRegion(x,y,w,h,scale)
+    frameBuffer.invalidate()
 
 
 def gridReset(colour):
     """
     Resets all lights and stored colours to the same colour value
     """
-    for y in range(dimY):
-        for x in range(dimX):
-            setColour( x, y, colour )
+    frameBuffer.fill(colour)
 
 
 def longPress(x,y):
-    global activeGame
-    
-    print(f"Button long press at {x},{y} (was colour: {getColour(x,y)})")
+    # Read the colour from the frame buffer rather than getColour, so it is not counted
+    log.info("Button long press at %d,%d (was colour: %s)", x, y, frameBuffer.get(x,y))
     if y == 0:
         if x == 6:
-            trellis.brightness = 0.1
+            setBrightness(0.1)
         elif x == 7:
-            trellis.brightness = 0.2
+            setBrightness(0.2)
         elif x == 8:
-            trellis.brightness = 0.4
+            setBrightness(0.4)
         elif x == 9:
-            trellis.brightness = 0.6
+            setBrightness(0.6)
         elif x == 10:
-            trellis.brightness = 0.8
-        elif x == 11:
-            trellis.brightness = 1.0
-        else:
-            # Pass unhandled long press events to active game
-            activeGame.longPressEvent(x,y)
-    elif y == 11:
-        if x == 0:
-            gridReset((50,0,50))
-            activeGame = BtnDemo(host)
-        elif x == 1:
-            # gridReset((10,10,10))
-            activeGame = Battleships(host)
+            setBrightness(0.8)
         elif x == 11:
-            gridReset((0,0,0))
-            activeGame = RainDemo(host)
+            setBrightness(1.0)
         else:
             # Pass unhandled long press events to active game
             activeGame.longPressEvent(x,y)
+    elif games.launcher(x, y) is not None:
+        switchGame(games.launcher(x, y))
     else:
         # Pass unhandled long press events to active game
         activeGame.longPressEvent(x,y)
@@ -204,31 +294,58 @@ def longPress(x,y):
     host.restoreColour(x,y)
 
 
-# this will be called when button events are received
-def btnHandler(x, y, edge):
+def switchGame(name):
+    """
+    Switches to the game of the class named, resuming it if it was suspended (see games.py)
+    """
+    global activeGame
+
+    # Suspend the active game (or drop it to start it again), then resume or load the new game
+    loader.leave(activeGame, host, name)
+    activeGame = None
+    activeGame = loader.enter(name, host)
+
+
+# Button events recorded during the trellis sync, dispatched to btnHandler once all boards are read
+eventQueue = EventQueue()
+
+
+# this will be called by the trellis sync when button events are received
+def btnCallback(x, y, edge):
+    eventQueue.push(x, y, edge == NeoTrellis.EDGE_RISING, host.clock.read())
+
+
+# this will be called for each button event after the trellis sync
+def btnHandler(x, y, press, timestamp):
     global lastBtnPressed, lastPressTime
     
     #print(f"Button pressed {x},{y}")
+    counters.events += 1
+    host.eventTime = timestamp
     # Check for button pressed and released events, and pass to active game class
-    if edge == NeoTrellis.EDGE_RISING:
+    if press:
         # Store position of button for checking for long press events
         lastBtnPressed = [x,y]
         # Call active game class button event handler
+        started = time.monotonic_ns()
         activeGame.btnEvent(x,y,True)
-    elif edge == NeoTrellis.EDGE_FALLING:
+        counters.btnEventNs += time.monotonic_ns() - started
+    else:
         # Check for long button press
-        if (lastBtnPressed == [x,y]) and ((time.monotonic_ns() - lastPressTime) > longPressInterval):
+        if (lastBtnPressed == [x,y]) and ((timestamp - lastPressTime) > longPressInterval):
             # Long press
             setColour(x, y, (0,0,0), False)
             longPress(x, y)
 
     # Call active game class button event handler
+        started = time.monotonic_ns()
         activeGame.btnEvent(x,y,False)
+        counters.btnEventNs += time.monotonic_ns() - started
         # Clear last pressed position on any button release
         lastBtnPressed = [-1,-1]
     
     # Reset last press time on any button event
-    lastPressTime = time.monotonic_ns()
+    lastPressTime = timestamp
         
         
 for y in range(dimY):
@@ -237,32 +354,76 @@ for y in range(dimY):
         trellis.activate_key(x, y, NeoTrellis.EDGE_RISING)
         # Activate falling edge events on all keys
         trellis.activate_key(x, y, NeoTrellis.EDGE_FALLING)
-        trellis.set_callback(x, y, btnHandler)
-        trellis.color( x, y, (100, 0, 255) )
-
-host = Host(getColour,setColour,audio)
-
-activeGame = Battleships(host)
-
-while True:
-    timenow = time.monotonic_ns()
-    if timenow - lastSyncTime > 18000:
-        lastSyncTime = timenow
-        # The NeoTrellis can only be read every 17 milliseconds or so
-        trellis.sync()
-        activeGame.animate()
-
-        if (lastBtnPressed[0] >= 0) and ((time.monotonic_ns() - lastPressTime) > longPressInterval):
-            #Long press will be activated when key is lifted, so indicate with colour change
-            longPressColour = RED
-            #Use a different colour to the one this button is currently showing
-            colourNow = getColour(lastBtnPressed[0], lastBtnPressed[1])
-            if colourNow == RED:
-                longPressColour = ORANGE
-            #print(f"Long press activated for position {lastBtnPressed[0]},{lastBtnPressed[1]}")
-            setColour(lastBtnPressed[0], lastBtnPressed[1], longPressColour, False )
-
-        if bootBtn.value == False:
-            print("Boot button pressed.")
-        
-    time.sleep(0.002)
+        trellis.set_callback(x, y, btnCallback)
+        setColour( x, y, (100, 0, 255), False )
+flushLeds()
+
+host = Host(getColour,setColour,VoicePool(mixer.voice),frameBuffer,ledLevels,counters)
+
+# Games are imported when they are started, so only the active game is loaded
+loader = games.GameLoader()
+activeGame = loader.load(games.BOOT_GAME, host)
+
+def pollInput(timenow):
+    global bootBtnDown
+
+    # Read button events from all the boards, then pass them to btnHandler
+    started = time.monotonic_ns()
+    trellis.sync()
+    counters.syncNs += time.monotonic_ns() - started
+    eventQueue.dispatch(btnHandler)
+
+    if (lastBtnPressed[0] >= 0) and ((timenow - lastPressTime) > longPressInterval):
+        #Long press will be activated when key is lifted, so indicate with colour change
+        longPressColour = RED
+        #Use a different colour to the one this button is currently showing
+        colourNow = getColour(lastBtnPressed[0], lastBtnPressed[1])
+        if colourNow == RED:
+            longPressColour = ORANGE
+        #print(f"Long press activated for position {lastBtnPressed[0]},{lastBtnPressed[1]}")
+        setColour(lastBtnPressed[0], lastBtnPressed[1], longPressColour, False )
+
+    # Report once when the boot button is pressed, not on every poll while it is held
+    pressed = bootBtn.value == False
+    if pressed and not bootBtnDown:
+        print("Boot button pressed.")
+        print(scheduler.report())
+        print(counters.report())
+        log.dump()
+    bootBtnDown = pressed
+
+
+def animateGame(timenow):
+    # Run the animation frames which are due, then the game's own animate method
+    started = time.monotonic_ns()
+    host.animator.update(timenow)
+    activeGame.animate()
+    counters.animateNs += time.monotonic_ns() - started
+
+
+def flushFrame(timenow):
+    # Send all the LED changes made since the last flush to the boards
+    flushLeds()
+    # Count the buttons written by setColour and the bulk drawing methods in this frame
+    counters.written += frameBuffer.writes
+    counters.changed += frameBuffer.changes
+    frameBuffer.writes = 0
+    frameBuffer.changes = 0
+    counters.endFrame()
+
+
+def reportCounters(timenow):
+    # Print what the frames did over the last report interval
+    print(f"{type(activeGame).__name__}: {counters.report()}")
+    counters.reset()
+
+
+# Run the input and LED jobs each at their own rate, and the game when it asked to be woken,
+# sleeping in between
+scheduler = FrameScheduler(host.clock)
+scheduler.every("input", INPUT_INTERVAL, pollInput)
+scheduler.onWake("animate", animateGame)
+scheduler.every("flush", FLUSH_INTERVAL, flushFrame)
+if PERF_REPORT_INTERVAL is not None:
+    scheduler.every("perf", PERF_REPORT_INTERVAL, reportCounters)
+scheduler.run()
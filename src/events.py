@@ -0,0 +1,74 @@
+# Button event queue for the NeoTrellis host programs
+
+# Copyright (C) 2023 Paul 'Footleg' Fretwell
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+The trellis sync callback only records each button event in the queue, with the time it was
+captured. The host dispatches the queued events to the game after the sync of all the boards
+has finished, so a slow game handler cannot hold up reading the remaining boards.
+
+The queue is a fixed size ring buffer, so recording an event allocates nothing. If the queue
+fills up before it is dispatched, further events are dropped and counted.
+"""
+
+# Default number of events the queue can hold between dispatches
+QUEUE_SIZE = 32
+
+
+class EventQueue:
+    def __init__(self, size=QUEUE_SIZE):
+        self.size = size
+        self.xs = bytearray(size)
+        self.ys = bytearray(size)
+        self.presses = bytearray(size)
+        self.times = [0] * size
+        self.head = 0
+        self.count = 0
+        self.dropped = 0
+
+    def push(self, x, y, press, timestamp):
+        """
+        Records a button event (press True for a button press, False for a release).
+        Returns False if the queue is full and the event was dropped.
+        """
+        if self.count >= self.size:
+            self.dropped += 1
+            return False
+        idx = (self.head + self.count) % self.size
+        self.xs[idx] = x
+        self.ys[idx] = y
+        self.presses[idx] = 1 if press else 0
+        self.times[idx] = timestamp
+        self.count += 1
+        return True
+
+    def dispatch(self, handler):
+        """
+        Calls handler(x, y, press, timestamp) for each queued event, oldest first, emptying the
+        queue. Events queued by the handler itself are dispatched in the same call. Returns the
+        number of events dispatched.
+        """
+        dispatched = 0
+        while self.count > 0:
+            idx = self.head
+            self.head = (self.head + 1) % self.size
+            self.count -= 1
+            handler(self.xs[idx], self.ys[idx], self.presses[idx] == 1, self.times[idx])
+            dispatched += 1
+        return dispatched
+
+    def __len__(self):
+        return self.count
@@ -0,0 +1,270 @@
+# Shadow framebuffer for the LEDs of a multi board NeoTrellis matrix
+
+# Copyright (C) 2023 Paul 'Footleg' Fretwell
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+The framebuffer holds a shadow copy of the LED colours so that setting a colour does not write
+to the hardware straight away. Changes are recorded per NeoTrellis board and sent to the
+hardware in one flush per frame, which only sends the boards whose pixels differ from what
+the board is already showing.
+
+Colours are kept as RGB byte triples in bytearrays (3 bytes per button, row by row), so the
+whole matrix takes a few hundred bytes of heap in three fixed allocations. Backends read the
+displayed colours through memoryview slices of a row, or of one row of a board, without copying.
+"""
+
+# Each NeoTrellis board is a 4x4 grid of buttons
+BOARD_SIZE = 4
+
+
+class FrameBuffer:
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.boardsX = width // BOARD_SIZE
+        self.boardsY = height // BOARD_SIZE
+
+        size = width * height * 3
+        # Stored colours of each button (returned by get)
+        self.leds = bytearray(size)
+        # Colours to display on each button, including transient colours which are not stored
+        self.frame = bytearray(size)
+        # Colours last sent to the hardware
+        self.shown = bytearray(size)
+        self.frameView = memoryview(self.frame)
+
+        boards = self.boardsX * self.boardsY
+        # Flags for the boards with pixels changed since the last flush
+        self.boardDirty = bytearray(boards)
+        # Flags for the boards which must be sent in full on the next flush
+        self.boardResend = bytearray(boards)
+        # Nothing has been sent to the hardware yet
+        self.invalidate()
+
+        # Number of buttons written, and of those whose displayed colour changed, by all the
+        # drawing methods (cleared by the host as it counts them for each frame)
+        self.writes = 0
+        self.changes = 0
+
+    def set(self, x, y, colour, store=True):
+        """
+        Sets the colour of button x,y, returning True if the colour shown changed
+        """
+        idx = (y * self.width + x) * 3
+        r, g, b = colour
+        self.writes += 1
+        if store:
+            leds = self.leds
+            leds[idx] = r
+            leds[idx + 1] = g
+            leds[idx + 2] = b
+        frame = self.frame
+        if frame[idx] != r or frame[idx + 1] != g or frame[idx + 2] != b:
+            frame[idx] = r
+            frame[idx + 1] = g
+            frame[idx + 2] = b
+            self.boardDirty[(y // BOARD_SIZE) * self.boardsX + x // BOARD_SIZE] = 1
+            self.changes += 1
+            return True
+        return False
+
+    def fillRect(self, x, y, w, h, colour, store=True):
+        """
+        Sets all buttons in the rectangle with top left corner x,y to the same colour. The
+        rectangle is clipped to the matrix.
+        """
+        x0 = max(x, 0)
+        y0 = max(y, 0)
+        x1 = min(x + w, self.width)
+        y1 = min(y + h, self.height)
+        if x0 >= x1 or y0 >= y1:
+            return
+        pattern = bytes(colour) * (x1 - x0)
+        self.writes += (x1 - x0) * (y1 - y0)
+        for row in range(y0, y1):
+            start = (row * self.width + x0) * 3
+            end = (row * self.width + x1) * 3
+            if store:
+                self.leds[start:end] = pattern
+            if self.frame[start:end] != pattern:
+                self.changes += self.countChanged(start, pattern)
+                self.frame[start:end] = pattern
+                self.markDirty(x0, x1 - 1, row)
+
+    def fill(self, colour, store=True):
+        self.fillRect(0, 0, self.width, self.height, colour, store)
+
+    def drawRow(self, x, y, length, colour, store=True):
+        self.fillRect(x, y, length, 1, colour, store)
+
+    def drawColumn(self, x, y, length, colour, store=True):
+        self.fillRect(x, y, 1, length, colour, store)
+
+    def drawPolyline(self, points, colour, length=None, store=True):
+        """
+        Draws lines joining each point (x,y) in the list to the next. If length is given only
+        that many buttons along the line from the first point are drawn. Returns the number of
+        buttons drawn.
+        """
+        drawn = 0
+        for i in range(len(points)):
+            x, y = points[i]
+            if i > 0 and (x == points[i - 1][0] or y == points[i - 1][1]):
+                # Horizontal or vertical line from the previous point (which was drawn already)
+                x0, y0 = points[i - 1]
+                n = max(abs(x - x0), abs(y - y0))
+                if length is not None:
+                    n = min(n, length - drawn)
+                if n <= 0:
+                    continue
+                sx = (x > x0) - (x < x0)
+                sy = (y > y0) - (y < y0)
+                ex = x0 + sx * n
+                ey = y0 + sy * n
+                self.fillRect(min(x0 + sx, ex), min(y0 + sy, ey), abs(ex - x0) or 1, abs(ey - y0) or 1, colour, store)
+                drawn += n
+            elif i > 0:
+                # Step from the previous point to this one (Bresenham), the start was drawn already
+                x0, y0 = points[i - 1]
+                dx = abs(x - x0)
+                dy = -abs(y - y0)
+                sx = 1 if x0 < x else -1
+                sy = 1 if y0 < y else -1
+                err = dx + dy
+                while x0 != x or y0 != y:
+                    e2 = 2 * err
+                    if e2 >= dy:
+                        err += dy
+                        x0 += sx
+                    if e2 <= dx:
+                        err += dx
+                        y0 += sy
+                    if length is not None and drawn >= length:
+                        return drawn
+                    if 0 <= x0 < self.width and 0 <= y0 < self.height:
+                        self.set(x0, y0, colour, store)
+                    drawn += 1
+            elif length is None or length > 0:
+                if 0 <= x < self.width and 0 <= y < self.height:
+                    self.set(x, y, colour, store)
+                drawn += 1
+        return drawn
+
+    def blit(self, buffer, x=0, y=0, width=None, store=True):
+        """
+        Copies a block of colours (RGB bytes, row by row, width buttons per row) to the matrix with
+        its top left corner at x,y. The width defaults to the width of the matrix, so a copy of the
+        whole frame can be restored with blit(buffer). The block is clipped to the matrix.
+        """
+        if width is None:
+            width = self.width
+        height = len(buffer) // (width * 3)
+        view = memoryview(buffer)
+        x0 = max(x, 0)
+        x1 = min(x + width, self.width)
+        if x0 >= x1:
+            return
+        for row in range(max(y, 0), min(y + height, self.height)):
+            src = ((row - y) * width + x0 - x) * 3
+            srcEnd = src + (x1 - x0) * 3
+            start = (row * self.width + x0) * 3
+            end = (row * self.width + x1) * 3
+            self.writes += x1 - x0
+            if store:
+                self.leds[start:end] = view[src:srcEnd]
+            if self.frame[start:end] != buffer[src:srcEnd]:
+                self.changes += self.countChanged(start, buffer[src:srcEnd])
+                self.frame[start:end] = view[src:srcEnd]
+                self.markDirty(x0, x1 - 1, row)
+
+    def countChanged(self, start, colours):
+        # Number of buttons from frame offset start which differ from the run of colours
+        frame = self.frame
+        changed = 0
+        for i in range(0, len(colours), 3):
+            j = start + i
+            if frame[j] != colours[i] or frame[j + 1] != colours[i + 1] or frame[j + 2] != colours[i + 2]:
+                changed += 1
+        return changed
+
+    def markDirty(self, x0, x1, y):
+        # Flag the boards covering buttons x0 to x1 of row y as changed
+        base = (y // BOARD_SIZE) * self.boardsX
+        for bx in range(x0 // BOARD_SIZE, x1 // BOARD_SIZE + 1):
+            self.boardDirty[base + bx] = 1
+
+    def get(self, x, y):
+        idx = (y * self.width + x) * 3
+        leds = self.leds
+        return (leds[idx], leds[idx + 1], leds[idx + 2])
+
+    def invalidate(self):
+        """
+        Marks every pixel to be sent on the next flush, e.g. after the hardware brightness changes
+        """
+        for board in range(len(self.boardDirty)):
+            self.boardDirty[board] = 1
+            self.boardResend[board] = 1
+
+    def row(self, y):
+        """
+        Returns a memoryview of the displayed colours of row y (3 bytes per button)
+        """
+        start = y * self.width * 3
+        return self.frameView[start:start + self.width * 3]
+
+    def boardRow(self, bx, by, r):
+        """
+        Returns a memoryview of the displayed colours of row r (0-3) of board bx,by
+        """
+        start = ((by * BOARD_SIZE + r) * self.width + bx * BOARD_SIZE) * 3
+        return self.frameView[start:start + BOARD_SIZE * 3]
+
+    def flush(self, writeBoard):
+        """
+        Sends the changed pixels to the hardware, grouped by board. writeBoard(bx, by, first, last)
+        is called once for each board which changed, with the range of keys (0-15 within the board)
+        to send. The colours are read from the frame (e.g. using boardRow). Returns the number of
+        pixels in the ranges sent.
+        """
+        frame = self.frame
+        shown = self.shown
+        written = 0
+        for board in range(len(self.boardDirty)):
+            if not self.boardDirty[board]:
+                continue
+            self.boardDirty[board] = 0
+            resend = self.boardResend[board]
+            self.boardResend[board] = 0
+            bx = board % self.boardsX
+            by = board // self.boardsX
+            # Find the range of keys on this board which differ from what was last sent
+            first = -1
+            last = -1
+            for r in range(BOARD_SIZE):
+                start = ((by * BOARD_SIZE + r) * self.width + bx * BOARD_SIZE) * 3
+                for k in range(BOARD_SIZE):
+                    idx = start + k * 3
+                    if resend or frame[idx] != shown[idx] or frame[idx + 1] != shown[idx + 1] or frame[idx + 2] != shown[idx + 2]:
+                        if first < 0:
+                            first = r * BOARD_SIZE + k
+                        last = r * BOARD_SIZE + k
+                if first >= 0:
+                    shown[start:start + BOARD_SIZE * 3] = self.frameView[start:start + BOARD_SIZE * 3]
+            if first >= 0:
+                writeBoard(bx, by, first, last)
+                written += last - first + 1
+        return written
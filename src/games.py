@@ -0,0 +1,207 @@
+# Game registry and loader for the NeoTrellis host programs
+
+# Copyright (C) 2023 Paul 'Footleg' Fretwell
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+The games are listed here by class name with the module they are in, rather than imported by
+the hosts, so only the game being played is loaded. A long press on a launcher cell of the
+bottom row switches to the game listed for that cell.
+
+Switching away from a game suspends it: the loader keeps the game with the frame it was showing,
+its brightness regions, its animations and its pinned sounds. Switching back resumes it where it
+was left, restoring the frame in one flush of the pixels which differ, without the game drawing
+anything. Games can define suspend() and resume() methods, which are called if they exist.
+Long pressing the launcher of the active game starts it again.
+
+A bounded number of games are kept suspended. When one is dropped (or restarted) its module is
+removed from sys.modules, so once the host drops its references the garbage collection frees
+it, and starting the game again imports its module again. The time each load took and the
+change in free memory are logged (free memory is only known on CircuitPython).
+
+To add a game, list its class in GAMES and give it a launcher cell in LAUNCHERS.
+"""
+
+import gc
+import sys
+import time
+import log
+
+# Module and the colour the matrix is cleared to before the game starts (None to leave the LEDs
+# as they are) of each game, by class name. Input logs name the game by class name.
+GAMES = {
+    "BtnDemo": ("btn_demo", (50, 0, 50)),
+    "Battleships": ("trellisbattleships", None),
+    "RainDemo": ("rain_demo", (0, 0, 0)),
+}
+
+# Row of the launcher cells, and the game launched by a long press on each cell of the row by x
+LAUNCH_ROW = 11
+LAUNCHERS = {
+    0: "BtnDemo",
+    1: "Battleships",
+    11: "RainDemo",
+}
+
+# Game started when the host boots
+BOOT_GAME = "Battleships"
+
+# Number of games kept suspended when switching away from them, so they can be resumed where
+# they were left. The least recently played game is dropped when there are more. One keeps at
+# most two games in memory, so switching back and forth between two games resumes them while
+# a third game frees the first.
+MAX_SUSPENDED = 1
+
+
+def launcher(x, y):
+    """
+    Returns the class name of the game launched from button x,y, or None if it is not a launcher cell
+    """
+    if y != LAUNCH_ROW:
+        return None
+    return LAUNCHERS.get(x)
+
+
+def clearColour(name):
+    return GAMES[name][1]
+
+
+def memFree():
+    # Free heap memory in bytes, or None where the gc module does not report it (CPython)
+    if hasattr(gc, "mem_free"):
+        return gc.mem_free()
+    return None
+
+
+class SuspendedGame:
+    # A game switched away from, with what it had on the host when it was suspended
+    def __init__(self, name, game, leds, levels, animations, sounds, at):
+        self.name = name
+        self.game = game
+        self.leds = leds
+        self.levels = levels
+        self.animations = animations
+        self.sounds = sounds
+        self.at = at
+
+
+class GameLoader:
+    def __init__(self, maxSuspended=MAX_SUSPENDED):
+        self.maxSuspended = maxSuspended
+        # Suspended games, least recently played first
+        self.suspended = []
+        # Brightness regions of the game left, to tell if the resumed game's regions differ
+        self.leftLevels = None
+        # Time taken by the last load or resume (ns), the memory freed by the games dropped and
+        # the memory used by the new game (bytes, None if not known)
+        self.loadNs = 0
+        self.memFreed = None
+        self.memUsed = None
+        # Free memory before the previous game was left
+        self.freeStart = None
+
+    def leave(self, game, host, nextName):
+        """
+        Suspends the active game before switching to the named game, and clears what the game
+        set up on the host. A game left to start again is dropped rather than suspended. The host
+        must drop its references to the game afterwards, so a dropped game can be freed.
+        """
+        gc.collect()
+        self.freeStart = memFree()
+        name = type(game).__name__
+        self.leftLevels = host.levels.snapshot()
+        if name == nextName or self.maxSuspended == 0:
+            self.dropModule(name)
+            host.animator.cancelAll()
+        else:
+            if hasattr(game, "suspend"):
+                game.suspend()
+            # Keep the colours and brightness regions the game set, its animations and the sounds
+            # it pinned, to put back when it is resumed. Transient colours (such as the long press
+            # indicator) are not kept.
+            self.suspended.append(SuspendedGame(name, game, bytes(host.frameBuffer.leds), self.leftLevels,
+                                                host.animator.detach(), host.pinnedSounds, host.clock.now))
+        host.preloadSounds([])
+        host.levels.clearRegions()
+
+    def enter(self, name, host):
+        """
+        Returns the named game to make active, resuming it if it is suspended or else loading a
+        new game
+        """
+        resumed = None
+        for i in range(len(self.suspended)):
+            if self.suspended[i].name == name:
+                resumed = self.suspended.pop(i)
+                break
+        while len(self.suspended) > self.maxSuspended:
+            # Drop the game which was played least recently
+            self.dropModule(self.suspended.pop(0).name)
+        if resumed is not None:
+            return self.resume(resumed, host)
+        colour = clearColour(name)
+        if colour is not None:
+            host.fill(colour)
+        # Every pixel is sent again after the brightness regions are cleared
+        host.frameBuffer.invalidate()
+        return self.load(name, host)
+
+    def resume(self, suspended, host):
+        started = time.monotonic_ns()
+        # Put back the colours the game set in one copy, so only the pixels which differ from the
+        # previous game are sent in the next flush
+        host.blit(suspended.leds)
+        host.levels.restore(suspended.levels)
+        if suspended.levels != self.leftLevels:
+            host.frameBuffer.invalidate()
+        host.preloadSounds(suspended.sounds)
+        # Carry on the animations from where they were suspended
+        host.animator.attach(suspended.animations, host.clock.now - suspended.at)
+        game = suspended.game
+        if hasattr(game, "resume"):
+            game.resume()
+        self.loadNs = time.monotonic_ns() - started
+        log.info("Resumed %s in %.1fms", suspended.name, self.loadNs / 1000000)
+        return game
+
+    def dropModule(self, name):
+        # Remove the module of a game from sys.modules, so it is freed along with the game
+        moduleName = GAMES[name][0]
+        if moduleName in sys.modules:
+            del sys.modules[moduleName]
+
+    def load(self, name, host):
+        """
+        Imports the module of the named game and returns a new game on the host
+        """
+        moduleName = GAMES[name][0]
+        gc.collect()
+        freeBefore = memFree()
+        started = time.monotonic_ns()
+        module = __import__(moduleName)
+        game = getattr(module, name)(host)
+        self.loadNs = time.monotonic_ns() - started
+        gc.collect()
+        freeAfter = memFree()
+        if freeAfter is not None:
+            self.memUsed = freeBefore - freeAfter
+            self.memFreed = freeBefore - self.freeStart if self.freeStart is not None else 0
+        self.freeStart = None
+        if self.memUsed is not None:
+            log.info("Loaded %s in %.1fms using %d bytes, %d bytes freed by the previous game",
+                     name, self.loadNs / 1000000, self.memUsed, self.memFreed)
+        else:
+            log.info("Loaded %s in %.1fms", name, self.loadNs / 1000000)
+        return game
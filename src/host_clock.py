@@ -0,0 +1,98 @@
+# Game time clocks for the NeoTrellis host programs
+
+# Copyright (C) 2023 Paul 'Footleg' Fretwell
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+The host exposes a clock to the games as host.clock. Games read the time of the current tick
+from clock.now (in nanoseconds) instead of reading the system time themselves, and tell the
+clock when they next need to animate by calling clock.wakeAt(time). The host reads the real
+time once per tick, and a simulated clock can jump straight to the next deadline a game asked
+for, so game time can be fast-forwarded.
+"""
+
+import time
+
+
+class Clock:
+    """
+    Clock driven by the monotonic system time, read once per tick
+    """
+    def __init__(self):
+        self.now = time.monotonic_ns()
+        self.deadline = None
+
+    def tick(self):
+        """
+        Reads the time for the current tick and returns it
+        """
+        self.now = time.monotonic_ns()
+        self.expireDeadline()
+        return self.now
+
+    def read(self):
+        """
+        Returns the current time without changing the time of the tick (e.g. to timestamp events)
+        """
+        return time.monotonic_ns()
+
+    def expireDeadline(self):
+        # The requested wake time is served by the tick which reaches it
+        if self.deadline is not None and self.deadline <= self.now:
+            self.deadline = None
+
+    def wakeAt(self, t):
+        """
+        Requests a tick at (or after) time t. The earliest pending request is kept.
+        A time which has already passed requests the next tick.
+        """
+        if self.deadline is None or t < self.deadline:
+            self.deadline = t
+
+    def nextDeadline(self):
+        """
+        Returns the earliest requested wake time, or None if no game has requested one
+        """
+        return self.deadline
+
+
+class SimClock(Clock):
+    """
+    Simulated clock which only moves when told to, so game time can run faster than real time
+    """
+    def __init__(self, start=0):
+        self.now = start
+        self.deadline = None
+
+    def tick(self):
+        self.expireDeadline()
+        return self.now
+
+    def read(self):
+        return self.now
+
+    def advance(self, ns):
+        self.now += ns
+        return self.now
+
+    def skipToDeadline(self):
+        """
+        Jumps to the next requested wake time. Returns False if no wake time is pending.
+        """
+        if self.deadline is None:
+            return False
+        if self.deadline > self.now:
+            self.now = self.deadline
+        return True
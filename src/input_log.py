@@ -0,0 +1,169 @@
+# Button input recording and replay for the Neotrellis Simulator
+
+# Copyright (C) 2023 Paul 'Footleg' Fretwell
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Records the button events passed to the host btnHandler as a compact text log, and replays
+logs on the headless simulator host at any speed.
+
+The log starts with a header line giving the format version, the game running when recording
+started and the seed of the random number generator (so Battleships places the same ships):
+
+    neotrellis-input 1 Battleships 2864434397
+
+followed by one line per button event: the time since the previous event in microseconds,
+the button x and y, and 1 for a press or 0 for a release:
+
+    1520331 5 6 1
+    183004 5 6 0
+
+Logs are read a line at a time, so long sessions replay without loading the whole file.
+
+Replay a log from the command line with:
+    python input_log.py session.log --speed 4
+"""
+
+import argparse
+import random
+import sys
+import time
+
+import log
+import sim_host
+from tracing import Tracer
+from host_clock import SimClock
+
+LOG_MAGIC = "neotrellis-input"
+LOG_VERSION = 1
+
+# Game time allowed after the last event of a replay for animations to finish
+SETTLE_TIME = 10000000000
+
+
+class InputRecorder:
+    """
+    Writes button events to a stream in the input log format
+    """
+    def __init__(self, stream, gameName, seed, start):
+        self.stream = stream
+        self.lastTime = start
+        self.events = 0
+        stream.write(f"{LOG_MAGIC} {LOG_VERSION} {gameName} {seed}\n")
+
+    def record(self, x, y, press, timestamp):
+        deltaUs = (timestamp - self.lastTime) // 1000
+        # Keep the remainder, so rounding to microseconds never accumulates
+        self.lastTime += deltaUs * 1000
+        self.stream.write(f"{deltaUs} {x} {y} {1 if press else 0}\n")
+        self.stream.flush()
+        self.events += 1
+
+    def close(self):
+        self.stream.close()
+
+
+def readHeader(stream):
+    """
+    Reads the header line of an input log, returning the game name and random seed
+    """
+    fields = stream.readline().split()
+    if len(fields) != 4 or fields[0] != LOG_MAGIC:
+        raise ValueError("Not a neotrellis input log")
+    if int(fields[1]) != LOG_VERSION:
+        raise ValueError(f"Unsupported input log version: {fields[1]}")
+    return fields[2], int(fields[3])
+
+
+def readEvents(stream, start=0):
+    """
+    Generates (timestamp, x, y, press) for each event in the log stream after the header,
+    with timestamps in ns counted from start
+    """
+    timestamp = start
+    for line in stream:
+        fields = line.split()
+        if not fields:
+            continue
+        timestamp += int(fields[0]) * 1000
+        yield timestamp, int(fields[1]), int(fields[2]), fields[3] == "1"
+
+
+def replay(stream, speed=0, host=None, trellis=None, audio=None, tracer=None):
+    """
+    Replays an input log into a headless host with a simulated clock, ticking at every wake
+    time the games request between events. A speed of 0 replays as fast as possible, otherwise
+    the replay is paced to speed times real time. Spans of the host work are recorded by the
+    tracer if one is given. Returns the host, so the final state can be inspected.
+    """
+    gameName, seed = readHeader(stream)
+    if host is None:
+        random.seed(seed)
+        host = sim_host.Host(trellis if trellis is not None else sim_host.MultiTrellis(),
+                             audio if audio is not None else sim_host.RecordingAudio(),
+                             clock=SimClock(), gameName=gameName)
+    if tracer is not None:
+        host.tracer = tracer
+    start = host.clock.now
+    realStart = time.monotonic_ns()
+
+    def pace(timestamp):
+        if speed > 0:
+            delay = realStart + (timestamp - start) / speed - time.monotonic_ns()
+            if delay > 0:
+                time.sleep(delay / 1000000000)
+
+    for timestamp, x, y, press in readEvents(stream, start):
+        # Run the game up to the time of the event, then deliver it
+        while host.clock.nextDeadline() is not None and host.clock.nextDeadline() < timestamp:
+            host.clock.skipToDeadline()
+            pace(host.clock.now)
+            host.tick()
+        host.clock.now = max(host.clock.now, timestamp)
+        pace(timestamp)
+        host.eventQueue.push(x, y, press, timestamp)
+        host.tick()
+
+    # Let any animations started by the last events finish
+    end = host.clock.now + SETTLE_TIME
+    while host.clock.nextDeadline() is not None and host.clock.nextDeadline() <= end:
+        host.clock.skipToDeadline()
+        pace(host.clock.now)
+        host.tick()
+    return host
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a neotrellis input log on the headless simulator")
+    parser.add_argument("log", help="Input log file recorded by the simulator")
+    parser.add_argument("--speed", type=float, default=0, help="Replay speed multiple (default 0: as fast as possible)")
+    parser.add_argument("--trace", help="Save a timeline of the host work to this file as Chrome trace JSON")
+    parser.add_argument("--log-level", default="info", help="Print log messages at or above this level (debug, info, warning, error or off)")
+    args = parser.parse_args(argv)
+    log.setLevel(printAt=log.levelNamed(args.log_level))
+
+    started = time.monotonic_ns()
+    with open(args.log) as stream:
+        host = replay(stream, args.speed, tracer=Tracer() if args.trace else None)
+    elapsed = time.monotonic_ns() - started
+    print(f"Replayed {host.clock.now / 1000000000:.1f}s of game time in {elapsed / 1000000000:.3f}s, {len(host.audio.plays)} sounds played")
+    if args.trace:
+        host.tracer.save(args.trace)
+        print(f"Saved {min(host.tracer.count, host.tracer.capacity)} trace spans to {args.trace}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
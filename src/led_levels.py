@@ -0,0 +1,113 @@
+# Gamma and brightness tables for the LEDs of a multi board NeoTrellis matrix
+
+# Copyright (C) 2023 Paul 'Footleg' Fretwell
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+The LEDs respond linearly to the values sent, but the eye does not, so the colours the games set
+are gamma corrected and scaled by the brightness as they are sent to the boards. This is done
+with a 256 entry lookup table per colour channel value rather than calculated per pixel.
+
+Rectangular regions of the matrix can be given their own brightness relative to the overall
+brightness (e.g. a dimmer border). Each region has its own table, and a map gives the table
+used for each button. Changing the brightness only rebuilds the tables; the framebuffer must
+then be invalidated so every pixel is sent again with the new tables on the next flush.
+"""
+
+import log
+
+# Gamma of the NeoPixel LEDs. The outputs only have 26 steps at the lowest brightness (0.1), so a
+# steeper curve (such as 2.6) rounds the dim channels of the game palettes (e.g. 20, 80 and 84)
+# to the same step and flattens the colours.
+GAMMA = 2.2
+
+# Maximum number of different region brightnesses (the region of each button is kept in a byte)
+MAX_REGIONS = 256
+
+
+def makeTable(brightness, gamma=GAMMA):
+    """
+    Returns a 256 entry table of the value to send for each colour channel value. Channels which
+    are lit stay lit (at least 1), so dim colours do not vanish at low brightness.
+    """
+    table = bytearray(256)
+    for v in range(1, 256):
+        out = int((v / 255) ** gamma * 255 * brightness + 0.5)
+        table[v] = min(max(out, 1), 255)
+    return table
+
+
+class LedLevels:
+    def __init__(self, width, height, brightness=1.0, gamma=GAMMA):
+        self.width = width
+        self.height = height
+        self.brightness = brightness
+        self.gamma = gamma
+        # Table index of each button, and the brightness (relative to the overall brightness) and
+        # table of each region. Region 0 is the rest of the matrix at full relative brightness.
+        self.regionMap = bytearray(width * height)
+        self.scales = [1.0]
+        self.tables = [makeTable(brightness, gamma)]
+
+    def setBrightness(self, brightness):
+        """
+        Sets the overall brightness (0 to 1.0), rebuilding the table of every region
+        """
+        self.brightness = brightness
+        for i in range(len(self.scales)):
+            self.tables[i] = makeTable(brightness * self.scales[i], self.gamma)
+
+    def setRegion(self, x, y, w, h, scale):
+        """
+        Sets the brightness of the buttons in the rectangle with top left corner x,y to scale
+        times the overall brightness. Regions with the same scale share a table.
+        """
+        if scale in self.scales:
+            region = self.scales.index(scale)
+        elif len(self.scales) < MAX_REGIONS:
+            region = len(self.scales)
+            self.scales.append(scale)
+            self.tables.append(makeTable(self.brightness * scale, self.gamma))
+        else:
+            log.warning("Too many brightness regions, ignoring region at %d,%d", x, y)
+            return
+        for row in range(max(y, 0), min(y + h, self.height)):
+            for col in range(max(x, 0), min(x + w, self.width)):
+                self.regionMap[row * self.width + col] = region
+
+    def clearRegions(self):
+        """
+        Returns every button to the overall brightness
+        """
+        self.regionMap = bytearray(self.width * self.height)
+        self.scales = [1.0]
+        self.tables = [self.tables[0]]
+
+    def snapshot(self):
+        """
+        Returns the regions and their tables, to put back with restore (e.g. when a suspended game
+        is resumed). Snapshots of the same regions at the same brightness are equal.
+        """
+        return (bytes(self.regionMap), tuple(self.scales), tuple(self.tables), self.brightness)
+
+    def restore(self, state):
+        regionMap, scales, tables, brightness = state
+        self.regionMap = bytearray(regionMap)
+        self.scales = list(scales)
+        if brightness == self.brightness:
+            self.tables = list(tables)
+        else:
+            # The overall brightness changed since the snapshot, so make the tables again
+            self.tables = [makeTable(self.brightness * scale, self.gamma) for scale in self.scales]
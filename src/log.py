@@ -0,0 +1,160 @@
+# Levelled logging for the NeoTrellis host programs and games
+
+# Copyright (C) 2023 Paul 'Footleg' Fretwell
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Printing on the hardware is a blocking write to the serial console, which stalls the frame
+loop, so the host and games log messages through this module instead of calling print.
+
+Each message has a level. Messages at or above the print level are printed, and messages at or
+above the record level are kept in a ring buffer of the most recent messages, which can be
+dumped on demand (e.g. from the boot button). By default info messages and above are
+printed and recorded, and debug messages are off.
+
+The logging functions of levels which are neither printed nor recorded are replaced by a
+function which does nothing, so call them as log.debug(...) (not imported by name) to pick up
+the current level. Pass the values to show as arguments for a % format rather than building an
+f-string, so nothing is formatted unless the message is printed or dumped. Recorded arguments
+are formatted when the buffer is dumped, so only pass values which are not changed later.
+"""
+
+import time
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+# Level above every message, to turn printing or recording off
+OFF = 50
+
+LEVEL_NAMES = {DEBUG: "DEBUG", INFO: "INFO", WARNING: "WARNING", ERROR: "ERROR"}
+
+# Number of recent messages kept in the ring buffer
+RING_SIZE = 64
+
+printLevel = INFO
+recordLevel = INFO
+
+# Ring buffer of (time, level, message, args) entries, head is the slot written next
+ring = [None] * RING_SIZE
+head = 0
+recorded = 0
+
+
+def write(level, msg, args):
+    global head, recorded
+    if level >= recordLevel:
+        ring[head] = (time.monotonic_ns(), level, msg, args)
+        head = (head + 1) % len(ring)
+        recorded += 1
+    if level >= printLevel:
+        print(formatMessage(msg, args))
+
+
+def formatMessage(msg, args):
+    if args:
+        return msg % args
+    return msg
+
+
+def skip(msg, *args):
+    # Logging function of the levels which are off
+    pass
+
+
+def logDebug(msg, *args):
+    write(DEBUG, msg, args)
+
+def logInfo(msg, *args):
+    write(INFO, msg, args)
+
+def logWarning(msg, *args):
+    write(WARNING, msg, args)
+
+def logError(msg, *args):
+    write(ERROR, msg, args)
+
+
+debug = skip
+info = logInfo
+warning = logWarning
+error = logError
+
+
+def setLevel(printAt=None, recordAt=None):
+    """
+    Sets the levels messages are printed and recorded at (OFF for none), then points each
+    logging function at the no-op function if its level is neither printed nor recorded
+    """
+    global printLevel, recordLevel, debug, info, warning, error
+    if printAt is not None:
+        printLevel = printAt
+    if recordAt is not None:
+        recordLevel = recordAt
+    lowest = min(printLevel, recordLevel)
+    debug = logDebug if DEBUG >= lowest else skip
+    info = logInfo if INFO >= lowest else skip
+    warning = logWarning if WARNING >= lowest else skip
+    error = logError if ERROR >= lowest else skip
+
+
+def isEnabled(level):
+    """
+    Returns True if messages of the level are printed or recorded, to skip working out values
+    which are only logged
+    """
+    return level >= printLevel or level >= recordLevel
+
+
+def levelNamed(name):
+    """
+    Returns the level for a name such as "debug" (or "off"), for command line options
+    """
+    name = name.upper()
+    if name == "OFF":
+        return OFF
+    for level, levelName in LEVEL_NAMES.items():
+        if levelName == name:
+            return level
+    raise ValueError(f"Unknown log level: {name}")
+
+
+def dump(out=print):
+    """
+    Writes the recorded messages, oldest first, with the time in ms relative to the latest
+    """
+    recent = entries()
+    if not recent:
+        return
+    latest = recent[-1][0]
+    out(f"Last {len(recent)} of {recorded} logged messages:")
+    for t, level, msg, args in recent:
+        out(f"{(t - latest) / 1000000:10.1f}ms {LEVEL_NAMES[level]:7} {formatMessage(msg, args)}")
+
+
+def entries():
+    """
+    Returns the recorded (time, level, message, args) entries, oldest first
+    """
+    return [entry for entry in ring[head:] + ring[:head] if entry is not None]
+
+
+def clear():
+    global head, recorded
+    for i in range(len(ring)):
+        ring[i] = None
+    head = 0
+    recorded = 0
@@ -15,11 +15,16 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import pygame, os, platform, random, sys
-import time
+import argparse, builtins
 
-from btn_demo import BtnDemo
-from rain_demo import RainDemo
-from trellisbattleships import Battleships
+import sim_host
+from sim_timing import NeoTrellis3x3Timing
+from input_log import InputRecorder
+from tracing import Tracer
+import log
+from sound_cache import SoundCache
+from voice_pool import VoicePool, VOICE_COUNT
+from scheduler import FrameScheduler, INPUT_INTERVAL, FLUSH_INTERVAL
 
 ### Mock Circuit Python audio classes
 class WaveFile:
@@ -42,239 +47,207 @@ if platform.system() == 'Windows':
 # the simulated NeoTrellis hardware
 BTN_MARGIN = 10
 BTN_SIZE = 30
-DIM_X = 12
-DIM_Y = 12
+DIM_X = sim_host.DIM_X
+DIM_Y = sim_host.DIM_Y
 
-RED = (255, 0, 0)
-ORANGE = (255, 100, 0)
+# Model used to predict the time the real hardware would take to perform the LED and button
+# operations of each frame. Use NoTiming() from sim_timing for fast development.
+TIMING_MODEL = NeoTrellis3x3Timing()
+# Interval between updates of the predicted hardware frame time shown in the window title
+TIMING_REPORT_INTERVAL = 1000000000
+# Memory allowed for loaded sounds, pygame decodes each whole sound into memory
+SOUND_BUDGET = 8000000
 
 # Define the window size based on the constants defined above
 SCR_SIZE = SCR_W, SCR_H = BTN_MARGIN + (BTN_MARGIN + BTN_SIZE) * DIM_X, BTN_MARGIN + (BTN_MARGIN + BTN_SIZE) * DIM_Y
+# Width of the side panel showing the frame counters, and the size of its text
+PANEL_W = 300
+PANEL_FONT_SIZE = 20
 
 def exit_game():
     pygame.quit()
     sys.exit()
 
 # Virtual hardware class definition
-class MultiTrellis:
+class MultiTrellis(sim_host.MultiTrellis):
     def __init__(self,screen):
+        super().__init__()
         self.screen = screen
+        # Indexes of the buttons sent since the last show(). The buttons written during a
+        # tick are presented together once per frame.
+        self.pending = set()
+
+    def writeBoard(self, frameBuffer, levels, bx, by, first, last):
+        super().writeBoard(frameBuffer, levels, bx, by, first, last)
+        # Record the buttons sent, each is only drawn once per frame
+        for key in range(first, last + 1):
+            self.pending.add((by * 4 + key // 4) * DIM_X + bx * 4 + key % 4)
+
+    def show(self):
+        super().show()
+        # Draw all buttons changed since the last frame and update only those rectangles on screen
+        if self.pending:
+            dirtyRects = []
+            for idx in self.pending:
+                x = idx % DIM_X
+                y = idx // DIM_X
+                dirtyRects.append(pygame.draw.rect(self.screen,self.pixel(x, y),(BTN_MARGIN + x * (BTN_MARGIN + BTN_SIZE),BTN_MARGIN + y * (BTN_MARGIN + BTN_SIZE),BTN_SIZE,BTN_SIZE)))
+            self.pending.clear()
+            pygame.display.update(dirtyRects)
+
+    def sync(self):
+        # Mock of Trellis sync: Turn pygame mouse events into button events
+        for event in pygame.event.get():
+            if event.type == pygame.MOUSEBUTTONDOWN or event.type == pygame.MOUSEBUTTONUP:
+                if event.button == 1:
+                    xPos = (pygame.mouse.get_pos()[0] - BTN_MARGIN) // (BTN_SIZE + BTN_MARGIN)
+                    yPos = (pygame.mouse.get_pos()[1] - BTN_MARGIN) // (BTN_SIZE + BTN_MARGIN)
+                    # Ignore clicks outside the buttons (e.g. on the counters panel)
+                    if 0 <= xPos < DIM_X and 0 <= yPos < DIM_Y:
+                        self.events.append((xPos, yPos, event.type == pygame.MOUSEBUTTONDOWN))
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_l:
+                # Dump the recent log messages, like the boot button on the hardware
+                log.dump()
+            elif event.type == pygame.QUIT:
+                exit_game()
+
+        # Check for key presses (ESC to exit simulator, L to dump the log)
+        pressed_keys = pygame.key.get_pressed()
+        if pressed_keys[pygame.K_ESCAPE]:
+            exit_game()
+
+        return super().sync()
+
 
-    def color(self, x, y, colour):
-        # Draw button rectangle
-        pygame.draw.rect(self.screen,colour,(BTN_MARGIN + x * (BTN_MARGIN + BTN_SIZE),BTN_MARGIN + y * (BTN_MARGIN + BTN_SIZE),BTN_SIZE,BTN_SIZE))
+# Mixer voice backed by a pygame mixer channel, matching the Circuit Python MixerVoice used by the voice pool
+class ChannelVoice:
+    def __init__(self, channel):
+        self.channel = channel
+        self.level = 1.0
 
-"""
-Host class: Holds references to all the trellis hardware capabilities and a dictionary of sound samples.
-All applications running on the matrix are passed a reference to the host object and access the LEDs
-through the host for getting and setting colours, and to play sounds. This architecture simplifies the
-application code and also enables a digital twin to run the same application classes in a software 
-simulation of the hardware.
-"""
-class Host:
-    def __init__(self,getColour,setColour):
-        self.getColour = getColour
-        self.setColour = setColour
+    @property
+    def playing(self):
+        return self.channel.get_busy()
 
-        print("Loading sound files into memory")
-        self.sounds_dict = {}
+    @property
+    def level(self):
+        return self._level
 
-        # Load sound files into sounds dictionary
-        self.sounds_dict['glass_break'] = WaveFile(open("./sounds/GlassBreak.wav", "rb"))
-        # Load sound files with text keys to identify them here (just a few CC licensed sound files are included in source as examples)
-        # self.sounds_dict['sound_key'] = WaveFile(open("./sounds/soundfile.wav", "rb"))
+    @level.setter
+    def level(self, level):
+        # Takes effect straight away, like the level of a mixer voice
+        self._level = level
+        self.channel.set_volume(level)
 
+    def play(self, sound):
+        self.channel.play(sound.getSound())
+        self.channel.set_volume(self._level)
 
-    def getColour(self):
-        return self.getColour
+    def stop(self):
+        self.channel.stop()
 
-    def setColour(self):
-        return self.setColour
 
-    def restoreColour(self,x,y):
-        self.setColour(x,y,self.getColour(x,y),False)
+# Virtual audio class definition, plays sounds through the pygame mixer
+class Audio:
+    def __init__(self):
+        # Sounds play on a fixed number of mixer channels, like the voices of the hardware mixer
+        pygame.mixer.set_num_channels(VOICE_COUNT)
+        self.voices = VoicePool([ChannelVoice(pygame.mixer.Channel(i)) for i in range(VOICE_COUNT)])
+        # Sounds are loaded the first time they are played, and kept up to the memory budget
+        self.sounds = SoundCache(loadSound, SOUND_BUDGET, busy=self.voices.isPlaying)
 
-    def play(self,key):
+    def play(self,key,priority=0,volume=1.0):
+        # The volume sets the level of the mixer channel the sound plays on
         try:
-            self.sounds_dict[key].getSound().play()
-            print(f"Playing sound: {key}")
+            voice = self.voices.play(self.sounds.get(key), priority, volume)
+            log.debug("Playing sound: %s on voice %d at volume %.2f", key, voice, volume)
         except(KeyError):
-            print(f"No sound matching key: {key}")
+            log.warning("No sound matching key: %s", key)
 
+    def preload(self,keys):
+        self.sounds.pin(keys)
 
-# Track long single button presses to use to over-ride game classes
-lastBtnPressed = [-1,-1]
-lastPressTime = 0
-longPressInterval = 1000000000
 
-# Track time since last hardware sync, so we give at a least 17ms pause between sync requests
-lastSyncTime = 0
+def loadSound(path):
+    return WaveFile(open(path, "rb"))
+
+
+# Side panel to the right of the buttons showing the frame counters of the host (see perf.py)
+class CounterPanel:
+    def __init__(self, screen):
+        self.screen = screen
+        self.rect = pygame.Rect(SCR_W, 0, PANEL_W, SCR_H)
+        self.font = pygame.font.Font(None, PANEL_FONT_SIZE)
+
+    def draw(self, title, lines):
+        self.screen.fill((0, 0, 0), self.rect)
+        y = BTN_MARGIN
+        for line in [title] + lines:
+            self.screen.blit(self.font.render(line, True, (200, 200, 200)), (SCR_W + BTN_MARGIN, y))
+            y += PANEL_FONT_SIZE
+        pygame.display.update(self.rect)
+
 
 ## Main simulator method
-def main():
-    global activeGame, lastSyncTime
+def main(recordPath=None, showCounters=False, tracePath=None):
+    # Seed the random numbers from a known value, so a recorded session can be replayed exactly
+    seed = random.getrandbits(32)
+    random.seed(seed)
 
     pygame.init()
-    screen = pygame.display.set_mode(SCR_SIZE)    
+    if showCounters:
+        screen = pygame.display.set_mode((SCR_W + PANEL_W, SCR_H))
+        panel = CounterPanel(screen)
+    else:
+        screen = pygame.display.set_mode(SCR_SIZE)
+        panel = None
     pygame.display.set_caption("Neotrellis Simulator")
     screen_rect = screen.get_rect()
-    running = True
 
     # Create the virtual neotrellis with a reference to the pygame drawing surface to render itself
     trellis = MultiTrellis(screen)
 
-    # some color definitions
-    leds = [[0,0,0],[0,0,0],[0,0,0],[0,0,0],
-            [0,0,0],[0,0,0],[0,0,0],[0,0,0],
-            [0,0,0],[0,0,0],[0,0,0],[0,0,0],
-            [0,0,0],[0,0,0],[0,0,0],[0,0,0],
-            [0,0,0],[0,0,0],[0,0,0],[0,0,0],
-            [0,0,0],[0,0,0],[0,0,0],[0,0,0],
-            [0,0,0],[0,0,0],[0,0,0],[0,0,0],
-            [0,0,0],[0,0,0],[0,0,0],[0,0,0],
-            [0,0,0],[0,0,0],[0,0,0],[0,0,0],
-            [0,0,0],[0,0,0],[0,0,0],[0,0,0],
-            [0,0,0],[0,0,0],[0,0,0],[0,0,0],
-            [0,0,0],[0,0,0],[0,0,0],[0,0,0],
-            [0,0,0],[0,0,0],[0,0,0],[0,0,0],
-            [0,0,0],[0,0,0],[0,0,0],[0,0,0],
-            [0,0,0],[0,0,0],[0,0,0],[0,0,0],
-            [0,0,0],[0,0,0],[0,0,0],[0,0,0],
-            [0,0,0],[0,0,0],[0,0,0],[0,0,0],
-            [0,0,0],[0,0,0],[0,0,0],[0,0,0],
-            [0,0,0],[0,0,0],[0,0,0],[0,0,0],
-            [0,0,0],[0,0,0],[0,0,0],[0,0,0],
-            [0,0,0],[0,0,0],[0,0,0],[0,0,0],
-            [0,0,0],[0,0,0],[0,0,0],[0,0,0],
-            [0,0,0],[0,0,0],[0,0,0],[0,0,0],
-            [0,0,0],[0,0,0],[0,0,0],[0,0,0],
-            [0,0,0],[0,0,0],[0,0,0],[0,0,0],
-            [0,0,0],[0,0,0],[0,0,0],[0,0,0],
-            [0,0,0],[0,0,0],[0,0,0],[0,0,0],
-            [0,0,0],[0,0,0],[0,0,0],[0,0,0],
-            [0,0,0],[0,0,0],[0,0,0],[0,0,0],
-            [0,0,0],[0,0,0],[0,0,0],[0,0,0],
-            [0,0,0],[0,0,0],[0,0,0],[0,0,0],
-            [0,0,0],[0,0,0],[0,0,0],[0,0,0],
-            [0,0,0],[0,0,0],[0,0,0],[0,0,0],
-            [0,0,0],[0,0,0],[0,0,0],[0,0,0],
-            [0,0,0],[0,0,0],[0,0,0],[0,0,0],
-            [0,0,0],[0,0,0],[0,0,0],[0,0,0],
-            ]
-
-    def setColour(x,y,colour,store=True):
-        if 0 <= x <= 11 and 0 <= y <= 11:
-            if store:
-                leds[y * DIM_Y + x] = colour
-            trellis.color(x, y, colour)
-            pygame.display.update()
-            time.sleep(0.001)
-        else:
-            print(f"Request to set colour outside trellis at: {x},{y}")
-
-    def getColour(x,y):
-        time.sleep(0.01)
-        return leds[y * DIM_Y + x]
-
-    def gridReset(colour):
-        """
-        Resets all lights and stored colours to the same colour value
-        """
-        for y in range(DIM_Y):
-            for x in range(DIM_X):
-                setColour( x, y, colour )
-        
-    def longPress(x,y):
-        global activeGame
-        
-        print(f"Button long press at {x},{y} (was colour: {getColour(x,y)})")
-        if y == 11:
-            if x == 0:
-                gridReset((50,0,50))
-                activeGame = BtnDemo(host)
-            elif x == 1:
-                # gridReset((10,10,10))
-                activeGame = Battleships(host)
-            elif x == 11:
-                gridReset((0,0,0))
-                activeGame = RainDemo(host)
-        else:
-            # Pass unhandled long press events to active game
-            activeGame.longPressEvent(x,y)
-
-        # Restore button colour
-        host.restoreColour(x,y)
-
-    # this will be called when button events are received
-    def btnHandler(x, y, edge):
-        global lastBtnPressed, lastPressTime
-        
-        print(f"Button pressed {x},{y}")
-        # Check for button pressed and released events, and pass to active game class
-        if edge == True:
-            # Store position of button for checking for long press events
-            lastBtnPressed = [x,y]
-            # Call active game class button event handler
-            activeGame.btnEvent(x,y,True)
-        elif edge == False:
-            # Check for long button press
-            if (lastBtnPressed == [x,y]) and ((time.monotonic_ns() - lastPressTime) > longPressInterval):
-                # Long press
-                setColour(x, y, (0,0,0), False)
-                longPress(x, y)
-
-            # Call active game class button event handler
-            activeGame.btnEvent(x,y,False)
-            # Clear last pressed position on any button release
-            lastBtnPressed = [-1,-1]
-        
-        # Reset last press time on any button event
-        lastPressTime = time.monotonic_ns()
-
-    host = Host(getColour,setColour)
-    
-    # Set the game to load automatically on boot
-    activeGame = Battleships(host)
-
-    ## Simulation loop ##
-    while running:
-        timenow = time.monotonic_ns()
-        if timenow - lastSyncTime > 18000:
-            lastSyncTime = timenow
-            # Mock of Trellis sync: Process pygame events
-            for event in pygame.event.get():
-                if event.type == pygame.MOUSEBUTTONDOWN or event.type == pygame.MOUSEBUTTONUP:
-                    if event.button == 1:
-                        xPos = int((pygame.mouse.get_pos()[0] - BTN_MARGIN) / (BTN_SIZE + BTN_MARGIN))
-                        yPos = int((pygame.mouse.get_pos()[1] - BTN_MARGIN) / (BTN_SIZE + BTN_MARGIN))
-                        btnHandler( xPos, yPos, event.type == pygame.MOUSEBUTTONDOWN )
-                elif event.type == pygame.QUIT:
-                    exit_game()
-
-            # Check for key presses (ESC to exit simulator)
-            pressed_keys = pygame.key.get_pressed()
-            if pressed_keys[pygame.K_ESCAPE]:
-                exit_game()
+    host = sim_host.Host(trellis, Audio(), TIMING_MODEL)
 
-            activeGame.animate()
+    if recordPath:
+        # Record all button events for replay (the open function is overridden above to load sounds)
+        host.recorder = InputRecorder(builtins.open(recordPath, "w"), type(host.activeGame).__name__, seed, host.clock.now)
+        print(f"Recording button input to {recordPath}")
+    if tracePath:
+        host.tracer = Tracer()
 
-            if (lastBtnPressed[0] >= 0) and ((time.monotonic_ns() - lastPressTime) > longPressInterval):
-                #Long press will be activated when key is lifted, so indicate with colour change
-                longPressColour = RED
-                #Use a different colour to the one this button is currently showing
-                colourNow = getColour(lastBtnPressed[0], lastBtnPressed[1])
-                if colourNow == RED:
-                    longPressColour = ORANGE
-                #print(f"Long press activated for position {lastBtnPressed[0]},{lastBtnPressed[1]}")
-                setColour(lastBtnPressed[0], lastBtnPressed[1], longPressColour, False )
-                
-            pygame.display.update()
+    def reportTiming(timenow):
+        # Report the time frames are predicted to take on the real hardware
+        pygame.display.set_caption(f"Neotrellis Simulator - predicted hw frame {TIMING_MODEL.averageFrameNs() / 1000000:.1f}ms avg, {TIMING_MODEL.maxFrameNs / 1000000:.1f}ms max ({TIMING_MODEL.name})")
+        TIMING_MODEL.resetStats()
+        if panel is not None:
+            # Show what the frames did since the last report
+            panel.draw(f"{type(host.activeGame).__name__}: {host.counters.frames} frames", host.counters.lines())
+            host.counters.reset()
 
-        time.sleep(0.002)
-        
-    main()
+    ## Simulation loop ##
+    # Run the input, game and display jobs at the same rates as the hardware, sleeping in between
+    scheduler = FrameScheduler(host.clock)
+    scheduler.every("input", INPUT_INTERVAL, host.pollInput)
+    scheduler.onWake("animate", host.animate)
+    scheduler.every("flush", FLUSH_INTERVAL, host.flush)
+    scheduler.every("report", TIMING_REPORT_INTERVAL, reportTiming)
+    try:
+        scheduler.run()
+    finally:
+        if tracePath:
+            # Save the timeline when the simulator exits (the open function is overridden above)
+            with builtins.open(tracePath, "w") as stream:
+                host.tracer.export(stream)
+            print(f"Saved {min(host.tracer.count, host.tracer.capacity)} trace spans to {tracePath}")
 
 print("Running")
 if __name__ == '__main__':
-    main()
-    
+    parser = argparse.ArgumentParser(description="Neotrellis Simulator")
+    parser.add_argument("--record", help="Record the button input to this file, replay it with input_log.py")
+    parser.add_argument("--log-level", default="info", help="Print log messages at or above this level (debug, info, warning, error or off)")
+    parser.add_argument("--trace", help="Save a timeline of the host work to this file as Chrome trace JSON, open it in Perfetto")
+    parser.add_argument("--counters", action="store_true", help="Show the frame counters of the host in a side panel")
+    args = parser.parse_args()
+    log.setLevel(printAt=log.levelNamed(args.log_level))
+    main(args.record, args.counters, args.trace)
@@ -0,0 +1,110 @@
+# Per frame performance counters for the NeoTrellis host programs
+
+# Copyright (C) 2023 Paul 'Footleg' Fretwell
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+The hosts count what each frame does (host.counters), so the game or stage of a game which
+keeps the I2C bus busy can be found. The host adds to the counters of the current frame as it
+works, and ends the frame when it flushes the LED changes to the boards. Each counter keeps the
+value of the last frame, and the total and peak per frame since the counters were last reset.
+
+The times are read from time.monotonic_ns(), which only ticks every millisecond or so on the
+hardware, so short times add up to 0 there and the averages over many frames are the ones to
+go by.
+"""
+
+import time
+
+# Counters kept for each frame
+COUNTERS = (
+    "written",      # buttons written by setColour and the bulk drawing methods
+    "changed",      # buttons written whose displayed colour changed
+    "getColour",    # getColour calls
+    "pixelsSent",   # pixels sent to the boards by the flush
+    "plays",        # sounds played
+    "events",       # button events dispatched
+    "animateNs",    # time animating the game
+    "btnEventNs",   # time in the game btnEvent handler
+    "syncNs",       # time reading the buttons (trellis sync)
+)
+
+
+class FrameCounters:
+    def __init__(self):
+        self.last = [0] * len(COUNTERS)
+        self.totals = [0] * len(COUNTERS)
+        self.peaks = [0] * len(COUNTERS)
+        self.frames = 0
+        self.started = time.monotonic_ns()
+        for name in COUNTERS:
+            setattr(self, name, 0)
+
+    def endFrame(self):
+        """
+        Adds the counts of the current frame to the totals and starts a new frame
+        """
+        for i in range(len(COUNTERS)):
+            name = COUNTERS[i]
+            value = getattr(self, name)
+            self.last[i] = value
+            self.totals[i] += value
+            if value > self.peaks[i]:
+                self.peaks[i] = value
+            setattr(self, name, 0)
+        self.frames += 1
+
+    def reset(self):
+        """
+        Clears the totals and peaks, to start a new reporting period
+        """
+        for i in range(len(COUNTERS)):
+            self.totals[i] = 0
+            self.peaks[i] = 0
+        self.frames = 0
+        self.started = time.monotonic_ns()
+
+    def lastFrame(self):
+        """
+        Returns the counts of the last frame by counter name
+        """
+        return dict(zip(COUNTERS, self.last))
+
+    def averages(self):
+        """
+        Returns the average counts per frame since the last reset by counter name
+        """
+        frames = max(self.frames, 1)
+        return dict(zip(COUNTERS, [total / frames for total in self.totals]))
+
+    def lines(self):
+        """
+        Returns one line per counter of the average and peak per frame since the last reset
+        """
+        frames = max(self.frames, 1)
+        lines = []
+        for i in range(len(COUNTERS)):
+            if COUNTERS[i].endswith("Ns"):
+                lines.append(f"{COUNTERS[i][:-2]}: {self.totals[i] / frames / 1000000:.2f}ms avg {self.peaks[i] / 1000000:.1f}ms peak")
+            else:
+                lines.append(f"{COUNTERS[i]}: {self.totals[i] / frames:.1f} avg {self.peaks[i]} peak")
+        return lines
+
+    def report(self):
+        """
+        Returns a summary of the frames since the last reset
+        """
+        seconds = (time.monotonic_ns() - self.started) / 1000000000
+        return f"{self.frames} frames in {seconds:.1f}s, per frame " + ", ".join(self.lines())
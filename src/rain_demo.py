@@ -15,57 +15,134 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
-import time
+from array import array
 
 BLANK = (10,10,10)
+# Colours of the leading drop of rain and of its trail
+HEAD = (0,252,0)
+TRAIL = (0,84,0)
+
+# Time between raindrop animation steps
+DROPINTERVAL = 200000000
+# Longest trail of a drop, and the most drops which can fall at once
+MAXLENGTH = 6
+MAXDROPS = 512
+BOTTOM = 11
+COLUMNS = 12
+
+
+class DropPool:
+    """
+    Fixed size pool of raindrops held in parallel arrays, so adding, moving and removing drops
+    allocates nothing. Drop i is at column xs[i] with its head at row ys[i] and lengths[i]
+    buttons lit up to and including the head. Removed drops are replaced by the last drop.
+    """
+    def __init__(self, capacity=MAXDROPS):
+        self.capacity = capacity
+        self.xs = bytearray(capacity)
+        self.ys = array('b', bytes(capacity))
+        self.lengths = bytearray(capacity)
+        self.count = 0
+        self.dropped = 0
+
+    def add(self, x, y):
+        """
+        Adds a drop of length 1 at x,y. Returns False if the pool is full.
+        """
+        if self.count >= self.capacity:
+            self.dropped += 1
+            return False
+        i = self.count
+        self.xs[i] = x
+        self.ys[i] = y
+        self.lengths[i] = 1
+        self.count += 1
+        return True
+
+    def remove(self, i):
+        last = self.count - 1
+        self.xs[i] = self.xs[last]
+        self.ys[i] = self.ys[last]
+        self.lengths[i] = self.lengths[last]
+        self.count = last
+
+    def __len__(self):
+        return self.count
+
 
 class RainDemo:
     def __init__(self, host):
         # Host contains all the RGB LED access and audio play methods of the hardware
         self.host = host
 
-        self.drops = []
-        self.tick = time.monotonic_ns()
+        self.drops = DropPool()
+        # Number of drops lit on each button, so a drop leaving a button only blanks it when no
+        # other drop in the same column is still covering it
+        self.cover = array('H', bytes(2 * COLUMNS * (BOTTOM + 1)))
+        # Animation stepping the drops, running while any are falling
+        self.rain = None
 
     def btnEvent(self, x, y, press):
         if press:
             # Start rain drop at this position
-            self.drops.append([x,y,1])
+            if self.drops.add(x, y):
+                self.cover[y * COLUMNS + x] += 1
+                self.host.setColour(x, y, HEAD)
+                if self.rain is None:
+                    self.rain = self.host.animator.every(DROPINTERVAL, self.step, start=self.host.clock.now + DROPINTERVAL)
 
     def animate(self):
-        # Increment animations which run independent of button presses (if any)
-        if time.monotonic_ns() - self.tick > 200000000:
-            self.tick = time.monotonic_ns()
-            # Update raindrops
-            for drop in self.drops:
-                if drop[2] > 0:
-                    # Render drop
-                    for y in range(drop[2]):
-                        # Draw length, brightest at bottom, fading to top
-                        self.host.setColour(drop[0],drop[1]-y,(0,(6-y)*42,0))
-                    # Check if above bottom row
-                    if drop[1] < 11:
-                        # Move down one position
-                        drop[1] = drop[1] + 1
-                        # Grow drop if not max length already
-                        if drop[2] < 6:
-                            drop[2] = drop[2] + 1
-                        else:
-                            # Clear position above drop once full length reached
-                            self.host.setColour(drop[0],drop[1]-drop[2]-1,BLANK)
-                    else:
-                        # Drop has reached bottom row
-                        if drop[2] > 0:
-                            # Shrink length of tail
-                            drop[2] = drop[2] - 1
-                            # Clear position above drop as tail shrinks
-                            self.host.setColour(drop[0],drop[1]-drop[2]-1,BLANK)
-                    
-            # Destroy expired drops
-            i = len(self.drops)
-            while i > 0:
-                if self.drops[i-1][2] == 0:
-                    deaddrop = self.drops.pop(i-1)
-                    self.host.setColour(deaddrop[0],deaddrop[1],BLANK)
-                    print(f"Destroyed drop {i-1}")
-                i = i - 1
+        # Animations are run by the host animator
+        None
+
+    def step(self, frame):
+        # Move each drop down one button. Only the buttons which change are set: the new head,
+        # the old head which becomes part of the trail and the button left behind by the tail.
+        drops = self.drops
+        cover = self.cover
+        xs = drops.xs
+        ys = drops.ys
+        lengths = drops.lengths
+        setColour = self.host.setColour
+        i = 0
+        while i < drops.count:
+            x = xs[i]
+            y = ys[i]
+            length = lengths[i]
+            if y < BOTTOM:
+                # Move down one position
+                if y >= 0:
+                    setColour(x, y, TRAIL)
+                y += 1
+                ys[i] = y
+                cover[y * COLUMNS + x] += 1
+                setColour(x, y, HEAD)
+                if length < MAXLENGTH:
+                    # Grow drop if not max length already
+                    lengths[i] = length + 1
+                elif y - length >= 0:
+                    # Clear position above drop once full length reached
+                    self.uncover(x, y - length)
+            else:
+                # Drop has reached bottom row, shrink length of tail
+                length -= 1
+                if y - length >= 0:
+                    self.uncover(x, y - length)
+                if length == 0:
+                    # The head has been cleared, the drop has gone
+                    drops.remove(i)
+                    continue
+                lengths[i] = length
+            i += 1
+
+        # Stop stepping once all the drops have gone
+        if drops.count == 0:
+            self.host.animator.cancel(self.rain)
+            self.rain = None
+
+    def uncover(self, x, y):
+        # The tail of a drop has left button x,y, blank it unless another drop is still on it
+        idx = y * COLUMNS + x
+        self.cover[idx] -= 1
+        if self.cover[idx] == 0:
+            self.host.setColour(x, y, BLANK)
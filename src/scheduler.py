@@ -0,0 +1,130 @@
+# Deadline based frame scheduler for the NeoTrellis host programs
+
+# Copyright (C) 2023 Paul 'Footleg' Fretwell
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+The scheduler runs the jobs of the host main loop (reading the buttons, animating the active
+game, sending LED changes to the boards) each at its own target rate. Between runs it sleeps
+until the next job is due, rather than spinning, so the I2C bus is only used as often as
+the boards can serve it and the CPU is free for audio.
+
+A job which falls a whole interval or more behind its schedule counts an overrun and is
+rescheduled from the current time, rather than running repeatedly to catch up.
+
+Wake jobs (such as animating the games) have no interval. They run only when the wake time the
+games requested from the clock is reached, and the scheduler sleeps until then if nothing else
+is due first.
+"""
+
+import time
+
+# Default target intervals of the host jobs (ns). The NeoTrellis can only be read every 17ms or so.
+INPUT_INTERVAL = 20000000
+FLUSH_INTERVAL = 20000000
+
+
+class Job:
+    # A job with interval None is a wake job
+    def __init__(self, name, interval, callback, due):
+        self.name = name
+        self.interval = interval
+        self.callback = callback
+        self.due = due
+        # Statistics of the job runs
+        self.runs = 0
+        self.overruns = 0
+        self.maxLateNs = 0
+
+
+class FrameScheduler:
+    def __init__(self, clock):
+        self.clock = clock
+        self.jobs = []
+
+    def every(self, name, interval, callback):
+        """
+        Adds a job calling callback(now) every interval ns. Jobs due at the same time run in
+        the order they were added. Returns the job.
+        """
+        job = Job(name, interval, callback, self.clock.now)
+        self.jobs.append(job)
+        return job
+
+    def onWake(self, name, callback):
+        """
+        Adds a job calling callback(now) whenever the wake time requested from the clock is
+        reached. Returns the job.
+        """
+        job = Job(name, None, callback, None)
+        self.jobs.append(job)
+        return job
+
+    def runDue(self):
+        """
+        Reads the clock once and runs every job which is due. Returns the time the jobs ran at.
+        """
+        # The tick serves the wake time, so read it first
+        wake = self.clock.nextDeadline()
+        now = self.clock.tick()
+        for job in self.jobs:
+            if job.interval is None:
+                if wake is not None and now >= wake:
+                    late = now - wake
+                    if late > job.maxLateNs:
+                        job.maxLateNs = late
+                    job.runs += 1
+                    job.callback(now)
+            elif now >= job.due:
+                late = now - job.due
+                if late > job.maxLateNs:
+                    job.maxLateNs = late
+                if late >= job.interval:
+                    # Missed at least a whole interval, start again from now
+                    job.overruns += 1
+                    job.due = now + job.interval
+                else:
+                    job.due += job.interval
+                job.runs += 1
+                job.callback(now)
+        return now
+
+    def nextDue(self):
+        due = self.clock.nextDeadline()
+        for job in self.jobs:
+            if job.interval is not None and (due is None or job.due < due):
+                due = job.due
+        return due
+
+    def sleep(self):
+        """
+        Sleeps until the next job is due
+        """
+        due = self.nextDue()
+        if due is not None:
+            delay = due - time.monotonic_ns()
+            if delay > 0:
+                time.sleep(delay / 1000000000)
+
+    def run(self):
+        while True:
+            self.runDue()
+            self.sleep()
+
+    def report(self):
+        """
+        Returns a one line summary of the job statistics
+        """
+        return ", ".join([f"{job.name}: {job.runs} runs {job.overruns} overruns max late {job.maxLateNs // 1000000}ms" for job in self.jobs])
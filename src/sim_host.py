@@ -0,0 +1,377 @@
+# Neotrellis Simulator host - shared by the pygame simulator and headless runs
+# Copyright (C) 2023 Paul 'Footleg' Fretwell
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+The simulator host holds the LED state, sound playing and game switching logic of the
+hardware host program (code.py), with the trellis and audio supplied as backends. The headless
+backends defined here keep everything in memory and take button input from method calls, so
+games can be run without a window or audio device (e.g. for testing and profiling). The pygame
+backends are defined in neotrellis-sim.py.
+
+Example headless run:
+    host = Host(MultiTrellis(), RecordingAudio())
+    host.trellis.press(3, 4)
+    host.tick()
+    host.trellis.release(3, 4)
+    host.tick()
+
+Passing a SimClock lets game time be fast-forwarded, e.g. host.runFor(10000000000) runs 10 seconds
+of game time, ticking only at the times the game asked to be woken.
+"""
+
+from sim_timing import NoTiming
+from host_clock import Clock
+from framebuffer import FrameBuffer, BOARD_SIZE
+from led_levels import LedLevels
+from events import EventQueue
+from animation import Animator
+from perf import FrameCounters
+import games
+import time
+import log
+
+DIM_X = 12
+DIM_Y = 12
+
+RED = (255, 0, 0)
+ORANGE = (255, 100, 0)
+
+# Time a button must be held down to trigger a long press event
+LONG_PRESS_INTERVAL = 1000000000
+
+
+class MultiTrellis:
+    """
+    Headless virtual trellis. Keeps the colour every LED is showing in memory (as RGB bytes)
+    and generates button events from press() and release() calls, delivered to the callback
+    on the next sync().
+    """
+    def __init__(self):
+        self.pixels = bytearray(DIM_X * DIM_Y * 3)
+        self.callback = None
+        self.events = []
+        self.frames = 0
+
+    def set_callback(self, callback):
+        self.callback = callback
+
+    def writeBoard(self, frameBuffer, levels, bx, by, first, last):
+        # Copy the rows of the board which contain the range of keys sent, through the level tables
+        pixels = self.pixels
+        for r in range(first // BOARD_SIZE, last // BOARD_SIZE + 1):
+            row = frameBuffer.boardRow(bx, by, r)
+            start = ((by * BOARD_SIZE + r) * DIM_X + bx * BOARD_SIZE) * 3
+            for k in range(BOARD_SIZE):
+                table = levels.tables[levels.regionMap[start // 3 + k]]
+                for c in range(3):
+                    pixels[start + k * 3 + c] = table[row[k * 3 + c]]
+
+    def pixel(self, x, y):
+        """
+        Returns the colour button x,y is showing
+        """
+        idx = (y * DIM_X + x) * 3
+        return (self.pixels[idx], self.pixels[idx + 1], self.pixels[idx + 2])
+
+    def show(self):
+        self.frames += 1
+
+    def press(self, x, y):
+        self.events.append((x, y, True))
+
+    def release(self, x, y):
+        self.events.append((x, y, False))
+
+    def sync(self):
+        """
+        Delivers all button events queued since the last sync, returning the number of events
+        """
+        events = self.events
+        self.events = []
+        for x, y, edge in events:
+            self.callback(x, y, edge)
+        return len(events)
+
+
+class RecordingAudio:
+    """
+    Headless audio backend which records the key and volume of every sound played instead of playing it
+    """
+    def __init__(self):
+        self.plays = []
+        self.volumes = []
+        self.preloaded = []
+
+    def play(self, key, priority=0, volume=1.0):
+        self.plays.append(key)
+        self.volumes.append(volume)
+
+    def preload(self, keys):
+        self.preloaded = list(keys)
+
+
+"""
+Host class: Holds references to all the trellis hardware capabilities and the audio backend.
+All applications running on the matrix are passed a reference to the host object and access the LEDs
+through the host for getting and setting colours, and to play sounds. This architecture simplifies the
+application code and also enables a digital twin to run the same application classes in a software
+simulation of the hardware.
+"""
+class Host:
+    def __init__(self, trellis, audio, timing=None, gameClass=None, clock=None, gameName=games.BOOT_GAME):
+        self.trellis = trellis
+        self.audio = audio
+        self.timing = timing if timing is not None else NoTiming()
+        # Clock the games read the time from
+        self.clock = clock if clock is not None else Clock()
+        # Timeline the games schedule their animations on (see animation.py)
+        self.animator = Animator(self.clock)
+        # Counts of what each frame does (see perf.py)
+        self.counters = FrameCounters()
+
+        # Shadow framebuffer holding the LED colours, changes are sent to the trellis once per tick
+        self.frameBuffer = FrameBuffer(DIM_X, DIM_Y)
+        # Region brightness tables applied as the LEDs are sent. The simulator shows the colours
+        # without the LED gamma and overall brightness, as the screen applies its own gamma.
+        self.levels = LedLevels(DIM_X, DIM_Y, gamma=1.0)
+        # Sounds the active game keeps loaded
+        self.pinnedSounds = []
+
+        # Track long single button presses to use to over-ride game classes
+        self.lastBtnPressed = [-1,-1]
+        self.lastPressTime = 0
+
+        # Button events recorded during the trellis sync, dispatched to btnHandler once the sync is done
+        self.eventQueue = EventQueue()
+        # Time the button event being passed to the game was captured
+        self.eventTime = 0
+        # Input recorder which is passed every button event (see input_log.py)
+        self.recorder = None
+        # Tracer which records the timeline of the host work (see tracing.py)
+        self.tracer = None
+        self.trellis.set_callback(self.btnCallback)
+
+        # Start the game to load automatically on boot, by name from the game registry (see
+        # games.py) unless a game class is given
+        self.loader = games.GameLoader()
+        if gameClass is not None:
+            self.activeGame = gameClass(self)
+        else:
+            self.activeGame = self.loader.load(gameName, self)
+
+    def setColour(self,x,y,colour,store=True):
+        if 0 <= x < DIM_X and 0 <= y < DIM_Y:
+            self.frameBuffer.set(x, y, colour, store)
+        else:
+            log.warning("Request to set colour outside trellis at: %d,%d", x, y)
+
+    def getColour(self,x,y):
+        self.counters.getColour += 1
+        self.timing.pixelRead()
+        return self.frameBuffer.get(x, y)
+
+    def writeBoard(self, bx, by, first, last):
+        self.trellis.writeBoard(self.frameBuffer, self.levels, bx, by, first, last)
+        self.timing.boardWrite(last - first + 1)
+        self.counters.pixelsSent += last - first + 1
+
+    def restoreColour(self,x,y):
+        self.setColour(x,y,self.getColour(x,y),False)
+
+    # Bulk drawing methods, each updates the framebuffer in one operation and the changes are
+    # sent to the boards in the next flush
+    def fill(self,colour,store=True):
+        self.frameBuffer.fill(colour,store)
+
+    def fillRect(self,x,y,w,h,colour,store=True):
+        self.frameBuffer.fillRect(x,y,w,h,colour,store)
+
+    def drawRow(self,x,y,length,colour,store=True):
+        self.frameBuffer.drawRow(x,y,length,colour,store)
+
+    def drawColumn(self,x,y,length,colour,store=True):
+        self.frameBuffer.drawColumn(x,y,length,colour,store)
+
+    def drawPolyline(self,points,colour,length=None,store=True):
+        return self.frameBuffer.drawPolyline(points,colour,length,store)
+
+    def blit(self,buffer,x=0,y=0,width=None,store=True):
+        self.frameBuffer.blit(buffer,x,y,width,store)
+
+    def play(self,key,priority=0,volume=1.0):
+        # Volume 0 to 1.0 scales the level the sound plays at
+        self.counters.plays += 1
+        if self.tracer is not None:
+            started = self.tracer.now()
+        self.audio.play(key, priority, volume)
+        if self.tracer is not None:
+            self.tracer.end("play", started, key)
+
+    def setRegionBrightness(self,x,y,w,h,scale):
+        # Scales the brightness of a rectangle of buttons (e.g. 0.5 for half as bright as the rest)
+        self.levels.setRegion(x,y,w,h,scale)
+        self.frameBuffer.invalidate()
+
+    def preloadSounds(self,keys):
+        # Keeps the sounds the active game plays often loaded, replacing the previous set
+        self.pinnedSounds = list(keys)
+        self.audio.preload(keys)
+
+    def gridReset(self,colour):
+        """
+        Resets all lights and stored colours to the same colour value
+        """
+        self.fill(colour)
+
+    def longPress(self,x,y):
+        # Read the colour from the frame buffer rather than getColour, so it is not counted
+        log.info("Button long press at %d,%d (was colour: %s)", x, y, self.frameBuffer.get(x,y))
+        if y == games.LAUNCH_ROW:
+            name = games.launcher(x, y)
+            if name is not None:
+                self.switchGame(name)
+        else:
+            # Pass unhandled long press events to active game
+            self.activeGame.longPressEvent(x,y)
+
+        # Restore button colour
+        self.restoreColour(x,y)
+
+    def switchGame(self, name):
+        """
+        Switches to the game of the class named, resuming it if it was suspended
+        """
+        # Suspend the active game (or drop it to start it again), then resume or load the new game
+        self.loader.leave(self.activeGame, self, name)
+        self.activeGame = None
+        self.activeGame = self.loader.enter(name, self)
+
+    # this will be called by the trellis sync when button events are received
+    def btnCallback(self, x, y, edge):
+        self.eventQueue.push(x, y, edge, self.clock.read())
+
+    # this will be called for each button event after the trellis sync
+    def btnHandler(self, x, y, press, timestamp):
+        log.debug("Button pressed %d,%d", x, y)
+        self.counters.events += 1
+        if self.tracer is not None:
+            traceStarted = self.tracer.now()
+        if self.recorder is not None:
+            self.recorder.record(x, y, press, timestamp)
+        self.eventTime = timestamp
+        # Check for button pressed and released events, and pass to active game class
+        if press:
+            # Store position of button for checking for long press events
+            self.lastBtnPressed = [x,y]
+            # Tick when the long press indicator is due
+            self.clock.wakeAt(timestamp + LONG_PRESS_INTERVAL + 1)
+            # Call active game class button event handler
+            started = time.monotonic_ns()
+            self.activeGame.btnEvent(x,y,True)
+            self.counters.btnEventNs += time.monotonic_ns() - started
+        else:
+            # Check for long button press
+            if (self.lastBtnPressed == [x,y]) and ((timestamp - self.lastPressTime) > LONG_PRESS_INTERVAL):
+                # Long press
+                self.setColour(x, y, (0,0,0), False)
+                self.longPress(x, y)
+
+            # Call active game class button event handler
+            started = time.monotonic_ns()
+            self.activeGame.btnEvent(x,y,False)
+            self.counters.btnEventNs += time.monotonic_ns() - started
+            # Clear last pressed position on any button release
+            self.lastBtnPressed = [-1,-1]
+
+        # Reset last press time on any button event
+        self.lastPressTime = timestamp
+        if self.tracer is not None:
+            self.tracer.end("btnEvent", traceStarted, x, y, press)
+
+    def pollInput(self, timenow):
+        # Read button events, pass them to btnHandler, then show the long press indicator if a button
+        # has been held long enough
+        started = time.monotonic_ns()
+        self.timing.sync(self.trellis.sync())
+        self.counters.syncNs += time.monotonic_ns() - started
+        self.eventQueue.dispatch(self.btnHandler)
+
+        if (self.lastBtnPressed[0] >= 0) and ((timenow - self.lastPressTime) > LONG_PRESS_INTERVAL):
+            #Long press will be activated when key is lifted, so indicate with colour change
+            longPressColour = RED
+            #Use a different colour to the one this button is currently showing
+            colourNow = self.getColour(self.lastBtnPressed[0], self.lastBtnPressed[1])
+            if colourNow == RED:
+                longPressColour = ORANGE
+            #print(f"Long press activated for position {self.lastBtnPressed[0]},{self.lastBtnPressed[1]}")
+            self.setColour(self.lastBtnPressed[0], self.lastBtnPressed[1], longPressColour, False )
+
+    def animate(self, timenow):
+        # Run the animation frames which are due, then the game's own animate method
+        started = time.monotonic_ns()
+        self.animator.update(timenow)
+        self.activeGame.animate()
+        self.counters.animateNs += time.monotonic_ns() - started
+        if self.tracer is not None:
+            self.tracer.end("animate", started, len(self.animator))
+
+    def flush(self, timenow):
+        """
+        Sends the button colour changes made since the last flush to the trellis and presents them.
+        Returns the predicted hardware time of the frame.
+        """
+        if self.tracer is not None:
+            started = self.tracer.now()
+        self.frameBuffer.flush(self.writeBoard)
+        self.trellis.show()
+        if self.tracer is not None:
+            self.tracer.end("flush", started, self.counters.pixelsSent)
+        self.countWrites()
+        self.counters.endFrame()
+        return self.timing.endFrame()
+
+    def countWrites(self):
+        # Add the buttons written by setColour and the bulk drawing methods to the frame counters
+        frameBuffer = self.frameBuffer
+        self.counters.written += frameBuffer.writes
+        self.counters.changed += frameBuffer.changes
+        frameBuffer.writes = 0
+        frameBuffer.changes = 0
+
+    def tick(self):
+        """
+        Runs one frame of the host: delivers button events, shows the long press indicator, animates
+        the active game and presents the LED changes. Returns the predicted hardware time of the frame.
+        """
+        timenow = self.clock.tick()
+        self.pollInput(timenow)
+        self.animate(timenow)
+        return self.flush(timenow)
+
+    def runFor(self, ns):
+        """
+        Fast-forwards a SimClock by ns, ticking at every wake time the games request on the way.
+        Returns the number of ticks run.
+        """
+        end = self.clock.now + ns
+        ticks = 0
+        while self.clock.nextDeadline() is not None and self.clock.nextDeadline() <= end:
+            self.clock.skipToDeadline()
+            self.tick()
+            ticks += 1
+        self.clock.now = end
+        self.tick()
+        return ticks + 1
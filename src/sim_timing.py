@@ -0,0 +1,147 @@
+# Hardware timing emulation models for the Neotrellis Simulator
+
+# Copyright (C) 2023 Paul 'Footleg' Fretwell
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Timing models predict how long the operations the simulator performs would take on the real
+hardware, without blocking the host CPU. The simulator charges each LED write, LED read and
+button sync to the model, and at the end of every frame asks the model for the time the frame
+would have spent on the hardware.
+"""
+
+# Clock cycles per byte on the I2C bus (8 data bits plus the ack bit)
+I2C_BITS_PER_BYTE = 9
+# Clock cycles for the start and stop conditions of a transaction
+I2C_FRAMING_BITS = 2
+
+
+class NoTiming:
+    """
+    Cost model which charges nothing, so the simulator runs as fast as the PC allows.
+    """
+    name = "off"
+
+    def __init__(self):
+        self.frameNs = 0
+        self.lastFrameNs = 0
+        self.maxFrameNs = 0
+        self.frames = 0
+        self.totalNs = 0
+
+    def boardWrite(self, pixels):
+        pass
+
+    def pixelRead(self):
+        pass
+
+    def show(self):
+        pass
+
+    def sync(self, events=0):
+        pass
+
+    def endFrame(self):
+        """
+        Closes the current frame and returns the time in ns it is predicted to take on the hardware
+        """
+        self.lastFrameNs = self.frameNs
+        if self.frameNs > self.maxFrameNs:
+            self.maxFrameNs = self.frameNs
+        self.totalNs += self.frameNs
+        self.frames += 1
+        self.frameNs = 0
+        return self.lastFrameNs
+
+    def averageFrameNs(self):
+        if self.frames == 0:
+            return 0
+        return self.totalNs // self.frames
+
+    def resetStats(self):
+        self.maxFrameNs = 0
+        self.frames = 0
+        self.totalNs = 0
+
+
+class I2CTiming(NoTiming):
+    """
+    Cost model for a set of seesaw NeoTrellis boards sharing one I2C bus. Every transaction costs
+    a fixed latency (driver overhead and seesaw processing delays) plus the time to clock its
+    bytes (including the address byte) over the bus at busHz.
+
+    Defaults match the 3x3 MultiTrellis in code.py on a 100kHz bus:
+      - A framebuffer flush writes a range of pixels on a board in NEOPIXEL_BUF transactions of up to
+        runPixels pixels each (the seesaw takes at most 30 data bytes per write), then one NEOPIXEL_SHOW
+        transaction (2 register bytes). A NEOPIXEL_BUF transaction has 2 register bytes and 2 offset
+        bytes, plus 3 colour bytes per pixel.
+      - getColour reads the colour from host memory, so costs no bus time.
+      - A sync polls the KEYPAD_COUNT register of every board (write 2 bytes, wait, read 1 byte),
+        and reads back events from the board in a further transaction when any are waiting.
+    """
+    name = "i2c"
+
+    def __init__(self, boards=9, busHz=100000, transactionLatencyNs=50000, readDelayNs=1000000,
+                 pixelBytes=7, showBytes=2, runPixels=10, readNs=0):
+        super().__init__()
+        self.boards = boards
+        self.busHz = busHz
+        self.transactionLatencyNs = transactionLatencyNs
+        self.readDelayNs = readDelayNs
+        self.pixelBytes = pixelBytes
+        self.showBytes = showBytes
+        self.runPixels = runPixels
+        self.readNs = readNs
+
+    def transaction(self, nbytes):
+        """
+        Charges one I2C transaction transferring nbytes after the address byte
+        """
+        bits = (nbytes + 1) * I2C_BITS_PER_BYTE + I2C_FRAMING_BITS
+        self.frameNs += self.transactionLatencyNs + bits * 1000000000 // self.busHz
+
+    def boardWrite(self, pixels):
+        for start in range(0, pixels, self.runPixels):
+            run = min(self.runPixels, pixels - start)
+            self.transaction(self.pixelBytes + (run - 1) * 3)
+        self.show()
+
+    def pixelRead(self):
+        self.frameNs += self.readNs
+
+    def show(self):
+        self.transaction(self.showBytes)
+
+    def sync(self, events=0):
+        for b in range(self.boards):
+            # Request the event count, wait for the seesaw to respond, then read it back
+            self.transaction(2)
+            self.frameNs += self.readDelayNs
+            self.transaction(1)
+        if events > 0:
+            # Event FIFO read (each event is one byte, driver reads 2 extra)
+            self.transaction(2)
+            self.frameNs += self.readDelayNs
+            self.transaction(events + 2)
+
+
+class NeoTrellis3x3Timing(I2CTiming):
+    """
+    Timing profile for the 3x3 array of NeoTrellis boards on the default 100kHz bus set up in code.py
+    """
+    name = "neotrellis3x3"
+
+    def __init__(self):
+        super().__init__(boards=9, busHz=100000)
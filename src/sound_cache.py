@@ -0,0 +1,160 @@
+# Lazy loading sound cache for the NeoTrellis host programs
+
+# Copyright (C) 2023 Paul 'Footleg' Fretwell
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Sounds are opened the first time they are played rather than all at boot, and kept open in a
+cache up to a memory budget. When opening a sound would exceed the budget, the least recently
+played sounds are closed to make room. The active game can pin the sounds it plays often, so
+they are loaded up front and never evicted.
+
+The cache does not know how sounds are stored. The host passes in a loader which opens the
+sound file at a path (a WaveFile on the hardware, a pygame Sound in the simulator), and
+optionally a cost function giving the bytes of memory a loaded sound uses, a release function
+which frees it and a busy function which tells whether a sound is still playing (busy sounds
+are not evicted).
+
+Each sound key is loaded from the file given for it in the files dictionary, or otherwise from
+<key>.wav in the sounds directory. A key with no file is remembered as missing, so it is only
+looked for once.
+"""
+
+import os
+
+# Directory the sound files are loaded from
+SOUND_DIR = "./sounds"
+
+# Sound files with names which do not match their keys
+SOUND_FILES = {
+    'glass_break': SOUND_DIR + "/GlassBreak.wav",
+}
+
+
+def fileSize(path, sound):
+    """
+    Default cost of a loaded sound: the size of its file (a fully decoded sound is at least this big)
+    """
+    return os.stat(path)[6]
+
+
+class SoundCache:
+    def __init__(self, loader, budget, cost=fileSize, release=None, busy=None, files=SOUND_FILES, directory=SOUND_DIR):
+        self.loader = loader
+        self.budget = budget
+        self.cost = cost
+        self.release = release
+        self.busy = busy
+        self.files = files
+        self.directory = directory
+        # Loaded sounds by key, each entry is [sound, cost, last use]
+        self.entries = {}
+        self.used = 0
+        self.useCount = 0
+        self.pinned = set()
+        self.missing = set()
+        # Statistics of the cache use
+        self.hits = 0
+        self.loads = 0
+        self.evictions = 0
+
+    def path(self, key):
+        path = self.files.get(key)
+        if path is None:
+            path = f"{self.directory}/{key}.wav"
+        return path
+
+    def get(self, key):
+        """
+        Returns the sound for the key, loading it if it is not already cached.
+        Raises KeyError if there is no sound file for the key.
+        """
+        self.useCount += 1
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            entry[2] = self.useCount
+            return entry[0]
+        if key in self.missing:
+            raise KeyError(key)
+
+        path = self.path(key)
+        try:
+            sound = self.loader(path)
+            cost = self.cost(path, sound)
+        except OSError:
+            self.missing.add(key)
+            raise KeyError(key)
+        self.loads += 1
+        self.makeRoom(cost)
+        self.entries[key] = [sound, cost, self.useCount]
+        self.used += cost
+        return sound
+
+    def makeRoom(self, cost):
+        # Evict the least recently used sounds until the new sound fits in the budget. Pinned
+        # sounds are kept, and so are the sound played last and any others still playing.
+        while self.used + cost > self.budget:
+            oldest = None
+            latest = 0
+            for key, entry in self.entries.items():
+                if entry[2] > latest:
+                    latest = entry[2]
+            for key, entry in self.entries.items():
+                if key in self.pinned or entry[2] == latest:
+                    continue
+                if self.busy is not None and self.busy(entry[0]):
+                    continue
+                if oldest is None or entry[2] < self.entries[oldest][2]:
+                    oldest = key
+            if oldest is None:
+                # Nothing left to evict, go over budget rather than fail to play
+                return
+            self.evict(oldest)
+
+    def evict(self, key):
+        sound, cost, lastUse = self.entries.pop(key)
+        self.used -= cost
+        self.evictions += 1
+        if self.release is not None:
+            self.release(sound)
+
+    def pin(self, keys):
+        """
+        Loads the sounds for the keys and keeps them cached, replacing the previously pinned set.
+        Sounds no longer pinned stay cached until they are evicted. Keys with no sound file are
+        ignored. Pass an empty list to unpin everything.
+        """
+        # Pin the whole set first, so loading one sound of the set cannot evict another
+        self.pinned = set(keys)
+        for key in keys:
+            try:
+                self.get(key)
+            except KeyError:
+                self.pinned.discard(key)
+
+    def clear(self):
+        """
+        Closes all the cached sounds, including pinned ones
+        """
+        for key in list(self.entries):
+            self.evict(key)
+        self.pinned = set()
+
+    def report(self):
+        """
+        Returns a one line summary of the cache use
+        """
+        return f"sounds: {len(self.entries)} cached {self.used}/{self.budget} bytes, {self.hits} hits {self.loads} loads {self.evictions} evictions"
@@ -0,0 +1,133 @@
+# Timeline tracing for the NeoTrellis simulator
+
+# Copyright (C) 2023 Paul 'Footleg' Fretwell
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+A tracer records a timeline of spans of the simulator host (button event dispatch, animating
+the game, each flush and each sound played) and saves it in the Chrome trace event format, which
+can be opened in Perfetto (https://ui.perfetto.dev) or chrome://tracing to see which frames ran
+long and what they were doing.
+
+Spans are kept in a ring buffer of fixed size allocated up front, so tracing a long session
+does not grow the memory used or stop to allocate. When the buffer is full the oldest spans are
+overwritten, so the trace holds the most recent part of the session. Each span has up to three
+argument values, kept in parallel slots and named by SPAN_ARGS when the trace is exported.
+
+Example:
+    host.tracer = Tracer()
+    ...
+    host.tracer.save("session.trace.json")
+"""
+
+import array
+import json
+import time
+
+# Number of spans kept by default
+TRACE_CAPACITY = 100000
+
+# Names of the argument values recorded with each kind of span
+SPAN_ARGS = {
+    "play": ("key",),
+    "btnEvent": ("x", "y", "press"),
+    "animate": ("animations",),
+    "flush": ("pixelsSent",),
+}
+
+
+class Tracer:
+    def __init__(self, capacity=TRACE_CAPACITY):
+        self.capacity = capacity
+        # Name, start and duration (ns) and argument values of each span, head is the slot written next
+        self.names = [None] * capacity
+        self.firsts = [None] * capacity
+        self.seconds = [None] * capacity
+        self.thirds = [None] * capacity
+        self.starts = array.array('q', bytes(8 * capacity))
+        self.durations = array.array('q', bytes(8 * capacity))
+        self.head = 0
+        self.count = 0
+        self.origin = time.monotonic_ns()
+
+    def now(self):
+        """
+        Returns the time to pass to end() as the start of a span (the monotonic time, as used by
+        the host counters)
+        """
+        return time.monotonic_ns()
+
+    def end(self, name, started, first=None, second=None, third=None):
+        """
+        Records a span which started at the time given (from now()) and ends now, with the values
+        of the arguments named for the span in SPAN_ARGS
+        """
+        i = self.head
+        self.names[i] = name
+        self.firsts[i] = first
+        self.seconds[i] = second
+        self.thirds[i] = third
+        self.starts[i] = started
+        self.durations[i] = time.monotonic_ns() - started
+        self.head = (i + 1) % self.capacity
+        self.count += 1
+
+    def dropped(self):
+        """
+        Returns the number of spans overwritten because the buffer was full
+        """
+        return max(self.count - self.capacity, 0)
+
+    def events(self):
+        """
+        Returns the recorded spans, oldest first, as Chrome trace complete events (times in us)
+        """
+        kept = min(self.count, self.capacity)
+        first = (self.head - kept) % self.capacity
+        events = []
+        for n in range(kept):
+            i = (first + n) % self.capacity
+            event = {
+                "name": self.names[i],
+                "ph": "X",
+                "ts": (self.starts[i] - self.origin) / 1000,
+                "dur": self.durations[i] / 1000,
+                "pid": 1,
+                "tid": 1,
+            }
+            argNames = SPAN_ARGS.get(self.names[i])
+            if argNames:
+                event["args"] = dict(zip(argNames, (self.firsts[i], self.seconds[i], self.thirds[i])))
+            events.append(event)
+        return events
+
+    def export(self, stream):
+        """
+        Writes the trace to a text stream as Chrome trace JSON
+        """
+        json.dump({
+            "traceEvents": self.events(),
+            "displayTimeUnit": "ms",
+            "otherData": {"spans": self.count, "dropped": self.dropped()},
+        }, stream)
+
+    def save(self, path):
+        with open(path, "w") as stream:
+            self.export(stream)
+
+    def clear(self):
+        self.head = 0
+        self.count = 0
+        self.origin = time.monotonic_ns()
@@ -16,7 +16,7 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import random
-import time
+import log
 
 OFF = (0, 0, 0)
 RED = (255, 0, 0)
@@ -37,8 +37,28 @@ BORDER = GREEN
 AMMO = CYAN
 
 TURNTIME = 2200000000
+SINKTIME = TURNTIME * 3 // 2
+GAMEOVERTIME = TURNTIME * 4
 ANIMATEINTERVAL = 330000000
-MAXSHOTS = 44
+
+# Size of the playing area inside the border, and the position of the right and bottom edges of
+# the border (the top and left edges are at 0)
+GRIDSIZE = 10
+EDGE = GRIDSIZE + 1
+
+# Corners of the border around the playing area, clockwise from the top left. The ammo counter
+# counts around the border in this order, one side of the border for each difficulty level.
+BORDERPATH = [(0,0),(EDGE,0),(EDGE,EDGE),(0,EDGE),(0,1)]
+MAXSHOTS = 4 * EDGE
+# Brightness of the border relative to the playing area
+BORDERBRIGHTNESS = 0.5
+
+# Number of times the ships are laid out afresh before giving up, if a ship is left with no room
+MAXLAYOUTS = 10
+
+# Sound effects of the game, played at the volume set by the player
+MAXVOLUME = 4
+SOUNDS = ["QuickBombDrop", "WaterSplash", "SeaMineExplosion", "EpicExplosion"]
 
 """
 No. Class of ship Size
@@ -56,14 +76,22 @@ class Battleships:
 
         self.enableBtns = False
         self.audioVolume = 1
-        self.flipflop = False
         self.maxTries = MAXSHOTS
-        
+        self.animation = None
+        # Keep the effects loaded, so the first shot does not wait for them
+        self.host.preloadSounds(SOUNDS)
+        # Show the border (score and ammo counter) dimmer than the playing area
+        for x, y, w, h in ((0,0,EDGE+1,1),(0,EDGE,EDGE+1,1),(0,1,1,GRIDSIZE),(EDGE,1,1,GRIDSIZE)):
+            self.host.setRegionBrightness(x, y, w, h, BORDERBRIGHTNESS)
+
         self.startGame()
 
 
     def startGame(self):
         self.enableBtns = False
+        # Stop any animation of the previous game
+        self.host.animator.cancel(self.animation)
+        self.animation = None
 
         # Initialise game variables
         self.btnDown = False
@@ -79,42 +107,20 @@ class Battleships:
         self.cruiser = [[0,0,0],[0,0,0],[0,0,0]]
         self.submarine = [[0,0,0],[0,0,0],[0,0,0]]
         self.destroyer = [[0,0,0],[0,0,0]]
+        self.ships = [self.carrier, self.battleship, self.cruiser, self.submarine, self.destroyer]
+
+        # Number of hits on each ship
+        self.hits = bytearray(len(self.ships))
 
         # Draw border showing amount of ammo
-        counter = 0
-        colour = AMMO
-        for x in range(11):
-            counter += 1
-            if counter > self.maxTries:
-                colour = BORDER
-            self.host.setColour( x, 0, colour )
-        for y in range(11):
-            counter += 1
-            if counter > self.maxTries:
-                colour = BORDER
-            self.host.setColour( 11, y, colour )
-        for x in range(11):
-            counter += 1
-            if counter > self.maxTries:
-                colour = BORDER
-            self.host.setColour( 11-x, 11, colour )
-        for y in range(11):
-            counter += 1
-            if counter > self.maxTries:
-                colour = BORDER
-            self.host.setColour( 0, 11-y, colour )
+        self.host.drawPolyline(BORDERPATH, BORDER)
+        self.host.drawPolyline(BORDERPATH, AMMO, self.maxTries)
 
         # Draw playing area
-        for y in range(1,11):
-            for x in range(1,11):
-                self.host.setColour( x, y, NOTTRIED )
+        self.host.fillRect(1, 1, GRIDSIZE, GRIDSIZE, NOTTRIED)
 
         # Place ships
-        self.placeShip(self.carrier)
-        self.placeShip(self.battleship)
-        self.placeShip(self.cruiser)
-        self.placeShip(self.submarine)
-        self.placeShip(self.destroyer)
+        self.placeShips()
 
         # Allow player to start taking shots
         self.enableBtns = True
@@ -126,7 +132,7 @@ class Battleships:
                 # Only allow one button to be down at a time
                 if self.btnDown == False:
                     # Check if a valid button selection for the game
-                    if 0 < x < 11 and 0 < y < 11 and self.host.getColour(x,y) == NOTTRIED:
+                    if 0 < x <= GRIDSIZE and 0 < y <= GRIDSIZE and self.host.getColour(x,y) == NOTTRIED:
                         self.btnDown = True
                         self.activeBtn = (x,y)
                         self.host.setColour(x,y,WHITE,False)
@@ -137,136 +143,93 @@ class Battleships:
                     self.btnDown = False
                     # Take turn if at turn taking game stage
                     if self.gamestage == 0:
-                        self.turnStarted = time.monotonic_ns()
-                        self.animatetime = self.turnStarted - ANIMATEINTERVAL # Set to time out immediately
+                        # Flash the button while the shot comes in, timed from the moment the button was released
+                        self.turnStarted = self.host.eventTime
                         self.gamestage = 1
-                        if self.audioVolume == 1:
-                            self.host.play('QuickBombDrop_1')
-                        elif self.audioVolume == 2:
-                            self.host.play('QuickBombDrop_2')
-                        elif self.audioVolume == 3:
-                            self.host.play('QuickBombDrop_3')
-                        elif self.audioVolume == 4:
-                            self.host.play('QuickBombDrop_4')
+                        self.animation = self.host.animator.blink(self.host, x, y, [YELLOW, NOTTRIED], ANIMATEINTERVAL,
+                                                                  duration=TURNTIME, onDone=self.shotLanded, start=self.turnStarted)
+                        self.playSound('QuickBombDrop')
                     
 
     def longPressEvent(self, x, y):
         if y == 0:
-            if x < 5:
+            if x <= MAXVOLUME:
                 self.audioVolume = x
-                print(f"Audio Volume: {self.audioVolume}")
+                log.info("Audio Volume: %d", self.audioVolume)
         elif y == 1:
             if x < 4 and self.misses == 0:
                 # Set game difficulty if at start of game
-                self.maxTries = 11 + x * 11
+                self.maxTries = EDGE + x * EDGE
                 # Start new game to restart and update display
                 self.startGame()
 
 
     def animate(self):
-        # Increment animations which run independent of button presses
-        if self.activeBtn != (-1,-1) and self.gamestage == 1:
-            # Animate shot incoming
-            timenow = time.monotonic_ns()
-            # Active turn
-            #print(f"turn active started at {self.turnStarted} animatetime {self.animatetime} timenow {timenow}")
-            if timenow - self.turnStarted > TURNTIME:
-                print(f"turn started at {self.turnStarted} ended at {timenow}")
-                # Shot landed, determine outcome
-                outcome = self.takeShot(self.activeBtn[0],self.activeBtn[1]) 
-                if outcome == 0:
-                    # Shot missed
-                    self.misses += 1
-                    self.updateScore()
-                    self.host.setColour(self.activeBtn[0],self.activeBtn[1],BLUE)
-                    if self.audioVolume == 1:
-                        self.host.play('WaterSplash_1')
-                    elif self.audioVolume == 2:
-                        self.host.play('WaterSplash_2')
-                    elif self.audioVolume == 3:
-                        self.host.play('WaterSplash_3')
-                    elif self.audioVolume == 4:
-                        self.host.play('WaterSplash_4')
-                    if self.misses >= self.maxTries:
-                        # Game over, out of ammo
-                        self.endGame()
-                    else:
-                        self.endTurn()
-                else:
-                    self.gamestage = outcome + 1
-                    if self.gamestage == 3:
-                        # Play ship sunk sound (animate loop will show sinking with LEDs)
-                        if self.audioVolume == 1:
-                            self.host.play('EpicExplosion_1')
-                        elif self.audioVolume == 2:
-                            self.host.play('EpicExplosion_2')
-                        elif self.audioVolume == 3:
-                            self.host.play('EpicExplosion_3')
-                        elif self.audioVolume == 4:
-                            self.host.play('EpicExplosion_4')
-                        # Reset timers for animation of ship sinking
-                        self.turnStarted = time.monotonic_ns()
-                        self.animatetime = self.turnStarted - ANIMATEINTERVAL # Set to time out immediately
-            elif timenow - self.animatetime > ANIMATEINTERVAL:
-                print("turn animating")
-                self.animatetime = time.monotonic_ns()
-                # Flash button
-                if self.host.getColour(self.activeBtn[0],self.activeBtn[1]) != YELLOW:
-                    self.host.setColour(self.activeBtn[0],self.activeBtn[1],YELLOW)
-                else:
-                    self.host.setColour(self.activeBtn[0],self.activeBtn[1],NOTTRIED)
-        elif self.gamestage == 2:
+        # Animations are run by the host animator
+        None
+
+
+    def shotLanded(self):
+        # Shot landed at the end of the incoming animation, determine outcome
+        self.animation = None
+        log.debug("turn started at %d ended at %d", self.turnStarted, self.host.clock.now)
+        outcome = self.takeShot(self.activeBtn[0],self.activeBtn[1])
+        if outcome == 0:
+            # Shot missed
+            self.misses += 1
+            self.updateScore()
+            self.host.setColour(self.activeBtn[0],self.activeBtn[1],BLUE)
+            self.playSound('WaterSplash')
+            if self.misses >= self.maxTries:
+                # Game over, out of ammo
+                self.endGame()
+            else:
+                self.endTurn()
+        elif outcome == 1:
             # Ship hit
+            self.gamestage = 2
             self.host.setColour(self.activeBtn[0],self.activeBtn[1],ORANGE)
-            if self.audioVolume == 1:
-                self.host.play('SeaMineExplosion_1')
-            elif self.audioVolume == 2:
-                self.host.play('SeaMineExplosion_2')
-            elif self.audioVolume == 3:
-                self.host.play('SeaMineExplosion_3')
-            elif self.audioVolume == 4:
-                self.host.play('SeaMineExplosion_4')
+            self.playSound('SeaMineExplosion')
             self.endTurn()
-        elif self.gamestage == 3:
-            # Animate ship sinking
-            timenow = time.monotonic_ns()
-            if timenow - self.turnStarted > TURNTIME * 1.5:
-                # Ship sunk
-                self.drawShip(self.activeShip,YELLOW,RED)
-                self.remainingships += -1
-                if self.remainingships > 0:
-                    self.endTurn()
-                else:
-                    # Game won
-                    self.endGame()
-            elif timenow - self.animatetime > ANIMATEINTERVAL:
-                print("sinking animation")
-                for pos in self.activeShip:
-                    rnd = random.randint(0,2)
-                    if rnd == 0:
-                        self.host.setColour(pos[0],pos[1],YELLOW)
-                    elif rnd == 1:
-                        self.host.setColour(pos[0],pos[1],ORANGE)
-                    elif rnd == 2:
-                        self.host.setColour(pos[0],pos[1],RED)
-                self.animatetime = time.monotonic_ns()
-        elif self.gamestage == 4:
-            # Animate ships to show remaining
-            timenow = time.monotonic_ns()
-            if timenow - self.turnStarted > TURNTIME * 4:
-                self.startGame()
-            elif timenow - self.animatetime > ANIMATEINTERVAL:
-                print("Game over animation")
-                self.flipflop = not self.flipflop
-                if self.flipflop:
-                    self.drawShip(self.carrier, DIMWHITE, YELLOW)
-                    self.drawShip(self.battleship, DIMWHITE, CYAN)
-                    self.drawShip(self.cruiser, DIMWHITE, GREEN)
-                    self.drawShip(self.submarine, DIMWHITE, MAGENTA)
-                    self.drawShip(self.destroyer, DIMWHITE, ORANGE)
-                else:
-                    self.showShips()
-                self.animatetime = time.monotonic_ns()
+        else:
+            # Ship sunk, play sound and show sinking with LEDs
+            self.gamestage = 3
+            self.playSound('EpicExplosion', priority=1)
+            self.animation = self.host.animator.every(ANIMATEINTERVAL, self.sinkFrame, duration=SINKTIME, onDone=self.shipSunk)
+
+
+    def sinkFrame(self,frame):
+        for pos in self.activeShip:
+            rnd = random.randint(0,2)
+            if rnd == 0:
+                self.host.setColour(pos[0],pos[1],YELLOW)
+            elif rnd == 1:
+                self.host.setColour(pos[0],pos[1],ORANGE)
+            elif rnd == 2:
+                self.host.setColour(pos[0],pos[1],RED)
+
+
+    def shipSunk(self):
+        self.animation = None
+        self.drawShip(self.activeShip,YELLOW,RED)
+        self.remainingships += -1
+        if self.remainingships > 0:
+            self.endTurn()
+        else:
+            # Game won
+            self.endGame()
+
+
+    def gameOverFrame(self,frame):
+        # Flash the ships to show those remaining
+        if frame % 2 == 0:
+            self.drawShip(self.carrier, DIMWHITE, YELLOW)
+            self.drawShip(self.battleship, DIMWHITE, CYAN)
+            self.drawShip(self.cruiser, DIMWHITE, GREEN)
+            self.drawShip(self.submarine, DIMWHITE, MAGENTA)
+            self.drawShip(self.destroyer, DIMWHITE, ORANGE)
+        else:
+            self.showShips()
 
 
     def endTurn(self):
@@ -277,110 +240,63 @@ class Battleships:
 
     def endGame(self):
         self.gamestage = 4
-        # Reset timers for animation of game ended
-        self.turnStarted = time.monotonic_ns()
-        self.animatetime = self.turnStarted - ANIMATEINTERVAL # Set to time out immediately
+        self.animation = self.host.animator.every(ANIMATEINTERVAL, self.gameOverFrame, duration=GAMEOVERTIME, onDone=self.startGame)
+
+
+    def playSound(self,key,priority=0):
+        # Play an effect scaled to the volume set by the player (0 is muted)
+        if self.audioVolume > 0:
+            self.host.play(key, priority, self.audioVolume / MAXVOLUME)
 
 
     def updateScore(self,colour=BORDER):
-        if self.misses < 12:
+        # Mark the shot used along the border path, one side of EDGE buttons at a time
+        if self.misses <= EDGE:
             self.host.setColour(self.misses-1, 0, colour)
-        elif self.misses < 23:
-            self.host.setColour(11, self.misses-12, colour)
-        elif self.misses < 34:
-            self.host.setColour(34-self.misses, 11, colour)
-        elif self.misses < 45:
-            self.host.setColour(0, 45-self.misses, colour)
+        elif self.misses <= 2 * EDGE:
+            self.host.setColour(EDGE, self.misses-EDGE-1, colour)
+        elif self.misses <= 3 * EDGE:
+            self.host.setColour(3*EDGE+1-self.misses, EDGE, colour)
+        elif self.misses <= 4 * EDGE:
+            self.host.setColour(0, 4*EDGE+1-self.misses, colour)
 
 
-    def checkPositionAgainstShip(self,ship,x,y):
-        hit = False
-        for i in range(len(ship)):
-            pos = ship[i]
-            chkX = pos[0]
-            chkY = pos[1]
-            if chkX == x and chkY == y:
-                hit = True
-                break
-            
-        return hit
-                
+    def gridIndex(self,x,y):
+        # Index of position x,y (1-10) in the occupancy grid
+        return (y - 1) * GRIDSIZE + x - 1
 
-    def checkPositionFree(self,x,y):
-        # Check all ships positions
-        # Carrier
-        hit = self.checkPositionAgainstShip(self.carrier,x,y)
-        if hit == False:
-            hit = self.checkPositionAgainstShip(self.battleship,x,y)
-        if hit == False:
-            hit = self.checkPositionAgainstShip(self.cruiser,x,y)
-        if hit == False:
-            hit = self.checkPositionAgainstShip(self.submarine,x,y)
-        if hit == False:
-            hit = self.checkPositionAgainstShip(self.destroyer,x,y)
-            
-        return not hit
-
-
-    def hitShip(self,ship,x,y):
-        intactSections = len(ship)
-        result = 0 # Default to miss
-        for i in range(len(ship)):
-            if x == ship[i][0] and y == ship[i][1]:
-                # Mark ship hit
-                ship[i][2] = 1
-                intactSections += -1
-                result = 1
-            elif ship[i][2] != 0:
-                intactSections += -1
 
-        if result == 1 and intactSections == 0:
-            result = 2 # Ship sunk
-        
-        return result
+    def checkPositionFree(self,x,y):
+        return self.shipAt[self.gridIndex(x,y)] == 0
 
 
     def takeShot(self,x,y):
-        # Check all ships positions against shot taken at x,y
-        # Carrier
-        hit = self.hitShip(self.carrier,x,y)
-        if hit == 0:
-            hit = self.hitShip(self.battleship,x,y)
-            if hit == 0:
-                hit = self.hitShip(self.cruiser,x,y)
-                if hit == 0:
-                    hit = self.hitShip(self.submarine,x,y)
-                    if hit == 0:
-                        hit = self.hitShip(self.destroyer,x,y)
-                        if hit == 2:
-                            # Sunk ship
-                            self.activeShip = self.destroyer
-                    elif hit == 2:
-                        # Sunk ship
-                        self.activeShip = self.submarine
-                elif hit == 2:
-                    # Sunk ship
-                    self.activeShip = self.cruiser
-            elif hit == 2:
-                # Sunk ship
-                self.activeShip = self.battleship
-        elif hit == 2:
+        # Look up the ship at the shot position x,y. Returns 0 for a miss, 1 for a hit, or 2 if
+        # the hit sank the ship (which becomes the active ship).
+        idx = self.gridIndex(x,y)
+        shipNo = self.shipAt[idx]
+        if shipNo == 0:
+            return 0
+        ship = self.ships[shipNo - 1]
+        section = ship[self.sectionAt[idx]]
+        if section[2] == 0:
+            # Mark ship hit
+            section[2] = 1
+            self.hits[shipNo - 1] += 1
+        if self.hits[shipNo - 1] == len(ship):
             # Sunk ship
-            self.activeShip = self.carrier
-
-        return hit
+            self.activeShip = ship
+            return 2
+        return 1
 
 
     def drawShip(self,ship,colour,hitColour):
+        # Draw the whole ship as a line, then mark the sections which have been hit
+        log.debug("Drawing ship in %s from %d,%d to %d,%d", colour, ship[0][0], ship[0][1], ship[-1][0], ship[-1][1])
+        self.host.drawPolyline([(ship[0][0],ship[0][1]),(ship[-1][0],ship[-1][1])], colour)
         for i in range(len(ship)):
-            x = ship[i][0]
-            y = ship[i][1]
-            if ship[i][2] == 0:
-                colour = colour
-            else:
-                colour = hitColour
-            print(f"Drawing in {colour} at {x},{y}")
-            self.host.setColour( x, y, colour )
+            if ship[i][2] != 0:
+                self.host.setColour( ship[i][0], ship[i][1], hitColour )
                 
 
     def showShips(self):
@@ -391,67 +307,85 @@ class Battleships:
         self.drawShip(self.destroyer, ORANGE, RED)
                 
 
+    def freeRuns(self):
+        # Returns the number of free positions running right and down from each position of the
+        # playing area (including the position itself), from one pass over the occupancy grid
+        runX = bytearray(GRIDSIZE * GRIDSIZE)
+        runY = bytearray(GRIDSIZE * GRIDSIZE)
+        for y in range(GRIDSIZE - 1, -1, -1):
+            for x in range(GRIDSIZE - 1, -1, -1):
+                idx = y * GRIDSIZE + x
+                if self.shipAt[idx] == 0:
+                    runX[idx] = runX[idx + 1] + 1 if x < GRIDSIZE - 1 else 1
+                    runY[idx] = runY[idx + GRIDSIZE] + 1 if y < GRIDSIZE - 1 else 1
+        return runX, runY
+
+
+    def legalPosition(self, length, runX, runY, pick=-1):
+        # Goes through every position (first section and orientation) where a ship of the given
+        # length fits without overlapping another ship (ships may touch, as in the original
+        # placement). Returns the number of legal positions, or with pick >= 0 the (x, y, dx, dy)
+        # of that legal position.
+        count = 0
+        for idx in range(GRIDSIZE * GRIDSIZE):
+            if runX[idx] >= length:
+                if count == pick:
+                    return (idx % GRIDSIZE + 1, idx // GRIDSIZE + 1, 1, 0)
+                count += 1
+            if runY[idx] >= length:
+                if count == pick:
+                    return (idx % GRIDSIZE + 1, idx // GRIDSIZE + 1, 0, 1)
+                count += 1
+        return count
+
+
+    def placeShips(self):
+        # Place every ship, starting the layout again on open sea if a ship is left with no room
+        for layout in range(MAXLAYOUTS):
+            # Occupancy grid of the playing area, holding the ship number (1-5, 0 for open sea)
+            # and the section of the ship at each position
+            self.shipAt = bytearray(GRIDSIZE * GRIDSIZE)
+            self.sectionAt = bytearray(GRIDSIZE * GRIDSIZE)
+            placed = True
+            for ship in self.ships:
+                if not self.placeShip(ship):
+                    placed = False
+                    break
+            if placed:
+                return
+            log.warning("Ships did not fit, starting layout %d again", layout + 1)
+        raise RuntimeError(f"Could not place the ships in {MAXLAYOUTS} layouts")
+
+
     def placeShip(self, ship):
-        print(f"Placing ship of size {len(ship)}")
-        # Find clear position for ship
-        placed = False
-        idx = 0
-        posX = 0
-        posY = 0
-        direction = -1
-        while placed == False:
-            if idx == 0:
-                # Place first piece of ship
-                # First clear ship position so it does not block itself
-                for i in range(len(ship)):
-                    ship[i][0] = posX
-                    ship[i][1] = posY
-                    ship[i][2] = 0
-                
-                # Pick Random position
-                posX = random.randrange(1,11)
-                posY = random.randrange(1,11)
-                if self.checkPositionFree(posX,posY):
-                    ship[idx][0] = posX
-                    ship[idx][1] = posY
-                    ship[idx][2] = 0
-                    idx += 1
-                    print(f"Placed first piece at: {posX}, {posY}")
-            elif idx < len(ship):
-                abort = False
-                # Set direction to try and place ship
-                if direction < 0:
-                    direction = random.randrange(0,3)
-                print(f"Direction: {direction}, idx: {idx}")
-                # Set position for next part of ship
-                if direction == 0:
-                    posY += -1
-                elif direction == 1:
-                    posX += 1
-                elif direction == 2:
-                    posY += 1
-                else:
-                    posX += -1
-                # Check ship position is still within play area
-                if posX > 0 and posX < 11 and posY > 0 and posY < 11:
-                    if self.checkPositionFree(posX,posY):
-                        ship[idx][0] = posX
-                        ship[idx][1] = posY
-                        ship[idx][2] = 0
-                        print(f"Placed piece {idx} at: {posX}, {posY}")
-                        idx += 1
-                    else:
-                        abort = True
-                        print(f"Position {posX},{posY} is not free")
-                else:
-                    abort = True
-                    print(f"Position {posX},{posY} is outside play area")
-              
-                if abort:
-                    # Reset tracking variables to restart placing of ship
-                    idx = 0
-                    direction = -1
-            else:
-                placed = True
-                print("Ship placed")
-        
\ No newline at end of file
+        # Place the ship at a position chosen at random from all the legal positions, so the time
+        # taken is bounded however full the board is. Returns False if the ship does not fit.
+        # Remove the ship from the grid if it was already placed, so it does not block itself
+        shipNo = 1
+        while self.ships[shipNo - 1] is not ship:
+            shipNo += 1
+        for pos in ship:
+            if 0 < pos[0] <= GRIDSIZE and 0 < pos[1] <= GRIDSIZE and self.shipAt[self.gridIndex(pos[0],pos[1])] == shipNo:
+                self.shipAt[self.gridIndex(pos[0],pos[1])] = 0
+        self.hits[shipNo - 1] = 0
+
+        runX, runY = self.freeRuns()
+        count = self.legalPosition(len(ship), runX, runY)
+        if count == 0:
+            log.warning("No room for ship of size %d", len(ship))
+            return False
+        x, y, dx, dy = self.legalPosition(len(ship), runX, runY, random.randrange(count))
+        if random.randrange(2):
+            # Start from either end, so the ship can run in any of the four directions
+            x, y, dx, dy = x + dx * (len(ship) - 1), y + dy * (len(ship) - 1), -dx, -dy
+
+        # Record the ship sections and the ship in the occupancy grid
+        for i in range(len(ship)):
+            ship[i][0] = x + dx * i
+            ship[i][1] = y + dy * i
+            ship[i][2] = 0
+            idx = self.gridIndex(ship[i][0],ship[i][1])
+            self.shipAt[idx] = shipNo
+            self.sectionAt[idx] = i
+        log.debug("Placed ship of size %d at %d,%d from %d legal positions", len(ship), x, y, count)
+        return True
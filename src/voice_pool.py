@@ -0,0 +1,117 @@
+# Voice allocation for playing overlapping sounds on the NeoTrellis host programs
+
+# Copyright (C) 2023 Paul 'Footleg' Fretwell
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+The voice pool shares a fixed number of mixer voices between the sounds the games play, so a
+new sound plays alongside the ones already playing instead of cutting them off.
+
+A new sound takes a free voice if there is one. When all the voices are busy it takes the voice
+playing the lowest priority sound, the oldest one of those if several have the same priority. A
+sound is dropped rather than interrupt sounds of a higher priority.
+
+A sound which is already playing is restarted on the voice playing it rather than started on a
+second voice. The sound cache hands out one sound object per key, and on the hardware a WaveFile
+is a single stream from the file, which two voices cannot read at the same time.
+
+The voices are objects with a play(sound) and stop() method, a playing property and a level
+property (0 to 1.0). On the hardware these are the voices of an audiomixer.Mixer, and the
+simulator wraps pygame mixer channels to match.
+"""
+
+# Default number of sounds which can play at the same time
+VOICE_COUNT = 4
+
+
+class VoicePool:
+    def __init__(self, voices):
+        self.voices = voices
+        count = len(voices)
+        # Sound, priority and start order of the last sound played on each voice
+        self.sounds = [None] * count
+        self.priorities = [0] * count
+        self.started = [0] * count
+        self.playCount = 0
+        # Statistics of the voice use
+        self.steals = 0
+        self.restarts = 0
+        self.dropped = 0
+
+    def allocate(self, priority, sound=None):
+        """
+        Returns the index of the voice to play a sound of the given priority on, or -1 if every
+        voice is playing a sound of higher priority. The voice already playing the sound is
+        returned if there is one (or -1 if that sound has a higher priority).
+        """
+        if sound is not None:
+            for i in range(len(self.voices)):
+                if self.sounds[i] is sound and self.voices[i].playing:
+                    return i if self.priorities[i] <= priority else -1
+        steal = -1
+        for i in range(len(self.voices)):
+            if not self.voices[i].playing:
+                return i
+            if self.priorities[i] <= priority:
+                if steal < 0 or self.priorities[i] < self.priorities[steal] or \
+                        (self.priorities[i] == self.priorities[steal] and self.started[i] < self.started[steal]):
+                    steal = i
+        return steal
+
+    def play(self, sound, priority=0, level=1.0):
+        """
+        Plays the sound on a voice at the given level, returning the voice index, or -1 if the
+        sound was dropped
+        """
+        i = self.allocate(priority, sound)
+        if i < 0:
+            self.dropped += 1
+            return -1
+        voice = self.voices[i]
+        if voice.playing:
+            if self.sounds[i] is sound:
+                self.restarts += 1
+            else:
+                self.steals += 1
+            voice.stop()
+        self.playCount += 1
+        self.sounds[i] = sound
+        self.priorities[i] = priority
+        self.started[i] = self.playCount
+        voice.level = level
+        voice.play(sound)
+        return i
+
+    def setLevel(self, i, level):
+        self.voices[i].level = level
+
+    def isPlaying(self, sound):
+        """
+        Returns True if the sound is playing on any voice (so it must not be closed)
+        """
+        for i in range(len(self.voices)):
+            if self.sounds[i] is sound and self.voices[i].playing:
+                return True
+        return False
+
+    def report(self):
+        """
+        Returns a one line summary of the voice use
+        """
+        busy = 0
+        for voice in self.voices:
+            if voice.playing:
+                busy += 1
+        return f"voices: {busy}/{len(self.voices)} playing, {self.playCount} played {self.steals} stolen {self.restarts} restarted {self.dropped} dropped"
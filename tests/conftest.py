@@ -0,0 +1,75 @@
+# Test setup for the headless simulator host
+
+# Copyright (C) 2023 Paul 'Footleg' Fretwell
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import random
+import sys
+
+import pytest
+
+# The modules are run from src on the hardware and in the simulator, so import them from there.
+# src goes at the end of the path, as code.py (the CircuitPython entry point) would hide the
+# standard library module of the same name which pdb imports.
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+import sim_host
+from host_clock import SimClock
+
+# Seed used for the games which place things at random
+SEED = 1234
+
+
+class RecordingGame:
+    """
+    Game which records the button events the host passes it
+    """
+    def __init__(self, host):
+        self.host = host
+        self.events = []
+        self.longPresses = []
+
+    def btnEvent(self, x, y, press):
+        self.events.append((x, y, press))
+
+    def longPressEvent(self, x, y):
+        self.longPresses.append((x, y))
+
+    def animate(self):
+        pass
+
+
+@pytest.fixture
+def makeHost():
+    """
+    Returns a function which starts a game on a headless host with a simulated clock
+    """
+    def make(gameClass=RecordingGame, seed=SEED, **kwargs):
+        random.seed(seed)
+        kwargs.setdefault("clock", SimClock())
+        return sim_host.Host(sim_host.MultiTrellis(), sim_host.RecordingAudio(), gameClass=gameClass, **kwargs)
+    return make
+
+
+def tap(host, x, y, hold=50000000):
+    """
+    Presses button x,y, holds it for hold ns of game time and releases it
+    """
+    host.trellis.press(x, y)
+    host.tick()
+    host.runFor(hold)
+    host.trellis.release(x, y)
+    host.tick()
@@ -0,0 +1,144 @@
+# Tests of the animation timeline
+
+# Copyright (C) 2023 Paul 'Footleg' Fretwell
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+from animation import Animator
+from host_clock import SimClock
+
+RED = (255, 0, 0)
+GREEN = (0, 255, 0)
+
+
+class Buttons:
+    """
+    Host which records the colours set on each button
+    """
+    def __init__(self):
+        self.colours = {}
+        self.sets = []
+
+    def setColour(self, x, y, colour, store=True):
+        self.colours[(x, y)] = colour
+        self.sets.append((x, y, colour))
+
+
+def makeAnimator():
+    clock = SimClock()
+    return Animator(clock), clock
+
+
+def runUntil(animator, clock, end):
+    # Ticks at every wake time the animations ask for up to end
+    while clock.nextDeadline() is not None and clock.nextDeadline() <= end:
+        clock.skipToDeadline()
+        clock.tick()
+        animator.update(clock.now)
+
+
+def test_every_runs_frames_at_fixed_cadence_then_done():
+    animator, clock = makeAnimator()
+    frames = []
+    done = []
+    animator.every(100, lambda frame: frames.append((frame, clock.now)), duration=300,
+                   onDone=lambda: done.append(clock.now))
+    runUntil(animator, clock, 1000)
+    assert frames == [(0, 0), (1, 100), (2, 200)]
+    assert done == [300]
+    assert len(animator) == 0
+
+
+def test_late_tick_skips_missed_frames():
+    animator, clock = makeAnimator()
+    frames = []
+    animator.every(100, frames.append, frames=10)
+    animator.update(0)
+    clock.now = 350
+    animator.update(clock.now)
+    assert frames == [0, 1]
+    assert animator.nextDue() == 400
+
+
+def test_after_calls_once():
+    animator, clock = makeAnimator()
+    calls = []
+    animator.after(500, lambda: calls.append(clock.now))
+    runUntil(animator, clock, 2000)
+    assert calls == [500]
+
+
+def test_blink_cycles_colours():
+    animator, clock = makeAnimator()
+    host = Buttons()
+    animator.blink(host, 1, 2, [RED, GREEN], 100, frames=3)
+    runUntil(animator, clock, 1000)
+    assert host.sets == [(1, 2, RED), (1, 2, GREEN), (1, 2, RED)]
+
+
+def test_tween_ends_on_target_colour():
+    animator, clock = makeAnimator()
+    host = Buttons()
+    done = []
+    animator.tween(host, 0, 0, (0, 0, 0), (200, 100, 0), 400, 4, onDone=lambda: done.append(clock.now))
+    runUntil(animator, clock, 1000)
+    assert [colour for x, y, colour in host.sets] == [(0, 0, 0), (50, 25, 0), (100, 50, 0), (150, 75, 0), (200, 100, 0)]
+    assert done == [400]
+
+
+def test_tween_last_step_lands_at_end_of_uneven_duration():
+    animator, clock = makeAnimator()
+    host = Buttons()
+    times = []
+    animator.tween(host, 0, 0, (0, 0, 0), (90, 0, 0), 1000, 3, onDone=lambda: times.append(clock.now))
+    runUntil(animator, clock, 2000)
+    assert [colour for x, y, colour in host.sets] == [(0, 0, 0), (30, 0, 0), (60, 0, 0), (90, 0, 0)]
+    assert times == [1000]
+
+
+def test_keyframes_show_each_colour_at_its_time():
+    animator, clock = makeAnimator()
+    host = Buttons()
+    seen = []
+    animator.keyframes(host, 3, 3, [(0, RED), (250, GREEN), (400, RED)], onDone=lambda: seen.append(clock.now))
+    runUntil(animator, clock, 1000)
+    assert host.sets[:2] == [(3, 3, RED), (3, 3, GREEN)]
+    assert host.colours[(3, 3)] == RED
+    assert seen == [400]
+
+
+def test_cancelled_animation_does_not_finish():
+    animator, clock = makeAnimator()
+    done = []
+    anim = animator.every(100, lambda frame: None, duration=300, onDone=lambda: done.append(True))
+    animator.update(0)
+    animator.cancel(anim)
+    animator.cancel(anim)
+    runUntil(animator, clock, 1000)
+    assert done == []
+    assert len(animator) == 0
+
+
+def test_attached_animations_carry_on_after_detach():
+    animator, clock = makeAnimator()
+    frames = []
+    animator.every(100, lambda frame: frames.append((frame, clock.now)), frames=3)
+    runUntil(animator, clock, 100)
+    detached = animator.detach()
+    assert len(animator) == 0
+    clock.now = 1000
+    animator.attach(detached, 850)
+    runUntil(animator, clock, 5000)
+    assert frames == [(0, 0), (1, 100), (2, 1050)]
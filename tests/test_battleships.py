@@ -0,0 +1,175 @@
+# Tests playing Battleships through to the end of the game on the headless host
+
+# Copyright (C) 2023 Paul 'Footleg' Fretwell
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import pytest
+
+from conftest import tap
+import trellisbattleships as tb
+
+# Time allowed for a shot to land and any sinking animation to finish
+SHOT_TIME = tb.TURNTIME + tb.SINKTIME + 500000000
+
+
+def shoot(host, x, y):
+    tap(host, x, y)
+    host.runFor(SHOT_TIME)
+
+
+def plays(host, key):
+    # Number of times the sound was played, at any volume
+    return sum(1 for played in host.audio.plays if played.startswith(key))
+
+
+def shipsOf(game):
+    return [game.carrier, game.battleship, game.cruiser, game.submarine, game.destroyer]
+
+
+def test_out_of_ammo_ends_game(makeHost):
+    host = makeHost(tb.Battleships)
+    game = host.activeGame
+    misses = [(x, y) for y in range(1, tb.GRIDSIZE + 1) for x in range(1, tb.GRIDSIZE + 1) if game.checkPositionFree(x, y)]
+    for x, y in misses[:tb.MAXSHOTS]:
+        assert game.gamestage == 0
+        shoot(host, x, y)
+        assert host.getColour(x, y) == tb.MISS
+    assert game.misses == tb.MAXSHOTS
+    assert game.gamestage == 4
+    assert plays(host, "WaterSplash") == tb.MAXSHOTS
+    # The game starts again once the game over animation has finished
+    host.runFor(tb.GAMEOVERTIME)
+    assert game.gamestage == 0
+    assert game.misses == 0
+
+
+def test_sinking_every_ship_wins_game(makeHost):
+    host = makeHost(tb.Battleships)
+    game = host.activeGame
+    for ship in shipsOf(game):
+        for x, y, hit in list(ship):
+            shoot(host, x, y)
+    assert game.remainingships == 0
+    assert game.misses == 0
+    assert game.gamestage == 4
+    assert plays(host, "EpicExplosion") == 5
+    assert plays(host, "SeaMineExplosion") == 17 - 5
+    assert plays(host, "WaterSplash") == 0
+
+
+def test_shot_on_tried_cell_is_ignored(makeHost):
+    host = makeHost(tb.Battleships)
+    game = host.activeGame
+    x, y = next((x, y) for y in range(1, tb.GRIDSIZE + 1) for x in range(1, tb.GRIDSIZE + 1) if game.checkPositionFree(x, y))
+    shoot(host, x, y)
+    shoot(host, x, y)
+    assert game.misses == 1
+    assert plays(host, "QuickBombDrop") == 1
+
+
+def test_long_press_on_top_row_sets_volume(makeHost):
+    host = makeHost(tb.Battleships)
+    tap(host, 2, 0, hold=1500000000)
+    shoot(host, 5, 5)
+    assert host.audio.volumes[0] == 2 / tb.MAXVOLUME
+    # Volume 0 mutes the effects
+    tap(host, 0, 0, hold=1500000000)
+    shoot(host, 6, 6)
+    assert len(host.audio.plays) == 2
+
+
+def test_occupancy_grid_matches_ships(makeHost):
+    host = makeHost(tb.Battleships)
+    game = host.activeGame
+    for shipNo, ship in enumerate(game.ships, 1):
+        for section, (x, y, hit) in enumerate(ship):
+            idx = game.gridIndex(x, y)
+            assert game.shipAt[idx] == shipNo
+            assert game.sectionAt[idx] == section
+    assert sum(1 for shipNo in game.shipAt if shipNo) == 17
+
+
+def test_legal_positions_counted_on_open_sea(makeHost):
+    game = makeHost(tb.Battleships).activeGame
+    game.shipAt[:] = bytes(len(game.shipAt))
+    runX, runY = game.freeRuns()
+    for length in (2, 5):
+        assert game.legalPosition(length, runX, runY) == 2 * tb.GRIDSIZE * (tb.GRIDSIZE - length + 1)
+
+
+def test_ship_which_does_not_fit_is_not_placed(makeHost):
+    game = makeHost(tb.Battleships).activeGame
+    # Leave only every other position free, so no run of two remains
+    for idx in range(len(game.shipAt)):
+        if (idx % tb.GRIDSIZE + idx // tb.GRIDSIZE) % 2:
+            game.shipAt[idx] = 1
+    assert not game.placeShip(game.destroyer)
+
+
+def test_ships_may_touch_but_not_overlap(makeHost):
+    game = makeHost(tb.Battleships).activeGame
+    game.shipAt[:] = bytes(len(game.shipAt))
+    game.shipAt[game.gridIndex(1, 1)] = 1
+    runX, runY = game.freeRuns()
+    # Only the two positions covering 1,1 are lost, those next to it are still legal
+    assert game.legalPosition(2, runX, runY) == 2 * tb.GRIDSIZE * (tb.GRIDSIZE - 1) - 2
+
+
+def test_layout_starts_again_when_a_ship_has_no_room(makeHost, monkeypatch):
+    game = makeHost(tb.Battleships).activeGame
+    placeShip = tb.Battleships.placeShip
+    calls = []
+
+    def failFirstDestroyer(self, ship):
+        calls.append(len(ship))
+        if ship is self.destroyer and calls.count(2) == 1:
+            return False
+        return placeShip(self, ship)
+
+    monkeypatch.setattr(tb.Battleships, "placeShip", failFirstDestroyer)
+    game.placeShips()
+    assert calls == [5, 4, 3, 3, 2] * 2
+    assert sum(1 for shipNo in game.shipAt if shipNo) == 17
+
+
+def test_layout_fails_loudly_when_ships_never_fit(makeHost, monkeypatch):
+    game = makeHost(tb.Battleships).activeGame
+    monkeypatch.setattr(tb.Battleships, "placeShip", lambda self, ship: False)
+    with pytest.raises(RuntimeError):
+        game.placeShips()
+
+
+def test_shots_used_count_around_border_path(makeHost):
+    host = makeHost(tb.Battleships)
+    game = host.activeGame
+    marked = []
+    for game.misses in range(1, tb.MAXSHOTS + 1):
+        game.updateScore(tb.RED)
+        marked.extend((x, y) for y in range(tb.EDGE + 1) for x in range(tb.EDGE + 1)
+                      if host.frameBuffer.get(x, y) == tb.RED and (x, y) not in marked)
+    assert len(set(marked)) == tb.MAXSHOTS
+    assert marked[0] == (0, 0)
+    assert marked[tb.EDGE] == (tb.EDGE, 0)
+    assert marked[-1] == (0, 1)
+    assert all(x in (0, tb.EDGE) or y in (0, tb.EDGE) for x, y in marked)
+
+
+def test_only_playing_area_takes_shots(makeHost):
+    host = makeHost(tb.Battleships)
+    for x, y in ((0, 5), (tb.EDGE, 5), (5, tb.EDGE)):
+        shoot(host, x, y)
+    assert plays(host, "QuickBombDrop") == 0
+    shoot(host, tb.GRIDSIZE, tb.GRIDSIZE)
+    assert plays(host, "QuickBombDrop") == 1
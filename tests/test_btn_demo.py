@@ -0,0 +1,44 @@
+# Tests of the BtnDemo sound map
+
+# Copyright (C) 2023 Paul 'Footleg' Fretwell
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import btn_demo
+
+
+def test_sound_map_rows_skip_comments_and_gaps(tmp_path):
+    path = tmp_path / "sounds.txt"
+    path.write_text("# Sounds of the first rows\n\nAlert - Ding:0.25\n- Buzz\n")
+    sounds, volumes = btn_demo.loadSoundMap(str(path))
+    assert sounds[:3] == ["Alert", None, "Ding"]
+    assert volumes[:3] == [1.0, 1.0, 0.25]
+    assert sounds[btn_demo.DIM_X:btn_demo.DIM_X + 2] == [None, "Buzz"]
+    assert sounds.count(None) == btn_demo.DIM_X * btn_demo.DIM_Y - 3
+
+
+def test_sound_map_is_found_from_any_directory(makeHost, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    host = makeHost(btn_demo.BtnDemo)
+    sounds, volumes = btn_demo.loadSoundMap()
+    host.trellis.press(1, 1)
+    host.tick()
+    assert host.audio.plays == [sounds[btn_demo.DIM_X + 1]]
+    assert host.audio.volumes == [volumes[btn_demo.DIM_X + 1]]
+
+
+def test_missing_sound_map_leaves_buttons_silent(makeHost, tmp_path):
+    game = btn_demo.BtnDemo(makeHost(), str(tmp_path / "none.txt"))
+    assert game.sounds == [None] * (btn_demo.DIM_X * btn_demo.DIM_Y)
@@ -0,0 +1,53 @@
+# Tests of the button event queue
+
+# Copyright (C) 2023 Paul 'Footleg' Fretwell
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+from events import EventQueue
+
+
+def test_events_are_dispatched_oldest_first():
+    queue = EventQueue(4)
+    queue.push(1, 2, True, 100)
+    queue.push(1, 2, False, 250)
+    events = []
+    assert queue.dispatch(lambda x, y, press, t: events.append((x, y, press, t))) == 2
+    assert events == [(1, 2, True, 100), (1, 2, False, 250)]
+    assert len(queue) == 0
+
+
+def test_full_queue_drops_and_counts_events():
+    queue = EventQueue(2)
+    assert queue.push(0, 0, True, 1)
+    assert queue.push(0, 0, False, 2)
+    assert not queue.push(3, 3, True, 3)
+    assert queue.dropped == 1
+    events = []
+    queue.dispatch(lambda x, y, press, t: events.append(t))
+    # The ring wraps round once the queue has been emptied
+    queue.push(5, 5, True, 4)
+    queue.push(5, 5, False, 5)
+    queue.dispatch(lambda x, y, press, t: events.append(t))
+    assert events == [1, 2, 4, 5]
+
+
+def test_host_passes_capture_time_to_game(makeHost):
+    host = makeHost()
+    host.eventQueue.push(4, 4, True, 1000)
+    host.clock.now = 5000
+    host.tick()
+    assert host.activeGame.events == [(4, 4, True)]
+    assert host.eventTime == 1000
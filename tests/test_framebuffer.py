@@ -0,0 +1,150 @@
+# Tests of the framebuffer and of flushing it to the boards
+
+# Copyright (C) 2023 Paul 'Footleg' Fretwell
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+from framebuffer import FrameBuffer
+
+RED = (255, 0, 0)
+GREEN = (0, 255, 0)
+BLUE = (0, 0, 255)
+
+
+def flushed(frameBuffer):
+    # Flushes the framebuffer, returning the (bx, by, first, last) key ranges sent
+    sent = []
+    frameBuffer.flush(lambda bx, by, first, last: sent.append((bx, by, first, last)))
+    return sent
+
+
+def test_first_flush_sends_every_board():
+    frameBuffer = FrameBuffer(12, 12)
+    sent = flushed(frameBuffer)
+    assert len(sent) == 9
+    assert all(first == 0 and last == 15 for bx, by, first, last in sent)
+    assert flushed(frameBuffer) == []
+
+
+def test_flush_sends_changed_range_by_board():
+    frameBuffer = FrameBuffer(12, 12)
+    flushed(frameBuffer)
+    frameBuffer.set(5, 1, RED)
+    frameBuffer.set(6, 2, GREEN)
+    frameBuffer.set(0, 11, BLUE)
+    # Keys 1,1 to 2,2 of the middle board of the top row, and key 0,3 of the bottom left board
+    assert flushed(frameBuffer) == [(1, 0, 5, 10), (0, 2, 12, 12)]
+    assert flushed(frameBuffer) == []
+
+
+def test_pixel_changed_back_before_flush_is_not_sent():
+    frameBuffer = FrameBuffer(12, 12)
+    frameBuffer.set(7, 7, RED)
+    flushed(frameBuffer)
+    frameBuffer.set(7, 7, BLUE)
+    frameBuffer.set(7, 7, RED)
+    frameBuffer.set(3, 3, (0, 0, 0))
+    assert flushed(frameBuffer) == []
+
+
+def test_invalidate_resends_every_board():
+    frameBuffer = FrameBuffer(12, 12)
+    flushed(frameBuffer)
+    frameBuffer.invalidate()
+    assert len(flushed(frameBuffer)) == 9
+
+
+def test_transient_colour_is_shown_but_not_stored():
+    frameBuffer = FrameBuffer(12, 12)
+    frameBuffer.set(2, 2, RED)
+    frameBuffer.set(2, 2, BLUE, False)
+    assert bytes(frameBuffer.row(2)[6:9]) == bytes(BLUE)
+    assert frameBuffer.get(2, 2) == RED
+
+
+def test_row_views_share_the_frame():
+    frameBuffer = FrameBuffer(12, 12)
+    row = frameBuffer.row(5)
+    boardRow = frameBuffer.boardRow(1, 1, 1)
+    frameBuffer.set(4, 5, GREEN)
+    assert bytes(row[12:15]) == bytes(GREEN)
+    assert bytes(boardRow[0:3]) == bytes(GREEN)
+
+
+def colours(frameBuffer):
+    # Stored colours of every button, row by row
+    return [frameBuffer.get(x, y) for y in range(frameBuffer.height) for x in range(frameBuffer.width)]
+
+
+def test_fill_rect_is_clipped_to_matrix():
+    frameBuffer = FrameBuffer(12, 12)
+    expected = FrameBuffer(12, 12)
+    frameBuffer.fillRect(-2, 9, 5, 6, RED)
+    for y in range(9, 12):
+        for x in range(0, 3):
+            expected.set(x, y, RED)
+    assert colours(frameBuffer) == colours(expected)
+
+
+def test_fill_with_shown_colour_sends_nothing():
+    frameBuffer = FrameBuffer(12, 12)
+    frameBuffer.fill(GREEN)
+    flushed(frameBuffer)
+    frameBuffer.fill(GREEN)
+    frameBuffer.drawRow(0, 4, 12, GREEN)
+    assert flushed(frameBuffer) == []
+
+
+def test_polyline_length_stops_along_path():
+    frameBuffer = FrameBuffer(12, 12)
+    # Clockwise round the border from the top left corner, as the Battleships ammo counter
+    drawn = frameBuffer.drawPolyline([(0, 0), (11, 0), (11, 11), (0, 11), (0, 1)], RED, 15)
+    assert drawn == 15
+    assert [frameBuffer.get(x, 0) for x in range(12)] == [RED] * 12
+    assert [frameBuffer.get(11, y) for y in range(1, 5)] == [RED] * 3 + [(0, 0, 0)]
+
+
+def test_diagonal_polyline_steps_between_points():
+    frameBuffer = FrameBuffer(12, 12)
+    frameBuffer.drawPolyline([(1, 1), (4, 4)], BLUE)
+    assert [(x, y) for y in range(12) for x in range(12) if frameBuffer.get(x, y) == BLUE] == \
+        [(1, 1), (2, 2), (3, 3), (4, 4)]
+
+
+def test_blit_restores_saved_frame():
+    frameBuffer = FrameBuffer(12, 12)
+    frameBuffer.fillRect(2, 2, 3, 3, RED)
+    saved = bytes(frameBuffer.leds)
+    frameBuffer.fill(GREEN)
+    frameBuffer.blit(saved)
+    assert frameBuffer.leds == saved
+    assert bytes(frameBuffer.frame) == saved
+
+
+def test_blit_block_is_clipped_to_matrix():
+    frameBuffer = FrameBuffer(12, 12)
+    frameBuffer.blit(bytes(BLUE) * 4, 11, 11, width=2)
+    assert frameBuffer.get(11, 11) == BLUE
+    assert colours(frameBuffer).count(BLUE) == 1
+
+
+def test_counts_buttons_written_and_changed():
+    frameBuffer = FrameBuffer(12, 12)
+    frameBuffer.fill(RED)
+    assert (frameBuffer.writes, frameBuffer.changes) == (144, 144)
+    frameBuffer.writes = frameBuffer.changes = 0
+    frameBuffer.fill(RED)
+    frameBuffer.fillRect(0, 0, 2, 2, BLUE)
+    assert (frameBuffer.writes, frameBuffer.changes) == (148, 4)
@@ -0,0 +1,100 @@
+# Tests of the game registry and loader
+
+# Copyright (C) 2023 Paul 'Footleg' Fretwell
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import gc
+import sys
+import weakref
+
+import games
+from conftest import tap
+from test_battleships import shoot
+import rain_demo as rd
+import trellisbattleships as tb
+
+LONG_PRESS = 1500000000
+
+
+def launch(host, name):
+    x = next(x for x, launched in games.LAUNCHERS.items() if launched == name)
+    tap(host, x, games.LAUNCH_ROW, hold=LONG_PRESS)
+
+
+def test_launchers_name_listed_games():
+    assert games.launcher(0, games.LAUNCH_ROW) == "BtnDemo"
+    assert games.launcher(0, 0) is None
+    assert games.launcher(5, games.LAUNCH_ROW) is None
+    assert all(name in games.GAMES for name in games.LAUNCHERS.values())
+
+
+def test_host_boots_named_game(makeHost):
+    host = makeHost(None, gameName="RainDemo")
+    assert type(host.activeGame).__name__ == "RainDemo"
+
+
+def test_switch_suspends_game_and_resumes_it_as_left(makeHost):
+    host = makeHost(None, gameName="Battleships")
+    game = host.activeGame
+    shipAt = bytes(game.shipAt)
+    x, y = next((x, y) for y in range(1, 11) for x in range(1, 11) if game.checkPositionFree(x, y))
+    shoot(host, x, y)
+    launch(host, "BtnDemo")
+    assert [suspended.name for suspended in host.loader.suspended] == ["Battleships"]
+    assert host.trellis.pixel(x, y) == games.clearColour("BtnDemo")
+    launch(host, "Battleships")
+    host.tick()
+    assert host.activeGame is game
+    assert game.misses == 1
+    assert bytes(game.shipAt) == shipAt
+    assert host.trellis.pixel(x, y) == tb.MISS
+    assert [suspended.name for suspended in host.loader.suspended] == ["BtnDemo"]
+
+
+def test_resumed_animations_carry_on(makeHost):
+    host = makeHost(None, gameName="RainDemo")
+    game = host.activeGame
+    tap(host, 4, 0)
+    launch(host, "BtnDemo")
+    assert len(host.animator) == 0
+    host.runFor(10 * rd.DROPINTERVAL)
+    launch(host, "RainDemo")
+    assert len(game.drops) == 1
+    host.runFor((rd.BOTTOM + rd.MAXLENGTH + 1) * rd.DROPINTERVAL)
+    assert len(game.drops) == 0
+
+
+def test_long_press_on_active_launcher_restarts_game(makeHost):
+    host = makeHost(None, gameName="RainDemo")
+    game = host.activeGame
+    launch(host, "RainDemo")
+    assert host.activeGame is not game
+    assert host.loader.suspended == []
+
+
+def test_dropped_game_and_module_are_freed(makeHost, monkeypatch):
+    # Import the module afresh, so only the game refers to it
+    monkeypatch.delitem(sys.modules, "rain_demo")
+    host = makeHost(None, gameName="RainDemo")
+    game = weakref.ref(host.activeGame)
+    module = weakref.ref(sys.modules["rain_demo"])
+    launch(host, "BtnDemo")
+    launch(host, "Battleships")
+    gc.collect()
+    assert [suspended.name for suspended in host.loader.suspended] == ["BtnDemo"]
+    assert "rain_demo" not in sys.modules
+    assert game() is None
+    assert module() is None
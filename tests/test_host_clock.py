@@ -0,0 +1,58 @@
+# Tests of the host clocks
+
+# Copyright (C) 2023 Paul 'Footleg' Fretwell
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+from host_clock import SimClock
+
+
+def test_earliest_wake_time_is_kept():
+    clock = SimClock()
+    clock.wakeAt(300)
+    clock.wakeAt(100)
+    clock.wakeAt(200)
+    assert clock.nextDeadline() == 100
+
+
+def test_tick_reaching_deadline_clears_it():
+    clock = SimClock()
+    clock.wakeAt(100)
+    clock.advance(99)
+    clock.tick()
+    assert clock.nextDeadline() == 100
+    clock.advance(1)
+    assert clock.tick() == 100
+    assert clock.nextDeadline() is None
+
+
+def test_skip_jumps_to_deadline_only_forwards():
+    clock = SimClock(start=500)
+    assert not clock.skipToDeadline()
+    clock.wakeAt(1000)
+    assert clock.skipToDeadline()
+    assert clock.now == 1000
+    clock.tick()
+    clock.wakeAt(10)
+    assert clock.skipToDeadline()
+    assert clock.now == 1000
+
+
+def test_run_for_ticks_at_requested_wake_times(makeHost):
+    host = makeHost()
+    host.clock.wakeAt(1000)
+    assert host.runFor(5000) == 2
+    assert host.clock.now == 5000
+    assert host.clock.nextDeadline() is None
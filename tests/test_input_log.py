@@ -0,0 +1,75 @@
+# Tests recording a session and replaying it on the headless host
+
+# Copyright (C) 2023 Paul 'Footleg' Fretwell
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import io
+
+import pytest
+
+from conftest import SEED, tap
+import input_log
+
+# Buttons pressed in the recorded session
+SHOTS = [(5, 5), (6, 6), (2, 2), (3, 3), (7, 8), (10, 1), (1, 10)]
+
+
+def record(host, longPress):
+    # Plays a session on the host, returning the input log recorded
+    stream = io.StringIO()
+    host.recorder = input_log.InputRecorder(stream, type(host.activeGame).__name__, SEED, host.clock.now)
+    if longPress is not None:
+        tap(host, longPress[0], longPress[1], hold=1500000000)
+    for x, y in SHOTS:
+        tap(host, x, y)
+        host.runFor(6000000000)
+    host.runFor(input_log.SETTLE_TIME)
+    return stream.getvalue()
+
+
+# Only Battleships handles long presses, which it uses to set the volume. RainDemo plays no sounds.
+@pytest.mark.parametrize("gameName,longPress,sounds", [
+    ("Battleships", (2, 0), True),
+    ("BtnDemo", None, True),
+    ("RainDemo", None, False),
+])
+def test_replay_matches_recorded_session(makeHost, gameName, longPress, sounds):
+    host = makeHost(None, gameName=gameName)
+    recorded = record(host, longPress)
+    assert recorded.startswith(f"neotrellis-input 1 {gameName} {SEED}\n")
+    assert host.recorder.events == 2 * (len(SHOTS) + (longPress is not None))
+    assert bool(host.audio.plays) == sounds
+
+    replayed = input_log.replay(io.StringIO(recorded))
+    assert replayed.audio.plays == host.audio.plays
+    assert replayed.audio.volumes == host.audio.volumes
+    assert replayed.trellis.pixels == host.trellis.pixels
+
+
+def test_event_times_round_trip_in_microseconds():
+    stream = io.StringIO()
+    recorder = input_log.InputRecorder(stream, "BtnDemo", SEED, 1000)
+    recorder.record(1, 2, True, 1501999)
+    recorder.record(1, 2, False, 2502999)
+    stream.seek(0)
+    assert input_log.readHeader(stream) == ("BtnDemo", SEED)
+    # Rounding to microseconds does not accumulate from one event to the next
+    assert list(input_log.readEvents(stream, 1000)) == [(1501000, 1, 2, True), (2502000, 1, 2, False)]
+
+
+def test_replay_rejects_other_files():
+    with pytest.raises(ValueError):
+        input_log.replay(io.StringIO("not a log\n"))
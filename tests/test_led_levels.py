@@ -0,0 +1,104 @@
+# Tests of the LED gamma and brightness tables
+
+# Copyright (C) 2023 Paul 'Footleg' Fretwell
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import pytest
+
+from led_levels import LedLevels, makeTable
+import btn_demo
+import rain_demo
+import trellisbattleships
+
+
+def test_table_keeps_off_off_and_lit_lit():
+    table = makeTable(0.1)
+    assert table[0] == 0
+    assert min(table[1:]) == 1
+    assert table[255] == int(255 * 0.1 + 0.5)
+    assert all(table[v] <= table[v + 1] for v in range(255))
+
+
+def test_table_applies_gamma():
+    table = makeTable(1.0, gamma=2.0)
+    assert table[128] == int((128 / 255) ** 2 * 255 + 0.5)
+    assert makeTable(1.0, gamma=1.0) == bytearray([0] + list(range(1, 256)))
+
+
+def test_regions_with_same_scale_share_a_table():
+    levels = LedLevels(12, 12)
+    levels.setRegion(0, 0, 12, 1, 0.5)
+    levels.setRegion(0, 11, 12, 1, 0.5)
+    levels.setRegion(5, 5, 2, 2, 0.25)
+    assert len(levels.tables) == 3
+    assert levels.regionMap[0] == levels.regionMap[11 * 12 + 3] == 1
+    assert levels.regionMap[6 * 12 + 6] == 2
+    assert levels.regionMap[1 * 12] == 0
+
+
+def test_brightness_rebuilds_region_tables():
+    levels = LedLevels(12, 12, gamma=1.0)
+    levels.setRegion(0, 0, 1, 1, 0.5)
+    levels.setBrightness(0.5)
+    assert levels.tables[0][200] == 100
+    assert levels.tables[1][200] == 50
+    levels.clearRegions()
+    assert len(levels.tables) == 1
+    assert not any(levels.regionMap)
+
+
+def test_host_region_brightness_scales_sent_colour(makeHost):
+    host = makeHost()
+    host.tick()
+    host.setRegionBrightness(0, 0, 4, 4, 0.5)
+    host.setColour(1, 1, (200, 0, 0))
+    host.setColour(5, 5, (200, 0, 0))
+    host.tick()
+    assert host.getColour(1, 1) == (200, 0, 0)
+    assert host.trellis.pixel(1, 1) == (100, 0, 0)
+    assert host.trellis.pixel(5, 5) == (200, 0, 0)
+
+
+def test_restore_puts_back_regions_and_rebuilds_changed_tables():
+    levels = LedLevels(12, 12, gamma=1.0)
+    levels.setRegion(0, 0, 2, 2, 0.5)
+    state = levels.snapshot()
+    assert levels.snapshot() == state
+    levels.clearRegions()
+    levels.restore(state)
+    assert levels.regionMap[13] == 1
+    assert levels.tables[1] is state[2][1]
+    levels.clearRegions()
+    levels.setBrightness(0.5)
+    levels.restore(state)
+    assert levels.tables[1][200] == 50
+
+
+# Brightness levels offered by a long press on the top row of the hardware host
+BRIGHTNESS_LEVELS = (0.1, 0.2, 0.4, 0.6, 0.8, 1.0)
+
+
+def palette(module):
+    return {value for name, value in vars(module).items() if name.isupper() and isinstance(value, tuple) and len(value) == 3}
+
+
+@pytest.mark.parametrize("module", [btn_demo, rain_demo, trellisbattleships])
+def test_palette_levels_stay_distinct(module):
+    colours = palette(module)
+    channels = sorted({channel for colour in colours for channel in colour})
+    for brightness in BRIGHTNESS_LEVELS:
+        table = makeTable(brightness)
+        assert len({table[channel] for channel in channels}) == len(channels), brightness
+        assert len({bytes(table[channel] for channel in colour) for colour in colours}) == len(colours)
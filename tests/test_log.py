@@ -0,0 +1,73 @@
+# Tests of the levelled logger
+
+# Copyright (C) 2023 Paul 'Footleg' Fretwell
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import pytest
+
+import log
+
+
+@pytest.fixture(autouse=True)
+def resetLog():
+    log.clear()
+    yield
+    log.setLevel(log.INFO, log.INFO)
+    log.clear()
+
+
+def test_levels_below_both_thresholds_are_no_ops():
+    log.setLevel(log.WARNING, log.ERROR)
+    assert log.debug is log.skip
+    assert log.info is log.skip
+    assert log.warning is log.logWarning
+    assert not log.isEnabled(log.INFO)
+    log.setLevel(recordAt=log.DEBUG)
+    assert log.debug is log.logDebug
+    assert log.isEnabled(log.DEBUG)
+
+
+def test_printed_and_recorded_levels_are_separate(capsys):
+    log.setLevel(log.ERROR, log.INFO)
+    log.info("shot at %d,%d", 3, 4)
+    log.error("no room")
+    assert capsys.readouterr().out == "no room\n"
+    assert [(level, msg, args) for t, level, msg, args in log.entries()] == [
+        (log.INFO, "shot at %d,%d", (3, 4)),
+        (log.ERROR, "no room", ()),
+    ]
+
+
+def test_ring_keeps_most_recent_messages():
+    log.setLevel(log.OFF, log.DEBUG)
+    total = log.RING_SIZE + 5
+    for i in range(total):
+        log.debug("message %d", i)
+    recent = log.entries()
+    assert len(recent) == log.RING_SIZE
+    assert recent[0][3] == (5,)
+    assert recent[-1][3] == (total - 1,)
+    lines = []
+    log.dump(lines.append)
+    assert lines[0] == f"Last {log.RING_SIZE} of {total} logged messages:"
+    assert lines[-1].endswith(f"DEBUG   message {total - 1}")
+
+
+def test_level_names():
+    assert log.levelNamed("debug") == log.DEBUG
+    assert log.levelNamed("off") == log.OFF
+    with pytest.raises(ValueError):
+        log.levelNamed("loud")
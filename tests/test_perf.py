@@ -0,0 +1,71 @@
+# Tests of the per-frame counters
+
+# Copyright (C) 2023 Paul 'Footleg' Fretwell
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+from perf import FrameCounters
+
+RED = (255, 0, 0)
+
+
+def test_frames_add_to_totals_and_peaks():
+    counters = FrameCounters()
+    counters.written = 3
+    counters.endFrame()
+    counters.written = 5
+    counters.endFrame()
+    assert counters.written == 0
+    assert counters.lastFrame()["written"] == 5
+    assert counters.averages()["written"] == 4
+    assert counters.lines()[0] == "written: 4.0 avg 5 peak"
+    counters.reset()
+    assert counters.frames == 0
+    assert counters.averages()["written"] == 0
+
+
+def test_host_counts_changes_and_pixels_sent(makeHost):
+    host = makeHost()
+    host.tick()
+    host.setColour(1, 1, RED)
+    host.setColour(1, 1, RED)
+    host.setColour(2, 1, RED)
+    host.tick()
+    last = host.counters.lastFrame()
+    assert last["written"] == 3
+    assert last["changed"] == 2
+    assert last["pixelsSent"] == 2
+    # Nothing changed, so nothing is sent
+    host.tick()
+    assert host.counters.lastFrame()["pixelsSent"] == 0
+
+
+def test_host_counts_bulk_drawing(makeHost):
+    host = makeHost()
+    host.tick()
+    host.fillRect(0, 0, 2, 2, RED)
+    host.fillRect(0, 0, 3, 1, RED)
+    host.tick()
+    last = host.counters.lastFrame()
+    assert (last["written"], last["changed"]) == (7, 5)
+
+
+def test_long_press_message_does_not_count_colour_read(makeHost):
+    host = makeHost()
+    host.tick()
+    host.longPress(3, 3)
+    host.tick()
+    # Only restoring the button colour reads it through getColour
+    assert host.counters.lastFrame()["getColour"] == 1
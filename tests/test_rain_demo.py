@@ -0,0 +1,84 @@
+# Tests of the raindrop demo
+
+# Copyright (C) 2023 Paul 'Footleg' Fretwell
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+from rain_demo import BLANK, BOTTOM, DROPINTERVAL, HEAD, MAXLENGTH, DropPool, RainDemo
+from conftest import tap
+
+
+def test_pool_refuses_drops_when_full():
+    pool = DropPool(2)
+    assert pool.add(1, 2)
+    assert pool.add(3, 4)
+    assert not pool.add(5, 6)
+    assert len(pool) == 2
+    assert pool.dropped == 1
+
+
+def test_removed_drop_is_replaced_by_last():
+    pool = DropPool(4)
+    for x in range(3):
+        pool.add(x, x + 1)
+    pool.lengths[2] = 5
+    pool.remove(0)
+    assert len(pool) == 2
+    assert (pool.xs[0], pool.ys[0], pool.lengths[0]) == (2, 3, 5)
+    assert (pool.xs[1], pool.ys[1]) == (1, 2)
+
+
+def test_drop_falls_and_then_rain_stops(makeHost):
+    host = makeHost(RainDemo)
+    game = host.activeGame
+    tap(host, 4, 0)
+    assert host.trellis.pixel(4, 0) == HEAD
+    host.runFor(3 * DROPINTERVAL)
+    assert host.trellis.pixel(4, 3) == HEAD
+    assert game.drops.lengths[0] == 4
+    # Falls to the bottom, then the tail shrinks away
+    host.runFor((BOTTOM + MAXLENGTH) * DROPINTERVAL)
+    assert len(game.drops) == 0
+    assert game.rain is None
+    assert all(host.trellis.pixel(4, y) == BLANK for y in range(BOTTOM + 1))
+
+
+def test_button_stays_lit_while_another_drop_covers_it(makeHost):
+    host = makeHost(RainDemo)
+    game = host.activeGame
+    tap(host, 4, 0)
+    host.runFor(MAXLENGTH * DROPINTERVAL)
+    # A second drop starting under the tail of the first
+    tap(host, 4, 1)
+    assert game.cover[1 * 12 + 4] == 2
+    host.runFor((BOTTOM + 2 * MAXLENGTH) * DROPINTERVAL)
+    assert len(game.drops) == 0
+    assert not any(game.cover)
+    assert all(host.trellis.pixel(4, y) == BLANK for y in range(BOTTOM + 1))
+
+
+
+def test_buttons_covered_by_drops_stay_lit(makeHost):
+    host = makeHost(RainDemo)
+    game = host.activeGame
+    drops = game.drops
+    # Drops following each other down one column, some starting on the trail of another
+    for y in (0, 1, 0, 3, 0):
+        tap(host, 4, y)
+        for step in range(3):
+            host.runFor(DROPINTERVAL)
+            for i in range(len(drops)):
+                for row in range(max(drops.ys[i] - drops.lengths[i] + 1, 0), drops.ys[i] + 1):
+                    assert host.trellis.pixel(4, row) != BLANK
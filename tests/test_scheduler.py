@@ -0,0 +1,50 @@
+# Tests of the frame scheduler
+
+# Copyright (C) 2023 Paul 'Footleg' Fretwell
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+from host_clock import SimClock
+from scheduler import FrameScheduler
+
+
+def test_jobs_run_at_their_intervals_in_order():
+    clock = SimClock()
+    scheduler = FrameScheduler(clock)
+    runs = []
+    scheduler.every("input", 20, lambda now: runs.append(("input", now)))
+    scheduler.every("animate", 10, lambda now: runs.append(("animate", now)))
+    for t in range(0, 40, 5):
+        clock.now = t
+        scheduler.runDue()
+    assert runs == [("input", 0), ("animate", 0), ("animate", 10), ("input", 20), ("animate", 20),
+                    ("animate", 30)]
+    assert scheduler.nextDue() == 40
+
+
+def test_late_job_is_rescheduled_from_now():
+    clock = SimClock()
+    scheduler = FrameScheduler(clock)
+    job = scheduler.every("flush", 20, lambda now: None)
+    scheduler.runDue()
+    clock.now = 75
+    scheduler.runDue()
+    assert job.overruns == 1
+    assert job.maxLateNs == 55
+    assert job.due == 95
+    clock.now = 95
+    scheduler.runDue()
+    assert job.runs == 3
+    assert job.overruns == 1
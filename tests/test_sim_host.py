@@ -0,0 +1,93 @@
+# Tests of the headless simulator host and its backends
+
+# Copyright (C) 2023 Paul 'Footleg' Fretwell
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import sim_host
+from sim_timing import NeoTrellis3x3Timing
+from trellisbattleships import Battleships
+
+RED = (255, 0, 0)
+GREEN = (0, 255, 0)
+
+
+def test_colours_are_shown_and_stored(makeHost):
+    host = makeHost()
+    host.setColour(4, 7, RED)
+    host.tick()
+    assert host.trellis.pixel(4, 7) == RED
+    assert host.getColour(4, 7) == RED
+
+
+def test_transient_colour_is_not_stored(makeHost):
+    host = makeHost()
+    host.setColour(2, 3, GREEN)
+    host.setColour(2, 3, RED, False)
+    host.tick()
+    assert host.trellis.pixel(2, 3) == RED
+    assert host.getColour(2, 3) == GREEN
+    host.restoreColour(2, 3)
+    host.tick()
+    assert host.trellis.pixel(2, 3) == GREEN
+
+
+def test_colour_outside_trellis_is_ignored(makeHost):
+    host = makeHost()
+    host.setColour(sim_host.DIM_X, 0, RED)
+    host.tick()
+    assert not any(host.trellis.pixels)
+
+
+def test_grid_reset_sets_every_button(makeHost):
+    host = makeHost()
+    host.gridReset(GREEN)
+    host.tick()
+    assert host.trellis.pixels == bytes(GREEN) * (sim_host.DIM_X * sim_host.DIM_Y)
+
+
+def test_button_events_reach_game_on_tick(makeHost):
+    host = makeHost()
+    host.trellis.press(5, 6)
+    host.trellis.release(5, 6)
+    assert host.activeGame.events == []
+    host.tick()
+    assert host.activeGame.events == [(5, 6, True), (5, 6, False)]
+
+
+def test_timing_model_charges_each_frame(makeHost):
+    host = makeHost(timing=NeoTrellis3x3Timing())
+    # The first frame sends every pixel
+    host.tick()
+    idleNs = host.tick()
+    assert idleNs > 0
+    host.setColour(1, 1, RED)
+    assert host.tick() > idleNs
+
+
+def test_battleships_shot_plays_sound(makeHost):
+    host = makeHost(Battleships)
+    host.trellis.press(5, 5)
+    host.trellis.release(5, 5)
+    host.tick()
+    assert host.audio.plays[0].startswith("QuickBombDrop")
+
+
+def test_bulk_drawing_is_shown_on_tick(makeHost):
+    host = makeHost()
+    host.fill(GREEN)
+    host.fillRect(8, 8, 2, 2, RED)
+    host.tick()
+    assert host.trellis.pixel(9, 9) == RED
+    assert host.trellis.pixel(0, 0) == GREEN
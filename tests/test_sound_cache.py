@@ -0,0 +1,107 @@
+# Tests of the sound cache
+
+# Copyright (C) 2023 Paul 'Footleg' Fretwell
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import pytest
+
+from sound_cache import SoundCache
+
+# Bytes each test sound uses
+SOUND_SIZE = 10
+
+
+def makeCache(budget, missing=(), busy=None):
+    # Cache of sounds which are their own paths, recording the loads and releases
+    loaded = []
+    released = []
+
+    def loader(path):
+        if path in missing:
+            raise OSError(path)
+        loaded.append(path)
+        return path
+
+    cache = SoundCache(loader, budget, cost=lambda path, sound: SOUND_SIZE, release=released.append, busy=busy,
+                       files={"renamed": "d/other.wav"}, directory="d")
+    return cache, loaded, released
+
+
+def test_sounds_are_loaded_once_from_their_files():
+    cache, loaded, released = makeCache(100)
+    assert cache.get("a") == "d/a.wav"
+    assert cache.get("renamed") == "d/other.wav"
+    cache.get("a")
+    assert loaded == ["d/a.wav", "d/other.wav"]
+    assert (cache.hits, cache.loads, cache.used) == (1, 2, 2 * SOUND_SIZE)
+
+
+def test_least_recently_played_sound_is_evicted():
+    cache, loaded, released = makeCache(3 * SOUND_SIZE)
+    for key in ("a", "b", "c"):
+        cache.get(key)
+    cache.get("a")
+    cache.get("d")
+    assert released == ["d/b.wav"]
+    assert sorted(cache.entries) == ["a", "c", "d"]
+    assert cache.used == 3 * SOUND_SIZE
+
+
+def test_pinned_sounds_are_loaded_and_kept():
+    cache, loaded, released = makeCache(3 * SOUND_SIZE)
+    cache.pin(["a", "b"])
+    assert loaded == ["d/a.wav", "d/b.wav"]
+    for key in ("c", "d", "e", "f"):
+        cache.get(key)
+    assert released == ["d/c.wav", "d/d.wav"]
+    assert sorted(cache.entries) == ["a", "b", "e", "f"]
+    # Unpinned sounds can be evicted again
+    cache.pin([])
+    cache.get("g")
+    assert "a" not in cache.entries
+
+
+def test_sound_played_last_is_not_evicted():
+    # It may still be playing, so the cache goes over budget rather than close it
+    cache, loaded, released = makeCache(SOUND_SIZE)
+    cache.get("a")
+    cache.get("b")
+    assert released == []
+    assert cache.used == 2 * SOUND_SIZE
+    cache.get("c")
+    assert released == ["d/a.wav"]
+
+
+def test_missing_sound_is_only_looked_for_once():
+    cache, loaded, released = makeCache(100, missing=("d/gone.wav",))
+    for i in range(2):
+        with pytest.raises(KeyError):
+            cache.get("gone")
+    assert cache.loads == 0
+    cache.pin(["gone", "a"])
+    assert cache.pinned == {"a"}
+
+
+def test_sounds_still_playing_are_not_evicted():
+    playing = {"d/a.wav"}
+    cache, loaded, released = makeCache(2 * SOUND_SIZE, busy=lambda sound: sound in playing)
+    for key in ("a", "b", "c", "d"):
+        cache.get(key)
+    assert released == ["d/b.wav"]
+    assert "a" in cache.entries
+    playing.clear()
+    cache.get("e")
+    assert released[:2] == ["d/b.wav", "d/a.wav"]
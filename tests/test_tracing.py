@@ -0,0 +1,59 @@
+# Tests of the host tracer
+
+# Copyright (C) 2023 Paul 'Footleg' Fretwell
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import io
+import json
+
+from tracing import Tracer
+from conftest import tap
+
+
+def test_full_buffer_keeps_most_recent_spans():
+    tracer = Tracer(3)
+    for name in "abcde":
+        tracer.end(name, tracer.now())
+    assert tracer.dropped() == 2
+    assert [event["name"] for event in tracer.events()] == ["c", "d", "e"]
+
+
+def test_host_spans_export_as_chrome_trace(makeHost):
+    host = makeHost()
+    host.tracer = Tracer()
+    tap(host, 2, 3)
+    stream = io.StringIO()
+    host.tracer.export(stream)
+    trace = json.loads(stream.getvalue())
+    presses = [event for event in trace["traceEvents"] if event["name"] == "btnEvent"]
+    assert [event["args"] for event in presses] == [
+        {"x": 2, "y": 3, "press": True},
+        {"x": 2, "y": 3, "press": False},
+    ]
+    assert all(event["ph"] == "X" and event["dur"] >= 0 for event in trace["traceEvents"])
+    assert trace["otherData"]["dropped"] == 0
+    assert "flush" in [event["name"] for event in trace["traceEvents"]]
+
+
+def test_argument_values_are_named_on_export():
+    tracer = Tracer(4)
+    tracer.end("btnEvent", tracer.now(), 1, 2, True)
+    tracer.end("play", tracer.now(), "WaterSplash")
+    tracer.end("idle", tracer.now())
+    events = tracer.events()
+    assert events[0]["args"] == {"x": 1, "y": 2, "press": True}
+    assert events[1]["args"] == {"key": "WaterSplash"}
+    assert "args" not in events[2]
@@ -0,0 +1,95 @@
+# Tests of the mixer voice pool
+
+# Copyright (C) 2023 Paul 'Footleg' Fretwell
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+from voice_pool import VoicePool
+
+
+class FakeVoice:
+    """
+    Mixer voice which plays until it is stopped or finish() is called
+    """
+    def __init__(self):
+        self.sound = None
+        self.playing = False
+        self.level = 1.0
+        self.starts = 0
+
+    def play(self, sound):
+        self.sound = sound
+        self.playing = True
+        self.starts += 1
+
+    def stop(self):
+        self.playing = False
+
+    def finish(self):
+        self.playing = False
+
+
+def makePool(count=2):
+    voices = [FakeVoice() for i in range(count)]
+    return VoicePool(voices), voices
+
+
+def test_sounds_play_together_on_free_voices():
+    pool, voices = makePool()
+    assert pool.play("a", level=0.5) == 0
+    assert pool.play("b") == 1
+    assert [voice.sound for voice in voices] == ["a", "b"]
+    assert voices[0].level == 0.5
+    assert pool.isPlaying("a") and pool.isPlaying("b")
+    voices[0].finish()
+    assert not pool.isPlaying("a")
+    assert pool.play("c") == 0
+    assert pool.steals == 0
+
+
+def test_oldest_sound_of_lowest_priority_is_stolen():
+    pool, voices = makePool(3)
+    pool.play("a", priority=1)
+    pool.play("b")
+    pool.play("c")
+    assert pool.play("d") == 1
+    assert pool.play("e") == 2
+    assert pool.steals == 2
+    assert voices[0].sound == "a"
+
+
+def test_sound_is_dropped_rather_than_interrupt_higher_priority():
+    pool, voices = makePool()
+    pool.play("a", priority=2)
+    pool.play("b", priority=2)
+    assert pool.play("c", priority=1) == -1
+    assert pool.dropped == 1
+    assert [voice.sound for voice in voices] == ["a", "b"]
+    assert pool.play("d", priority=2) == 0
+
+
+def test_playing_sound_restarts_on_its_own_voice():
+    pool, voices = makePool()
+    pool.play("a")
+    pool.play("b")
+    assert pool.play("a") == 0
+    assert voices[0].starts == 2
+    assert voices[1].sound == "b"
+    assert pool.restarts == 1
+    assert pool.steals == 0
+    # A restart is dropped if the sound is playing at a higher priority
+    pool.play("b", priority=2)
+    assert pool.play("b", priority=1) == -1
+    assert pool.dropped == 1